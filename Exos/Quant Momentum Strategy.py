@@ -1,72 +1,153 @@
-import pandas as pd
-import numpy as np
-import math
-import xlsxwriter
-import yfinance as yf
-from scipy import stats
-
-stocks = pd.read_csv("S&P500.csv", sep=None, engine='python', index_col=0)
-stocks = stocks.dropna(how="all").dropna(axis = 1, how = "all")
-
-tickers = stocks["Ticker"].astype(str).tolist()
-tickers = tickers[:5]
-print(tickers)
-
-data = yf.download(tickers, period="1y", interval="1d", group_by="ticker", auto_adjust=True, progress= False)
-
-my_columns = ["Ticker", "Close", "Volume", "Return", "Shares to buy"]
-
-close_price = pd.concat({t: data[t]["Close"] for t in tickers}, axis=1)
-volumes = pd.concat({t: data[t]["Volume"] for t in tickers}, axis=1)
-
-"""historical_df = (pd.concat([
-    close_price.stack().rename("Close"),
-    volumes.stack().rename("Volume"),
-    market_cap.stack().rename("Market Cap")],
-    axis=1).reset_index().rename(columns={"level_0":"Date", "level_1":"Ticker"}))
+"""
+Quantitative momentum strategy on the S&P 500
 
-print(historical_df)"""
+The 1, 3, 6 and 12 month returns of every stock of S&P500.csv are computed from
+the close matrix in one operation, ranked into percentiles with scipy.stats, and
+averaged into a composite momentum score. The top decile is bought with an equal
+amount of money per stock.
 
-rows = []
+The prices come from the local price cache (../price_cache), and the close matrix
+of the universe is saved in one Parquet file: once cached, a run only reads that
+file. Use --refresh to download the new bars.
 
-for ticker in tickers:
-    last_close = close_price[ticker].iloc[-1]
-    first_close = close_price[ticker].iloc[0]
-    last_volumes = volumes[ticker].iloc[-1]
-    rows.append({
-        "Ticker" : ticker,
-        "First Close" : first_close,
-        "Close": last_close,
-        "Volume" : last_volumes,
-        "Shares to buy" : "N/A"
-    })
+    python "Quant Momentum Strategy.py" --portfolio 1000000 --out momentum.xlsx
+"""
 
-final_df = pd.DataFrame(rows, columns = my_columns)
-
-def one_year_return(series: pd.Series) -> float:
-    s = series.dropna()
-    if len(s) < 2:
-        return np.nan
-    return s.iloc[-1]/s.iloc[0]-1
-
-returns_1y = close_price.apply(one_year_return, axis=0)
-
-"""market_caps = {}
-for t in tickers:
-    try:
-        market_caps[t] = yf.Ticker(t).fast_info.get("market_cap", np.nan)
-    except Exception as e:
-        market_caps[t] = np.nan"""
-
-result = pd.DataFrame ({
-    "Ticker" : returns_1y.index,
-    #"Market Cap": [market_caps.get(t,np.nan) for t in returns_1y.index],
-    "Return": (returns_1y.values * 100)
-})
-
-final_df["Return"] = result["Return"]
+import argparse
+import math
+import os
+import sys
+import time
 
-final_df = final_df[final_df["Return"] >30].sort_values("Return", ascending=False, inplace=True)
+import numpy as np
+import pandas as pd
+from scipy import stats
 
-print(final_df)
-print(len(final_df))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+from cache import PriceCache
+from reports import write_report
+from screener import load_universe
+
+LOOKBACKS = {"1M": 21, "3M": 63, "6M": 126, "12M": 252}
+CLOSE_FILE = os.path.join(HERE, "..", "price_cache", "sp500_close.parquet")
+
+
+def yahoo_symbol(ticker: str) -> str:
+    """ BRK.B is listed as BRK-B on Yahoo Finance """
+    return ticker.replace(".", "-")
+
+
+def close_prices(tickers, refresh=False, period="2y") -> pd.DataFrame:
+    """
+    Dates x tickers close prices of the universe, from the cached close matrix
+
+    Parameters:
+        tickers: the tickers list
+        refresh (bool): Download the new bars and rebuild the close matrix
+        period (str): The history downloaded for the tickers not cached yet
+    """
+    if not refresh and os.path.exists(CLOSE_FILE):
+        close = pd.read_parquet(CLOSE_FILE)
+        if set(tickers) <= set(close.columns):
+            return close[tickers]
+
+    cache = PriceCache(os.path.join(HERE, "..", "price_cache"))
+    symbols = {yahoo_symbol(t): t for t in tickers}
+    frames = cache.update(list(symbols), period=period, interval="1d")
+    close = pd.DataFrame({symbols[s]: f["Close"] for s, f in frames.items()}).sort_index()
+    # the tickers that failed are saved as NaN columns: the next runs do not download
+    # them again, --refresh does
+    close = close.reindex(columns=tickers)
+    close.to_parquet(CLOSE_FILE)
+    return close
+
+
+def momentum_table(close: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns over each lookback, their percentile ranks and the composite score
+
+    Parameters:
+        close (pd.DataFrame): The dates x tickers close prices
+    """
+    values = close.ffill().to_numpy(dtype=float)
+    lags = np.array(list(LOOKBACKS.values()))
+    rows = len(values) - 1 - lags
+    base = np.where(rows[:, None] >= 0, values[np.maximum(rows, 0)], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = (values[-1] / base - 1).T                     # tickers x lookbacks
+
+    # percentile of each return among the tickers, like stats.percentileofscore(kind="rank")
+    ranks = stats.rankdata(returns, axis=0, nan_policy="omit")
+    percentiles = ranks / np.sum(~np.isnan(returns), axis=0) * 100
+
+    table = pd.DataFrame({"Price": values[-1]}, index=close.columns)
+    for i, name in enumerate(LOOKBACKS):
+        table[f"{name} Return"] = returns[:, i]
+        table[f"{name} Percentile"] = percentiles[:, i]
+    # NaN for the stocks without 12 months of history
+    table["HQM Score"] = percentiles.mean(axis=1)
+    return table
+
+
+def position_sizes(table: pd.DataFrame, portfolio_size: float, quantile: float = 0.9) -> pd.DataFrame:
+    """
+    The stocks of the top decile of the score, with an equal position in each
+
+    Parameters:
+        table (pd.DataFrame): The momentum table
+        portfolio_size (float): The money to invest
+        quantile (float): The score quantile to pass
+    """
+    table = table[table["HQM Score"].notna() & table["Price"].notna()]
+    k = max(1, math.ceil(len(table) * (1 - quantile)))
+    if len(table) > k:
+        table = table.iloc[np.argpartition(-table["HQM Score"].to_numpy(), k - 1)[:k]]
+    table = table.sort_values("HQM Score", ascending=False).copy()
+    if table.empty:
+        return table.assign(**{"Shares to Buy": pd.Series(dtype=int), "Position": pd.Series(dtype=float)})
+
+    position_size = portfolio_size / len(table)
+    table["Shares to Buy"] = np.floor(position_size / table["Price"].to_numpy()).astype(int)
+    table["Position"] = table["Shares to Buy"] * table["Price"]
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Momentum strategy on the S&P 500")
+    parser.add_argument("--universe", default=os.path.join(HERE, "S&P500.csv"))
+    parser.add_argument("--portfolio", type=float, default=None, help="money to invest")
+    parser.add_argument("--refresh", action="store_true", help="download the new bars first")
+    parser.add_argument("--out", default=None, help="optional .xlsx, .parquet or .csv output")
+    args = parser.parse_args()
+
+    portfolio_size = args.portfolio
+    while portfolio_size is None:
+        try:
+            portfolio_size = float(input("Enter the value of your portfolio: ").replace(",", "."))
+        except ValueError:
+            print("Please enter a valid number.")
+
+    stocks = load_universe(args.universe).set_index("Ticker")
+    tickers = stocks.index.tolist()
+
+    start = time.perf_counter()
+    close = close_prices(tickers, args.refresh)
+    table = momentum_table(close)
+    positions = position_sizes(table, portfolio_size)
+    positions = stocks[["Company", "GICS Sector"]].join(positions, how="inner").loc[positions.index]
+    print(f"{len(tickers)} stocks ranked in {time.perf_counter() - start:.2f}s")
+
+    print(positions.round(2).to_string())
+    print(f"\n Invested: {positions['Position'].sum():,.2f} of {portfolio_size:,.2f}")
+    if args.out:
+        formats = {"Ticker": "text", "Company": {"width": 30}, "GICS Sector": {"width": 24},
+                   "Price": "price", "HQM Score": "price", "Shares to Buy": "integer", "Position": "money"}
+        formats.update({f"{n} Return": "percent" for n in LOOKBACKS})
+        formats.update({f"{n} Percentile": "price" for n in LOOKBACKS})
+        write_report(args.out, positions.rename_axis("Ticker"), formats, sheet_name="Momentum", index=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,90 +1,182 @@
-
+"""
+Equal-weight S&P 500 portfolio
+
+The last price (and optionally the market cap) of every stock of S&P500.csv is
+requested from Alpha Vantage with an async client: one pooled HTTP session, and a
+token bucket keeping the calls under the quota of the API key. The responses are
+collected in a list and assembled into one table, and the number of shares to buy
+is computed for all the stocks at once.
+
+The key is read from the ALPHAVANTAGE_API_KEY environment variable. To run without
+a key or network, start the local stub first (see alpha_vantage_stub.py):
+
+    python "S&P equal weighted.py" --portfolio 1000000 --out "S&P500EW.xlsx"
+    python "S&P equal weighted.py" --url http://127.0.0.1:8765/query --key demo --rate 50
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
 
 import numpy as np
 import pandas as pd
-import requests
-import xlsxwriter
-import math
-import time
-
-API_KEY = "DHDGV6F2D97W4ICZ"
-
-stocks = pd.read_csv("S&P500.csv", sep=None, engine = "python", index_col = 0)
-stocks = stocks.dropna(how="all")
-stocks = stocks.dropna(axis = 1, how="all")
-tickers = stocks.Ticker.tolist()
-
-print(stocks)
-print(tickers)
-
-
-
-my_columns = ["Ticker", "Stock Price", "Market Cap", "Shares to buy"]
-final_df = pd.DataFrame (columns=my_columns, ignore_index=True)
-
-for ticker in tickers:
-    params = {
-        "function" : "TIME_SERIES_DAILY",
-        "symbol" : ticker,
-        "apikey" : API_KEY,
-    }
-    api_url = "https://www.alphavantage.co/query"
-    r = requests.get(api_url, params, timeout=15)
-    data = r.json()
-    price = data["Adj Close"]
-    market_cap = data["Market Cap"]
-    final_df = final_df.append(
-        pd.Series([
-            ticker,
-            price,
-            market_cap,
-            "N/A"
-        ], index=my_columns),
-        ignore_index=True
-    )
-
-
-portfolio_size = input("Enter the portfolio size: ")
-
-try:
-    val = float(portfolio_size)
-except ValueError:
-    portfolio_size = input("Please enter a number\n Enter the portfolio size: ")
-    val = float(portfolio_size)
-
-position_size = portfolio_size/len(final_df.index)
-
-for i in range(0, len(final_df.index)):
-    final_df.iloc[i,3] = math.floor(position_size/final_df.iloc[i,1])
-
-
-writer = pd.ExcelWriter ("S&P500EW.xlsx", engine = "xlsxwriter")
-final_df.to_excel(writer, "S&P500EW.xlsx", index = False)
-
-writer.sheets["S&PEW.xlsx"].set_columns("A:A", 18, string_format)
-writer.sheets["S&PEW.xlsx"].set_columns("B:B", 18, string_format)
-writer.sheets["S&PEW.xlsx"].set_columns("C:C", 18, string_format)
-writer.sheets["S&PEW.xlsx"].set_columns("D:D", 18, string_format)
-
-
-writer.sheets("S&PEW.xlsx").write("A1", "Ticker", string_format)
-writer.sheets("S&PEW.xlsx").write("B1", "Stock Price", other_format)
-
-#best way to do this :
-
-column_format = {
-    "A": ["Ticker", string_format]
-    "B": ["Stock Price", other_format]
-    "C":["Market Cap", other_format]
-    "D": ["Shares to buy", other_format]
-}
-
-for column in column_format.keys():
-    writer.sheets["S&PEW.xlsx"].set_column(f'{column}:{column}', 18, column_format.column[1])
-    writer.sheets("S&PEW.xlsx").write(f"{column}1", column_format.column[0], column_format.column[1])
-
-writer.save()
-
-
-
 
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+from reports import write_report
+from screener import load_universe
+
+API_URL = "https://www.alphavantage.co/query"
+COLUMNS = ["Ticker", "Stock Price", "Market Cap", "Shares to Buy"]
+FORMATS = {"Ticker": "text", "Stock Price": "price", "Market Cap": "money", "Shares to Buy": "integer"}
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` calls per second on average, bursts of `capacity` calls
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def query(session, bucket: TokenBucket, url: str, params: dict,
+                retries: int = 3, backoff: float = 2.0) -> dict:
+    """
+    One API call; the "Note" / "Information" answers of an exceeded quota are retried
+
+    Parameters:
+        session (aiohttp.ClientSession): The pooled session
+        bucket (TokenBucket): The rate limiter
+        url (str): The API URL
+        params (dict): The query parameters
+        retries (int): The number of retries
+        backoff (float): The first wait between two tries, doubled each time
+    """
+    import aiohttp
+
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        try:
+            async with session.get(url, params=params) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            data = None
+        if data is not None and "Note" not in data and "Information" not in data:
+            return data
+        if attempt < retries:
+            await asyncio.sleep(backoff * 2 ** attempt)
+    return {}
+
+
+async def fetch_quote(session, bucket: TokenBucket, url: str, key: str, ticker: str,
+                      market_cap: bool) -> dict:
+    """
+    Last price (and market cap) of one ticker, NaN when the API has no answer
+    """
+    data = await query(session, bucket, url, {"function": "GLOBAL_QUOTE", "symbol": ticker, "apikey": key})
+    row = {"Ticker": ticker,
+           "Stock Price": float(data.get("Global Quote", {}).get("05. price", "nan") or "nan"),
+           "Market Cap": np.nan}
+    if market_cap:
+        data = await query(session, bucket, url, {"function": "OVERVIEW", "symbol": ticker, "apikey": key})
+        cap = data.get("MarketCapitalization")
+        row["Market Cap"] = float(cap) if cap not in (None, "", "None") else np.nan
+    return row
+
+
+async def fetch_quotes(tickers, key: str, url: str = API_URL, rate: float = 5 / 60, burst: int = 1,
+                       max_connections: int = 8, market_cap: bool = False, timeout: float = 15) -> pd.DataFrame:
+    """
+    Quotes of every ticker, assembled once into a table
+
+    Parameters:
+        tickers: the tickers list
+        key (str): The Alpha Vantage API key
+        url (str): The API URL
+        rate (float): The calls per second allowed by the key (5 per minute for a free key)
+        burst (int): The calls allowed at once
+        max_connections (int): The size of the connection pool
+        market_cap (bool): Also request the market caps (one more call per ticker)
+        timeout (float): The timeout of one call in seconds
+    """
+    import aiohttp
+
+    bucket = TokenBucket(rate, burst)
+    connector = aiohttp.TCPConnector(limit=max_connections)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        rows = await asyncio.gather(*[fetch_quote(session, bucket, url, key, t, market_cap)
+                                      for t in tickers])
+    return pd.DataFrame(rows, columns=COLUMNS[:3])
+
+
+def equal_weight(quotes: pd.DataFrame, portfolio_size: float) -> pd.DataFrame:
+    """
+    Number of shares of each stock for an equal amount of money in every stock
+
+    Parameters:
+        quotes (pd.DataFrame): The Ticker, Stock Price, Market Cap table
+        portfolio_size (float): The money to invest
+    """
+    quotes = quotes[quotes["Stock Price"] > 0].reset_index(drop=True)
+    position_size = portfolio_size / max(len(quotes), 1)
+    shares = np.floor(position_size / quotes["Stock Price"].to_numpy(dtype=float))
+    return quotes.assign(**{"Shares to Buy": shares.astype(int)})[COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Equal-weight S&P 500 portfolio")
+    parser.add_argument("--universe", default=os.path.join(HERE, "S&P500.csv"))
+    parser.add_argument("--portfolio", type=float, default=None, help="money to invest")
+    parser.add_argument("--key", default=os.environ.get("ALPHAVANTAGE_API_KEY"),
+                        help="API key, ALPHAVANTAGE_API_KEY by default")
+    parser.add_argument("--url", default=os.environ.get("ALPHAVANTAGE_URL", API_URL))
+    parser.add_argument("--rate", type=float, default=5, help="calls per minute allowed by the key")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--market-cap", action="store_true", help="also request the market caps")
+    parser.add_argument("--out", default=None, help="optional .xlsx, .parquet or .csv output")
+    args = parser.parse_args()
+    if not args.key:
+        parser.error("set the ALPHAVANTAGE_API_KEY environment variable or pass --key")
+
+    portfolio_size = args.portfolio
+    while portfolio_size is None:
+        try:
+            portfolio_size = float(input("Enter the portfolio size: ").replace(",", "."))
+        except ValueError:
+            print("Please enter a valid number.")
+
+    tickers = load_universe(args.universe)["Ticker"].tolist()
+    start = time.perf_counter()
+    quotes = asyncio.run(fetch_quotes(tickers, args.key, args.url, args.rate / 60,
+                                      max_connections=args.connections, market_cap=args.market_cap))
+    print(f"{quotes['Stock Price'].notna().sum()} / {len(tickers)} quotes in {time.perf_counter() - start:.1f}s")
+
+    portfolio = equal_weight(quotes, portfolio_size)
+    print(portfolio.to_string(index=False))
+    if args.out:
+        write_report(args.out, portfolio, FORMATS, sheet_name="S&P500EW")
+
+
+if __name__ == "__main__":
+    main()
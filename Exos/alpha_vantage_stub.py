@@ -0,0 +1,100 @@
+"""
+Local stub of the Alpha Vantage query API, to run "S&P equal weighted.py" without
+a key or network access.
+
+It answers GLOBAL_QUOTE and OVERVIEW with deterministic made-up values and, like
+the real API, returns a "Note" instead of data above `quota` calls per minute.
+The stub accepts any key, but the script still needs one:
+
+    python alpha_vantage_stub.py --port 8765 --quota 300
+    python "S&P equal weighted.py" --url http://127.0.0.1:8765/query --key demo --rate 5
+"""
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def fake_price(symbol: str) -> float:
+    return round(10 + zlib.crc32(symbol.encode()) % 50000 / 100, 2)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    quota = None
+    window = 60.0
+    calls = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _over_quota(self) -> bool:
+        if self.quota is None:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            self.calls[:] = [t for t in self.calls if now - t < self.window]
+            if len(self.calls) >= self.quota:
+                return True
+            self.calls.append(now)
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        symbol = query.get("symbol", "")
+        function = query.get("function")
+
+        if url.path != "/query":
+            status, body = 404, {"Error Message": "Not found"}
+        elif not query.get("apikey"):
+            status, body = 200, {"Error Message": "the parameter apikey is invalid or missing"}
+        elif self._over_quota():
+            status, body = 200, {"Note": "API call frequency exceeded, please retry later"}
+        elif function == "GLOBAL_QUOTE":
+            status, body = 200, {"Global Quote": {"01. symbol": symbol, "05. price": f"{fake_price(symbol):.4f}"}}
+        elif function == "OVERVIEW":
+            status, body = 200, {"Symbol": symbol, "MarketCapitalization": str(int(fake_price(symbol) * 1e8))}
+        else:
+            status, body = 200, {"Error Message": f"Invalid API call: {function}"}
+
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def serve(port: int = 0, quota: int = None, window: float = 60.0) -> ThreadingHTTPServer:
+    """
+    Start the stub in a background thread and return the server; the URL of the API
+    is http://127.0.0.1:<server.server_port>/query. Stop it with server.shutdown().
+
+    Parameters:
+        port (int): The port, 0 picks a free one
+        quota (int): Optional number of calls accepted per minute
+        window (float): The length of the quota window in seconds (a minute, shorter in tests)
+    """
+    handler = type("Handler", (StubHandler,), {"quota": quota, "window": window, "calls": [],
+                                               "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Alpha Vantage stub")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--quota", type=int, default=None, help="calls accepted per minute")
+    args = parser.parse_args()
+    server = serve(args.port, args.quota)
+    print(f"Serving on http://127.0.0.1:{server.server_port}/query")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -12,16 +12,49 @@ To achieve this, the code has two main goals:
         Maximum Drawdown, and estimated average return
         """
 
+import os
+from functools import lru_cache
+
 import pandas as pd
-import yfinance as yf
-import mplfinance as mpf
-import plotly.graph_objects as go
-import streamlit as st
 from typing import List
 
-from numpy.ma.core import empty
+from fetcher import fetch_frames, stack_frames
+from calendars import align
+
+# yfinance, mplfinance, plotly and streamlit are imported where they are used:
+# they take seconds to import and most callers (workers, risk) never need them.
+
+TICKERS_XLSX = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tickers_indices.xlsx")
+
+
+@lru_cache(maxsize=1)
+def tickers_table(path: str = TICKERS_XLSX) -> pd.DataFrame:
+    """
+    Load the tickers / indices reference table on first use.
+    The Excel file is converted once to a pickle next to it, which is read instead
+    as long as it is newer than the Excel file.
+
+    Parameters:
+        path (str): The Excel file
+    """
+    binary = os.path.splitext(path)[0] + ".pkl"
+    if os.path.exists(binary) and (not os.path.exists(path)
+                                   or os.path.getmtime(binary) >= os.path.getmtime(path)):
+        return pd.read_pickle(binary)
+
+    table = pd.read_excel(path, index_col=0, engine="openpyxl")
+    try:
+        table.to_pickle(binary)
+    except OSError:
+        pass
+    return table
+
 
-xlsx = pd.read_excel("tickers_indices.xlsx", index_col=0, engine="openpyxl")
+def __getattr__(name):
+    # the table used to be loaded at import time as the module attribute `xlsx`
+    if name == "xlsx":
+        return tickers_table()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def download_data(ticker: str, period="6y", interval="1d") -> pd.DataFrame:
     """
@@ -31,6 +64,7 @@ def download_data(ticker: str, period="6y", interval="1d") -> pd.DataFrame:
     Parameters:
         ticker (str): The ticker symbol
         """
+    import yfinance as yf
 
     data = yf.download(
         tickers=ticker,
@@ -40,7 +74,8 @@ def download_data(ticker: str, period="6y", interval="1d") -> pd.DataFrame:
         auto_adjust=True)
     return data
 
-def final_df(tickers: List[str], period="6y", interval="1d") -> pd.DataFrame:
+def final_df(tickers: List[str], period="6y", interval="1d", provider=None,
+             batch_size=50, max_workers=8, cache=None, base_interval=None) -> pd.DataFrame:
     """
     Create final dataframe from the tickers list
 
@@ -48,30 +83,38 @@ def final_df(tickers: List[str], period="6y", interval="1d") -> pd.DataFrame:
         tickers: the tickers list
         period: the period of the data
         interval: the interval of the data
+        provider: the data source (see fetcher.Provider), Yahoo Finance by default
+        batch_size: the number of tickers downloaded per request
+        max_workers: the number of requests running at the same time
+        cache: optional cache.PriceCache, only the bars newer than the cache are downloaded
+        base_interval: with a cache, download this interval only and build `interval`
+            from it locally (e.g. base_interval="1d" for interval="1wk")
     """
-    frame=[]
-    for ticker in tickers:
-        raw = download_data(ticker, period, interval).sort_index()
-        raw["Ticker"] = ticker
-        frame.append(raw)
-
-    df = pd.concat(frame)
-    df = df.groupby("Ticker", group_keys=False).apply(lambda x : x.ffill().dropna(how="all"))
-    return df
-
-def close_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    if cache is not None and base_interval is not None and base_interval != interval:
+        from resample import update_resampled
+        frames = update_resampled(cache, tickers, interval, base_interval, refresh_base=True,
+                                  provider=provider, period=period,
+                                  batch_size=batch_size, max_workers=max_workers)
+    elif cache is not None:
+        frames = cache.update(tickers, provider, period, interval,
+                              batch_size=batch_size, max_workers=max_workers)
+    else:
+        frames = fetch_frames(tickers, provider, period, interval,
+                              batch_size=batch_size, max_workers=max_workers)
+    return stack_frames(frames)
+
+def close_matrix(df: pd.DataFrame, with_mask: bool = False):
     """ Transform a long dataframe into a short dataframe
 
+    The tickers are aligned on the sessions of their exchange (see calendars.align):
+    a ticker is NaN on the days its exchange is closed instead of forward filled.
+
     Parameters:
-        df (pd.DataFrame): The dataframe to be transformed"""
-    close = (df
-             .reset_index()
-             .pivot(index="Date", columns="Ticker", values="Close")
-             .sort_index()
-             .ffill()
-             .dropna(how="all")
-             )
-    return close
+        df (pd.DataFrame): The dataframe to be transformed
+        with_mask (bool): Also return the sessions mask, for the indicators and risk"""
+    matrices, mask = align(df, ["Close"])
+    close = matrices["Close"]
+    return (close, mask) if with_mask else close
 
 
 def save_csv(dataframe, filename):
@@ -103,29 +146,49 @@ def plot_single_stock(dataframe, tickers):
         dataframe (pandas.DataFrame): The dataframe to plot
         tickers : list of ticker
     """
+    import mplfinance as mpf
 
     for t in tickers:
-        dft = (dataframe[dataframe["Ticker"] == t].loc[:, ["Open", "High", "Low", "Close"]].dropna(how="all").copy())
+        columns = [c for c in ["Open", "High", "Low", "Close", "Volume"] if c in dataframe.columns]
+        dft = (dataframe[dataframe["Ticker"] == t].loc[:, columns].dropna(how="all").copy())
         if dft.empty:
             print(f"No data found for {t}")
             continue
         dft.index.name = "Date"
-        dft = dft.sort.index()
+        dft = dft.sort_index()
 
         mpf.plot(
-            dataframe,
+            dft,
             type = "candle",
             style = "yahoo",
-            volume = True,
+            volume = "Volume" in dft.columns,
             mav = (20,50,200),
             figsize= (13,7),
             tight_layout = True,
             title = f"{t} Stock Price",
         )
 
+def plot_universe(dataframe, tickers, out_dir="charts", fmt="png", n_workers=4):
+    """
+    Render the charts of the tickers to files, in parallel and without a display,
+    skipping the charts whose data did not change
+
+    Parameters:
+        dataframe (pandas.DataFrame): The long dataframe returned by final_df
+        tickers : list of ticker
+        out_dir: The output directory
+        fmt: "png" or "svg"
+        n_workers: The number of processes
+    """
+    from charts import render_universe
+
+    frames = {t: dataframe[dataframe["Ticker"] == t].drop(columns="Ticker") for t in tickers}
+    return render_universe(frames, out_dir, fmt, n_workers)
+
 """ Version Graphique pour Streamlit avec Plotly
 
 def plot_stock_price(df, ticker, title_suffix="Stock Price (Plotly)"):
+    import plotly.graph_objects as go
 
     if "Close" not in df.columns:
         raise ValueError("Le DataFrame doit contenir une colonne 'Close'.")
@@ -190,7 +253,7 @@ def last_price (close, shares):
         shares (int): The number of shares
     """
     shares = shares.reindex(close.columns).fillna(0.0)
-    price = close.iloc[-1].reindex(shares.index)
+    price = close.ffill().iloc[-1].reindex(shares.index)
     position_value = (price*shares).round(2)
     total_value = float(position_value.sum().round(2))
     return price, position_value, total_value
@@ -0,0 +1,261 @@
+"""
+Corporate-action-aware price store.
+
+The store keeps the raw (unadjusted) bars of each ticker and a separate table of
+split and dividend events. The cumulative adjustment factors are computed per
+ticker with a vectorized backward product and saved in their own file; they are
+applied when the bars are read. A new corporate action only rewrites the factor
+file of its ticker: the raw history never has to be downloaded again.
+
+Layout:
+    <root>/raw/<ticker>.parquet       raw OHLCV bars
+    <root>/factors/<ticker>.parquet   Price Factor, Volume Factor
+    <root>/events.parquet             Date, Ticker, Type ("split" or "dividend"), Value
+    <root>/stored.json                {ticker: date its raw history was first stored}
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+EVENT_COLUMNS = ["Date", "Ticker", "Type", "Value"]
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+
+
+def _empty_events() -> pd.DataFrame:
+    return pd.DataFrame({"Date": pd.Series(dtype="datetime64[ns]"), "Ticker": pd.Series(dtype=str),
+                         "Type": pd.Series(dtype=str), "Value": pd.Series(dtype=float)})
+
+
+def adjustment_factors(close: pd.Series, events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cumulative backward adjustment factors of one ticker.
+
+    A split of ratio r (4 for a 4-for-1 split) multiplies the prices before its date by
+    1 / r and the volumes by r; a dividend D multiplies the prices before its ex-date
+    by 1 - D / (close of the previous bar). The factor of a bar is the product of the
+    multipliers of all the later events, computed as a reversed cumulative sum of logs.
+
+    Parameters:
+        close (pd.Series): The raw close prices (Date index, sorted)
+        events (pd.DataFrame): The events of the ticker (Date, Type, Value)
+    """
+    n = len(close)
+    log_price = np.zeros(n)
+    log_volume = np.zeros(n)
+    if n and len(events):
+        # the multiplier of an event applies up to the bar before its date
+        rows = close.index.searchsorted(pd.to_datetime(events["Date"]).to_numpy(), side="left") - 1
+        kinds = events["Type"].to_numpy()
+        values = events["Value"].to_numpy(dtype=float)
+        valid = (rows >= 0) & (values > 0)
+
+        split = valid & (kinds == "split")
+        np.add.at(log_price, rows[split], -np.log(values[split]))
+        np.add.at(log_volume, rows[split], np.log(values[split]))
+
+        dividend = valid & (kinds == "dividend")
+        previous = close.to_numpy(dtype=float)[rows[dividend]]
+        ratio = 1 - values[dividend] / previous
+        ok = np.isfinite(ratio) & (ratio > 0)
+        np.add.at(log_price, rows[dividend][ok], np.log(ratio[ok]))
+
+    return pd.DataFrame({
+        "Price Factor": np.exp(np.cumsum(log_price[::-1])[::-1]),
+        "Volume Factor": np.exp(np.cumsum(log_volume[::-1])[::-1]),
+    }, index=close.index)
+
+
+class AdjustedStore:
+    """
+    Raw bars + corporate action events, adjusted lazily on read
+    """
+
+    def __init__(self, root: str = "adjusted_store"):
+        self.root = root
+        os.makedirs(os.path.join(root, "raw"), exist_ok=True)
+        os.makedirs(os.path.join(root, "factors"), exist_ok=True)
+        self._events = None
+        self._stored = None
+
+    def _path(self, kind: str, ticker: str) -> str:
+        return os.path.join(self.root, kind, f"{ticker.replace('/', '_')}.parquet")
+
+    @staticmethod
+    def _write(frame: pd.DataFrame, path: str):
+        tmp = path + ".tmp"
+        frame.to_parquet(tmp)
+        os.replace(tmp, path)
+
+    @property
+    def events(self) -> pd.DataFrame:
+        if self._events is None:
+            path = os.path.join(self.root, "events.parquet")
+            self._events = (pd.read_parquet(path) if os.path.exists(path)
+                            else _empty_events())
+        return self._events
+
+    @property
+    def stored(self) -> Dict[str, pd.Timestamp]:
+        """
+        The date the raw history of each ticker was first stored
+        """
+        if self._stored is None:
+            path = os.path.join(self.root, "stored.json")
+            stored = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    stored = json.load(f)
+            self._stored = {t: pd.Timestamp(d) for t, d in stored.items()}
+        return self._stored
+
+    def _save_stored(self):
+        path = os.path.join(self.root, "stored.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({t: d.isoformat() for t, d in self.stored.items()}, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+    def raw(self, ticker: str) -> Optional[pd.DataFrame]:
+        """
+        Raw bars of a ticker, None if not stored
+
+        Parameters:
+            ticker (str): The ticker symbol
+        """
+        path = self._path("raw", ticker)
+        return pd.read_parquet(path) if os.path.exists(path) else None
+
+    def write_raw(self, ticker: str, frame: pd.DataFrame):
+        """
+        Merge new raw bars into the store and refresh the factors of the ticker. The
+        stored bars are kept: a re-download overlapping them may already be adjusted for
+        a split recorded since, and would then be adjusted twice.
+
+        Parameters:
+            ticker (str): The ticker symbol
+            frame (pd.DataFrame): The raw OHLCV bars (Date index)
+        """
+        frame = frame.drop(columns=["Ticker", "Adj Close", "Dividends", "Stock Splits"], errors="ignore")
+        cached = self.raw(ticker)
+        if cached is not None:
+            frame = pd.concat([cached, frame])
+            frame = frame[~frame.index.duplicated(keep="first")]
+        frame = frame.sort_index()
+        frame.index.name = "Date"
+        self._write(frame, self._path("raw", ticker))
+        if ticker not in self.stored:
+            self.stored[ticker] = pd.Timestamp.now().normalize()
+            self._save_stored()
+        self.refresh_factors([ticker])
+
+    def add_events(self, events: pd.DataFrame):
+        """
+        Record split / dividend events; only the factors of their tickers are recomputed
+
+        Parameters:
+            events (pd.DataFrame): Columns Date, Ticker, Type ("split" or "dividend"), Value
+        """
+        events = events[EVENT_COLUMNS].copy()
+        events["Date"] = pd.to_datetime(events["Date"])
+        events["Type"] = events["Type"].str.lower()
+        bad = ~events["Type"].isin(["split", "dividend"])
+        if bad.any():
+            raise ValueError(f"Unknown event types: {events.loc[bad, 'Type'].unique().tolist()}")
+
+        events["Value"] = events["Value"].astype(float)
+        merged = pd.concat([self.events, events], ignore_index=True) if len(self.events) else events
+        merged = merged.drop_duplicates(["Date", "Ticker", "Type"], keep="last")
+        merged = merged.sort_values(["Ticker", "Date"], ignore_index=True)
+        self._write(merged, os.path.join(self.root, "events.parquet"))
+        self._events = merged
+        self.refresh_factors(events["Ticker"].unique().tolist())
+
+    def refresh_factors(self, tickers: List[str]):
+        """
+        Recompute and save the factor file of each ticker
+
+        Parameters:
+            tickers: the tickers list
+        """
+        events = self.events
+        for ticker in tickers:
+            raw = self.raw(ticker)
+            if raw is None:
+                continue
+            factors = adjustment_factors(raw["Close"], events[events["Ticker"] == ticker])
+            self._write(factors, self._path("factors", ticker))
+
+    def read(self, ticker: str, adjusted: bool = True) -> Optional[pd.DataFrame]:
+        """
+        Bars of a ticker, adjusted with the stored factors
+
+        Parameters:
+            ticker (str): The ticker symbol
+            adjusted (bool): False returns the raw bars
+        """
+        raw = self.raw(ticker)
+        if raw is None or not adjusted:
+            return raw
+        path = self._path("factors", ticker)
+        if not os.path.exists(path):
+            self.refresh_factors([ticker])
+        factors = pd.read_parquet(path).reindex(raw.index).fillna(1.0)
+
+        out = raw.copy()
+        prices = [c for c in PRICE_COLUMNS if c in out.columns]
+        out[prices] = out[prices].mul(factors["Price Factor"], axis=0)
+        if "Volume" in out.columns:
+            out["Volume"] = out["Volume"] * factors["Volume Factor"]
+        return out
+
+    def load(self, tickers: List[str], adjusted: bool = True) -> Dict[str, pd.DataFrame]:
+        """
+        Bars of several tickers, in the format of PriceCache.load
+
+        Parameters:
+            tickers: the tickers list
+            adjusted (bool): False returns the raw bars
+        """
+        frames = {t: self.read(t, adjusted) for t in tickers}
+        return {t: f for t, f in frames.items() if f is not None}
+
+
+def events_from_yahoo(tickers: List[str], stored: Optional[Dict[str, pd.Timestamp]] = None,
+                      include_splits: bool = False) -> pd.DataFrame:
+    """
+    Split and dividend events of Yahoo Finance in the format of AdjustedStore.add_events.
+
+    Yahoo's unadjusted "Close" (auto_adjust=False) is split-adjusted for the splits
+    before the download, so a split is only recorded when it is dated after the raw
+    history of its ticker was first stored (AdjustedStore.stored): the bars cached
+    before it still hold the pre-split prices.
+
+        events = events_from_yahoo(tickers, store.stored)
+        store.add_events(events)
+
+    Parameters:
+        tickers: the tickers list
+        stored: The date the raw history of each ticker was first stored
+        include_splits (bool): Record all the splits, for truly raw sources
+    """
+    stored = stored or {}
+    import yfinance as yf
+
+    parts = []
+    for ticker in tickers:
+        actions = yf.Ticker(ticker).actions
+        if actions is None or actions.empty:
+            continue
+        actions.index = actions.index.tz_localize(None)
+        for column, kind in (("Dividends", "dividend"), ("Stock Splits", "split")):
+            values = actions[column][actions[column] > 0]
+            if kind == "split" and not include_splits:
+                since = stored.get(ticker)
+                values = values[values.index > since] if since is not None else values.iloc[:0]
+            parts.append(pd.DataFrame({"Date": values.index, "Ticker": ticker, "Type": kind,
+                                       "Value": values.to_numpy()}))
+    return pd.concat(parts, ignore_index=True) if parts else _empty_events()
@@ -0,0 +1,165 @@
+"""
+Streamlit front end of the portfolio and indicator functions.
+
+    streamlit run app.py
+
+The downloads go through the local PriceCache and st.cache_data, keyed by
+ticker / period / interval, and the indicators are cached per ticker and
+parameters, so changing a widget only recomputes what it affects. The charts are
+downsampled with LTTB before being sent to Plotly.
+"""
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from Portfolio import last_price
+from cache import PriceCache
+from downsample import downsample, lttb_indices
+from fetcher import period_first_date
+from indicators import bollinger, ichimoku, rsi
+
+PERIODS = ["1mo", "3mo", "6mo", "1y", "2y", "5y", "6y", "10y", "20y"]
+INTERVALS = ["1d", "1wk", "1mo", "1h", "15m"]
+# Yahoo only serves the last 730 days of hourly bars ("2y" can be a day over, hence "1y")
+# and the last 60 days of 15 minute bars
+MAX_PERIODS = {"1h": "1y", "15m": "1mo"}
+
+
+@st.cache_resource
+def get_cache(root: str = "price_cache") -> PriceCache:
+    return PriceCache(root)
+
+
+def periods_of(interval: str) -> list:
+    """
+    The periods Yahoo serves for an interval
+    """
+    if interval not in MAX_PERIODS:
+        return PERIODS
+    return PERIODS[:PERIODS.index(MAX_PERIODS[interval]) + 1]
+
+
+@st.cache_data(ttl=15 * 60, show_spinner="Loading prices...")
+def load_ticker(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    """
+    Bars of one ticker over the period: only the bars missing from the local cache are downloaded
+    """
+    frames = get_cache().update([ticker], period=period, interval=interval)
+    if ticker not in frames:
+        return pd.DataFrame()
+    frame = frames[ticker]
+    return frame[frame.index >= period_first_date(period, frame.index[-1])]
+
+
+@st.cache_data(ttl=15 * 60, show_spinner=False)
+def compute_indicators(ticker: str, period: str, interval: str, tenkan: int, kijun: int, senkou_b: int,
+                       rsi_period: int, bb_window: int) -> pd.DataFrame:
+    """
+    Ichimoku, RSI and Bollinger columns of one ticker
+    """
+    frame = load_ticker(ticker, period, interval)
+    if frame.empty:
+        return frame
+    high, low, close = (frame[[c]].rename(columns={c: ticker}) for c in ("High", "Low", "Close"))
+    lines = ichimoku(high, low, close, tenkan, kijun, senkou_b, kijun)
+    bands = bollinger(close, bb_window)
+    out = frame.copy()
+    for name, values in lines.items():
+        out[name] = values[ticker]
+    for name in ("Upper", "Lower"):
+        out[f"BB {name}"] = bands[name][ticker]
+    out["RSI"] = rsi(close, rsi_period)[ticker]
+    return out
+
+
+def price_figure(df: pd.DataFrame, ticker: str, max_points: int, show_cloud: bool,
+                 show_bands: bool) -> go.Figure:
+    df = downsample(df, max_points)
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(x=df.index, open=df["Open"], high=df["High"], low=df["Low"],
+                                 close=df["Close"], name=ticker))
+    if show_cloud:
+        fig.add_trace(go.Scatter(x=df.index, y=df["Tenkan"], name="Tenkan", line=dict(width=1)))
+        fig.add_trace(go.Scatter(x=df.index, y=df["Kijun"], name="Kijun", line=dict(width=1)))
+        fig.add_trace(go.Scatter(x=df.index, y=df["Senkou A"], name="Senkou A",
+                                 line=dict(width=0.5, color="rgba(0,150,0,0.6)")))
+        fig.add_trace(go.Scatter(x=df.index, y=df["Senkou B"], name="Senkou B", fill="tonexty",
+                                 line=dict(width=0.5, color="rgba(200,0,0,0.6)"),
+                                 fillcolor="rgba(120,120,120,0.2)"))
+    if show_bands:
+        fig.add_trace(go.Scatter(x=df.index, y=df["BB Upper"], name="BB Upper", line=dict(dash="dot")))
+        fig.add_trace(go.Scatter(x=df.index, y=df["BB Lower"], name="BB Lower", line=dict(dash="dot")))
+    fig.update_layout(
+        title=f"{ticker} — Stock Price",
+        template="plotly_white",
+        hovermode="x unified",
+        xaxis_rangeslider_visible=False,
+        height=600,
+    )
+    return fig
+
+
+def rsi_figure(df: pd.DataFrame, max_points: int) -> go.Figure:
+    series = df["RSI"].dropna()
+    series = series.iloc[lttb_indices(series.to_numpy(), max_points, series.index.asi8)]
+    fig = go.Figure(go.Scatter(x=series.index, y=series, name="RSI"))
+    fig.add_hline(y=70, line_dash="dot")
+    fig.add_hline(y=30, line_dash="dot")
+    fig.update_layout(template="plotly_white", height=220, yaxis_range=[0, 100], margin=dict(t=20))
+    return fig
+
+
+def main():
+    st.set_page_config(page_title="Ichimoku portfolio", layout="wide")
+    st.sidebar.header("Data")
+    raw = st.sidebar.text_input("Tickers", "AAPL, MSFT, NVDA")
+    tickers = [t.strip().upper() for t in raw.split(",") if t.strip()]
+    interval = st.sidebar.selectbox("Interval", INTERVALS)
+    periods = periods_of(interval)
+    default = periods.index("6y") if "6y" in periods else len(periods) - 1
+    period = st.sidebar.selectbox("Period", periods, index=default)
+
+    st.sidebar.header("Indicators")
+    tenkan = st.sidebar.number_input("Tenkan", 2, 100, 9)
+    kijun = st.sidebar.number_input("Kijun", 2, 200, 26)
+    senkou_b = st.sidebar.number_input("Senkou B", 2, 300, 52)
+    rsi_period = st.sidebar.number_input("RSI period", 2, 100, 14)
+    bb_window = st.sidebar.number_input("Bollinger window", 2, 200, 20)
+    show_cloud = st.sidebar.checkbox("Ichimoku cloud", True)
+    show_bands = st.sidebar.checkbox("Bollinger Bands", False)
+    max_points = st.sidebar.slider("Chart points", 200, 5000, 2000, step=100)
+
+    if not tickers:
+        st.info("Enter at least one ticker.")
+        return
+
+    tabs = st.tabs(tickers + ["Portfolio"])
+    for tab, ticker in zip(tabs, tickers):
+        with tab:
+            df = compute_indicators(ticker, period, interval, tenkan, kijun, senkou_b, rsi_period, bb_window)
+            if df.empty:
+                st.warning(f"No data found for {ticker}")
+                continue
+            st.plotly_chart(price_figure(df, ticker, max_points, show_cloud, show_bands), width="stretch")
+            st.plotly_chart(rsi_figure(df, max_points), width="stretch")
+
+    with tabs[-1]:
+        frames = {t: load_ticker(t, period, interval) for t in tickers}
+        closes = {t: f["Close"] for t, f in frames.items() if not f.empty}
+        if not closes:
+            return
+        close = pd.DataFrame(closes).ffill()
+        cols = st.columns(min(len(closes), 6))
+        shares = pd.Series({t: cols[i % len(cols)].number_input(f"{t} shares", 0.0, value=0.0, key=f"shares_{t}")
+                            for i, t in enumerate(closes)}, name="shares")
+        price, position_value, total_value = last_price(close, shares)
+        st.dataframe(pd.DataFrame({"Price": price.round(2), "Shares": shares, "Value": position_value}))
+        st.metric("Total value", f"{total_value:,.2f}")
+        if total_value > 0:
+            value = (close * shares.reindex(close.columns).fillna(0)).sum(axis=1).rename("Value").to_frame()
+            value = downsample(value, max_points, "Value")
+            st.line_chart(value)
+
+
+main()
@@ -0,0 +1,225 @@
+"""
+Vectorized backtest of the Ichimoku strategy.
+
+The Ichimoku conditions are boolean (dates x tickers) matrices; the positions, the
+trades, the fees and slippage and the P&L are computed with array operations over
+all the tickers and dates at once, without an event loop per bar.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+from indicators import ichimoku_lines, shift
+from matrices import ohlc_matrices
+
+
+def ichimoku_signal_arrays(close: np.ndarray, lines: Dict[str, np.ndarray],
+                           displacement: int = 26) -> Dict[str, np.ndarray]:
+    """
+    Boolean Ichimoku conditions from precomputed lines, all known at the close of each bar
+
+    Parameters:
+        close (np.ndarray): The (dates, tickers) close prices
+        lines: The output of indicators.ichimoku_lines
+        displacement (int): The Chikou displacement
+    """
+    tenkan, kijun = lines["Tenkan"], lines["Kijun"]
+    top = np.fmax(lines["Senkou A"], lines["Senkou B"])
+    bottom = np.fmin(lines["Senkou A"], lines["Senkou B"])
+
+    with np.errstate(invalid="ignore"):
+        tk_above = tenkan > kijun
+        tk_below = tenkan < kijun
+        tk_above_before = np.zeros_like(tk_above)
+        tk_above_before[1:] = tk_above[:-1]
+        tk_below_before = np.zeros_like(tk_below)
+        tk_below_before[1:] = tk_below[:-1]
+        # a cross needs a previous bar with both lines to cross from
+        valid_before = np.zeros_like(tk_above)
+        valid_before[1:] = ~np.isnan(tenkan[:-1]) & ~np.isnan(kijun[:-1])
+
+        signals = {
+            "TK Cross Up": tk_above & valid_before & ~tk_above_before,
+            "TK Cross Down": tk_below & valid_before & ~tk_below_before,
+            "Above Cloud": close > top,
+            "Below Cloud": close < bottom,
+            # the Chikou line at the current close is compared to the price it is plotted against
+            "Chikou Confirm": close > shift(close, displacement),
+        }
+    signals["Entry"] = signals["TK Cross Up"] & signals["Above Cloud"] & signals["Chikou Confirm"]
+    signals["Exit"] = signals["TK Cross Down"] | signals["Below Cloud"]
+    return signals
+
+
+def ichimoku_signals(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame,
+                     tenkan: int = 9, kijun: int = 26, senkou_b: int = 52,
+                     displacement: int = 26) -> Dict[str, pd.DataFrame]:
+    """
+    Boolean Ichimoku conditions for every ticker of the wide matrices
+
+    Parameters:
+        high, low, close (pd.DataFrame): dates x tickers matrices, shaped like close_matrix
+        tenkan, kijun, senkou_b, displacement (int): The Ichimoku windows
+    """
+    high = high.reindex(index=close.index, columns=close.columns).to_numpy(dtype=float)
+    low = low.reindex(index=close.index, columns=close.columns).to_numpy(dtype=float)
+    values = close.to_numpy(dtype=float)
+    lines = ichimoku_lines(high, low, values, tenkan, kijun, senkou_b, displacement)
+    signals = ichimoku_signal_arrays(values, lines, displacement)
+    return {name: pd.DataFrame(s, index=close.index, columns=close.columns) for name, s in signals.items()}
+
+
+def positions_from_signals(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """
+    Long/flat positions: 1 from an entry until the next exit. An exit on the same bar
+    as an entry wins.
+
+    Parameters:
+        entries, exits (np.ndarray): Boolean (dates, tickers) arrays
+    """
+    entries = np.asarray(entries, dtype=bool)
+    exits = np.asarray(exits, dtype=bool)
+    event = entries | exits
+    rows = np.arange(len(event))[:, None]
+    last_event = np.maximum.accumulate(np.where(event, rows, -1), axis=0)
+    cols = np.arange(event.shape[1])[None, :]
+    state = (entries & ~exits)[np.maximum(last_event, 0), cols]
+    return np.where(last_event >= 0, state, False).astype(float)
+
+
+def backtest_arrays(close: np.ndarray, entries: np.ndarray, exits: np.ndarray, fee_bps: float = 5.0,
+                    slippage_bps: float = 5.0, lag: int = 1) -> Dict[str, np.ndarray]:
+    """
+    Positions, trades, costs and P&L arrays of a long/flat strategy
+
+    Parameters:
+        close (np.ndarray): The (dates, tickers) close prices
+        entries, exits (np.ndarray): Boolean (dates, tickers) signals known at the close
+        fee_bps (float): The fees per trade, in basis points of the traded value
+        slippage_bps (float): The slippage per trade, in basis points of the traded value
+        lag (int): The number of bars between a signal and the position
+    """
+    close = np.asarray(close, dtype=float)
+    prices = pd.DataFrame(close).ffill().to_numpy()
+    returns = np.zeros_like(prices)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = prices[1:] / prices[:-1] - 1
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    positions = np.nan_to_num(shift(positions_from_signals(entries, exits), lag), nan=0.0)
+    trades = np.diff(positions, axis=0, prepend=0.0)
+    costs = np.abs(trades) * (fee_bps + slippage_bps) / 1e4
+    gross = positions * returns
+    return {
+        "Positions": positions,
+        "Trades": trades,
+        "Gross": gross,
+        "Costs": costs,
+        "PnL": gross - costs,
+    }
+
+
+def listed_mask(close: np.ndarray) -> np.ndarray:
+    """
+    (dates, tickers) True from the first to the last price of each ticker
+
+    Parameters:
+        close (np.ndarray): The (dates, tickers) close prices
+    """
+    priced = ~np.isnan(np.asarray(close, dtype=float))
+    return np.logical_or.accumulate(priced, axis=0) & np.logical_or.accumulate(priced[::-1], axis=0)[::-1]
+
+
+def portfolio_pnl(pnl: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    P&L of the portfolio splitting its capital equally between the valid tickers of
+    each date (0 on the dates without any)
+
+    Parameters:
+        pnl (np.ndarray): The (dates, tickers) strategy returns
+        valid (np.ndarray): (dates, tickers) True where a ticker can be held
+    """
+    count = valid.sum(axis=1)
+    total = np.where(valid, pnl, 0.0).sum(axis=1)
+    return np.divide(total, count, out=np.zeros(len(total)), where=count > 0)
+
+
+def summarize(pnl: np.ndarray, trades: np.ndarray, periods_per_year: int = 252) -> Dict[str, np.ndarray]:
+    """
+    Total return, annualized Sharpe ratio, maximum drawdown and number of trades
+    (entries) per column
+
+    Parameters:
+        pnl (np.ndarray): The (dates, columns) strategy returns
+        trades (np.ndarray): The (dates, columns) position changes
+        periods_per_year (int): 252 for daily data
+    """
+    equity = np.cumprod(1 + pnl, axis=0)
+    vol = pnl.std(axis=0, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(vol > 0, pnl.mean(axis=0) / vol * np.sqrt(periods_per_year), np.nan)
+    drawdown = 1 - equity / np.maximum.accumulate(equity, axis=0)
+    return {
+        "Total Return": equity[-1] - 1,
+        "Sharpe": sharpe,
+        "Max Drawdown": drawdown.max(axis=0),
+        "Trades": (trades > 0).sum(axis=0),
+    }
+
+
+def backtest(close: pd.DataFrame, entries: pd.DataFrame, exits: pd.DataFrame, fee_bps: float = 5.0,
+             slippage_bps: float = 5.0, lag: int = 1, mask: Optional[pd.DataFrame] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Backtest a long/flat strategy on every ticker at once. The portfolio splits its
+    capital equally between the tickers valid on each date.
+
+    Parameters:
+        close (pd.DataFrame): The dates x tickers close prices
+        entries, exits (pd.DataFrame): Boolean dates x tickers signals
+        fee_bps (float): The fees per trade, in basis points of the traded value
+        slippage_bps (float): The slippage per trade, in basis points of the traded value
+        lag (int): The number of bars between a signal and the position
+        mask (pd.DataFrame): The dates on which each ticker is valid (calendars.align),
+            from its first to its last price by default
+    """
+    entries = entries.reindex(index=close.index, columns=close.columns, fill_value=False)
+    exits = exits.reindex(index=close.index, columns=close.columns, fill_value=False)
+    result = backtest_arrays(close.to_numpy(), entries.to_numpy(), exits.to_numpy(),
+                             fee_bps, slippage_bps, lag)
+
+    frames = {name: pd.DataFrame(values, index=close.index, columns=close.columns)
+              for name, values in result.items()}
+    valid = (mask.reindex(index=close.index, columns=close.columns, fill_value=False).to_numpy(dtype=bool)
+             if mask is not None else listed_mask(close.to_numpy()))
+    portfolio = portfolio_pnl(result["PnL"], valid)
+    frames["Portfolio"] = pd.DataFrame({
+        "PnL": portfolio,
+        "Equity": np.cumprod(1 + portfolio),
+    }, index=close.index)
+
+    stats = summarize(result["PnL"], result["Trades"])
+    frames["Summary"] = pd.DataFrame(stats, index=close.columns)
+    return frames
+
+
+def ichimoku_backtest(df: pd.DataFrame, tenkan: int = 9, kijun: int = 26, senkou_b: int = 52,
+                      displacement: int = 26, **costs) -> Dict:
+    """
+    Backtest the Ichimoku strategy on the long dataframe returned by final_df.
+    Entry: Tenkan crosses above Kijun, close above the cloud and Chikou confirmation.
+    Exit: Tenkan crosses below Kijun or close below the cloud.
+
+    Parameters:
+        df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        tenkan, kijun, senkou_b, displacement (int): The Ichimoku windows
+        costs: fee_bps, slippage_bps, lag (see backtest)
+
+    Returns the frames of backtest plus the signal matrices under "Signals"
+    """
+    wide = ohlc_matrices(df, ["High", "Low", "Close"])
+    signals = ichimoku_signals(wide["High"], wide["Low"], wide["Close"],
+                               tenkan, kijun, senkou_b, displacement)
+    result = backtest(wide["Close"], signals["Entry"], signals["Exit"], **costs)
+    result["Signals"] = signals
+    return result
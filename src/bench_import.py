@@ -0,0 +1,48 @@
+"""
+Import-time benchmark of Portfolio.py: imports the module in fresh interpreters and
+fails when the median time goes over the budget.
+
+    python bench_import.py [--budget 1.0] [--runs 5] [--module Portfolio]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+def import_time(module: str) -> float:
+    """
+    Wall time of `import module` in a fresh interpreter, minus the interpreter startup
+
+    Parameters:
+        module (str): The module to import
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=here, check=True)
+        return time.perf_counter() - start
+
+    return run(f"import {module}") - run("pass")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of a module")
+    parser.add_argument("--module", default="Portfolio")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    times = [import_time(args.module) for _ in range(args.runs)]
+    median = statistics.median(times)
+    print(f"import {args.module}: median {median:.3f}s, min {min(times):.3f}s (budget {args.budget:.3f}s)")
+    if median > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Local price cache: one Parquet file per ticker and interval, plus an index of the
+last cached bar of each ticker. A refresh only downloads the bars newer than the
+cache and merges them in; the whole period is downloaded again only when it starts
+before the history already requested for the ticker (a longer period).
+
+Layout:
+    <root>/<interval>/<ticker>.parquet
+    <root>/<interval>/index.json     {ticker: last bar timestamp}
+    <root>/<interval>/history.json   {ticker: first date of the longest period requested}
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from fetcher import Provider, fetch_frames, period_first_date
+
+# the first bar of a period can be a few days after its start (weekends, holidays)
+HISTORY_SLACK = pd.Timedelta(days=7)
+
+
+def _naive(timestamp: pd.Timestamp) -> pd.Timestamp:
+    return timestamp.tz_convert(None) if timestamp.tz is not None else timestamp
+
+
+class PriceCache:
+    """
+    Per-ticker Parquet cache keyed by ticker and interval
+    """
+
+    def __init__(self, root: str = "price_cache", max_workers: int = 16):
+        self.root = root
+        self.max_workers = max_workers
+        self._indexes = {}
+
+    def _dir(self, interval: str) -> str:
+        path = os.path.join(self.root, interval)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _path(self, ticker: str, interval: str) -> str:
+        name = ticker.replace("/", "_").replace(os.sep, "_")
+        return os.path.join(self._dir(interval), f"{name}.parquet")
+
+    def _index(self, interval: str, name: str = "index") -> Dict[str, str]:
+        if (interval, name) not in self._indexes:
+            path = os.path.join(self._dir(interval), f"{name}.json")
+            index = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    index = json.load(f)
+            self._indexes[interval, name] = index
+        return self._indexes[interval, name]
+
+    def save_index(self, interval: str):
+        """
+        Write the index of the last cached bars and of the requested histories of an interval
+
+        Parameters:
+            interval (str): The interval of the data
+        """
+        for name in ("index", "history"):
+            path = os.path.join(self._dir(interval), f"{name}.json")
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self._index(interval, name), f, indent=1, sort_keys=True)
+            os.replace(tmp, path)
+
+    def last_bar(self, ticker: str, interval: str = "1d") -> Optional[pd.Timestamp]:
+        """
+        Timestamp of the last cached bar of a ticker, None if not cached
+
+        Parameters:
+            ticker (str): The ticker symbol
+            interval (str): The interval of the data
+        """
+        last = self._index(interval).get(ticker)
+        return pd.Timestamp(last) if last is not None else None
+
+    def history_start(self, ticker: str, interval: str = "1d") -> Optional[pd.Timestamp]:
+        """
+        First date of the longest period requested for a ticker (naive UTC), the first
+        cached bar for a cache written before this was recorded, None if not cached
+
+        Parameters:
+            ticker (str): The ticker symbol
+            interval (str): The interval of the data
+        """
+        start = self._index(interval, "history").get(ticker)
+        if start is not None:
+            return pd.Timestamp(start)
+        frame = self.read(ticker, interval)
+        if frame is None or frame.empty:
+            return None
+        return _naive(pd.Timestamp(frame.index[0])) - HISTORY_SLACK
+
+    def read(self, ticker: str, interval: str = "1d") -> Optional[pd.DataFrame]:
+        """
+        Read the cached bars of a ticker, None if not cached
+
+        Parameters:
+            ticker (str): The ticker symbol
+            interval (str): The interval of the data
+        """
+        if ticker not in self._index(interval):
+            return None
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def load(self, tickers: List[str], interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        """
+        Read the cached bars of several tickers in parallel
+
+        Parameters:
+            tickers: the tickers list
+            interval (str): The interval of the data
+        """
+        tickers = [t for t in tickers if t in self._index(interval)]
+        if not tickers:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            frames = pool.map(lambda t: self.read(t, interval), tickers)
+        return {t: f for t, f in zip(tickers, frames) if f is not None}
+
+    def write(self, ticker: str, frame: pd.DataFrame, interval: str = "1d", save_index: bool = True):
+        """
+        Merge new bars into the cached bars of a ticker. Bars with an already cached
+        timestamp replace the cached ones (the last bar may have been partial).
+
+        Parameters:
+            ticker (str): The ticker symbol
+            frame (pd.DataFrame): The new bars (Date index)
+            interval (str): The interval of the data
+            save_index (bool): Write the index file now
+        """
+        if frame is None or frame.empty:
+            return
+        if isinstance(frame.columns, pd.MultiIndex):
+            frame = frame.droplevel(-1, axis=1)
+        frame = frame.drop(columns="Ticker", errors="ignore")
+
+        cached = self.read(ticker, interval)
+        if cached is not None:
+            frame = pd.concat([cached, frame])
+            frame = frame[~frame.index.duplicated(keep="last")]
+        frame = frame.sort_index()
+        frame.index.name = "Date"
+
+        path = self._path(ticker, interval)
+        tmp = path + ".tmp"
+        frame.to_parquet(tmp)
+        os.replace(tmp, path)
+
+        self._index(interval)[ticker] = frame.index[-1].isoformat()
+        if save_index:
+            self.save_index(interval)
+
+    def update(self, tickers: List[str], provider: Optional[Provider] = None, period: str = "6y",
+               interval: str = "1d", **fetch_options) -> Dict[str, pd.DataFrame]:
+        """
+        Download only the bars newer than the cache, merge them in, and return the
+        full cached bars of every ticker. The tickers not cached yet, or cached for a
+        shorter period, are downloaded over the whole period.
+
+        Parameters:
+            tickers: the tickers list
+            provider (Provider): The data source, Yahoo Finance by default
+            period: the period of the data
+            interval: the interval of the data
+            fetch_options: batch_size, max_workers, retries, backoff (see fetch_frames)
+        """
+        wanted = period_first_date(period, pd.Timestamp.now())
+        starts = {}
+        for ticker in tickers:
+            last, first = self.last_bar(ticker, interval), self.history_start(ticker, interval)
+            if last is not None and first is not None and first <= wanted + HISTORY_SLACK:
+                starts[ticker] = last
+
+        new = fetch_frames(tickers, provider, period, interval, starts=starts, **fetch_options)
+        history = self._index(interval, "history")
+        for ticker, frame in new.items():
+            self.write(ticker, frame, interval, save_index=False)
+            if ticker not in starts:
+                history[ticker] = min(wanted, self.history_start(ticker, interval) or wanted).isoformat()
+        if new:
+            self.save_index(interval)
+        return self.load(tickers, interval)
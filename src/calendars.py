@@ -0,0 +1,245 @@
+"""
+Trading-calendar-aware alignment of a mixed-exchange universe.
+
+Instead of forward filling every ticker over the union of all the dates, each
+ticker gets a mask of the sessions of its exchange. The aligned matrix is built with
+one scatter of the bars into (dates x tickers) arrays; a ticker is only filled
+inside its own sessions (missing bars), never over the days its exchange is closed.
+The mask is passed to the returns and the indicators, which then work on the
+sessions of each ticker only.
+
+The sessions come from the `exchange_calendars` package when it is installed,
+otherwise they are inferred from the data: the weekdays on which at least one ticker
+of the exchange traded. A ticker of an unknown exchange (an index missing from
+INDICES, a currency or a future) gets the sessions inferred from its own bars.
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import exchange_calendars
+except ImportError:
+    exchange_calendars = None
+
+SUFFIXES = {
+    "": "XNYS",
+    "PA": "XPAR",
+    "AS": "XAMS",
+    "BR": "XBRU",
+    "DE": "XETR",
+    "F": "XFRA",
+    "L": "XLON",
+    "MI": "XMIL",
+    "MC": "XMAD",
+    "SW": "XSWX",
+    "ST": "XSTO",
+    "TO": "XTSE",
+    "T": "XTKS",
+    "HK": "XHKG",
+    "SS": "XSHG",
+    "SZ": "XSHE",
+    "AX": "XASX",
+    "KS": "XKRX",
+    "NS": "XNSE",
+    "BO": "XBOM",
+}
+
+INDICES = {
+    "^GSPC": "XNYS",
+    "^DJI": "XNYS",
+    "^IXIC": "XNYS",
+    "^NDX": "XNYS",
+    "^RUT": "XNYS",
+    "^VIX": "XNYS",
+    "^GSPTSE": "XTSE",
+    "^FTSE": "XLON",
+    "^FTMC": "XLON",
+    "^GDAXI": "XETR",
+    "^FCHI": "XPAR",
+    "^AEX": "XAMS",
+    "^BFX": "XBRU",
+    "^IBEX": "XMAD",
+    "^SSMI": "XSWX",
+    "^OMX": "XSTO",
+    "^N225": "XTKS",
+    "^HSI": "XHKG",
+    "^AXJO": "XASX",
+    "^KS11": "XKRX",
+    "^NSEI": "XNSE",
+    "^BSESN": "XBOM",
+}
+
+EXCHANGES = set(SUFFIXES.values()) | set(INDICES.values())
+
+
+def exchange_of(ticker: str) -> Optional[str]:
+    """
+    Exchange code (ISO 10383 MIC) of a Yahoo Finance ticker, from its suffix or the
+    INDICES table; None when the exchange is unknown
+
+    Parameters:
+        ticker (str): The ticker symbol, e.g. "AIR.PA"
+    """
+    if ticker.startswith("^"):
+        return INDICES.get(ticker.upper())
+    if ticker.endswith("=X") or ticker.endswith("=F"):
+        return None
+    suffix = ticker.rsplit(".", 1)[1].upper() if "." in ticker else ""
+    return SUFFIXES.get(suffix)
+
+
+@lru_cache(maxsize=64)
+def _calendar_sessions(exchange: str, start: pd.Timestamp, end: pd.Timestamp):
+    if exchange_calendars is None:
+        return None
+    try:
+        calendar = exchange_calendars.get_calendar(exchange)
+    except Exception:
+        return None
+    first = max(start, calendar.first_session)
+    last = min(end, calendar.last_session)
+    if first > last:
+        return None
+    return pd.DatetimeIndex(calendar.sessions_in_range(first, last)).tz_localize(None)
+
+
+def exchange_sessions(exchanges: pd.Series, dates: pd.DatetimeIndex,
+                      traded: np.ndarray) -> Dict[str, pd.DatetimeIndex]:
+    """
+    Sessions of each exchange over the dates of the data
+
+    Parameters:
+        exchanges (pd.Series): The exchange of each ticker (column of `traded`), or the
+            ticker itself when its exchange is unknown
+        dates (pd.DatetimeIndex): The union of the dates of the data
+        traded (np.ndarray): (dates, tickers) True where a ticker has a bar
+    """
+    sessions = {}
+    days = dates.normalize()
+    for exchange in exchanges.unique():
+        calendar = _calendar_sessions(exchange, days[0], days[-1]) if exchange in EXCHANGES else None
+        if calendar is not None:
+            sessions[exchange] = dates[days.isin(calendar)]
+        else:
+            any_bar = traded[:, (exchanges == exchange).to_numpy()].any(axis=1)
+            sessions[exchange] = dates[any_bar & (dates.dayofweek < 5)]
+    return sessions
+
+
+def align(df: pd.DataFrame, fields: List[str] = ("Close",)) -> Tuple[Dict[str, pd.DataFrame], pd.DataFrame]:
+    """
+    Aligned dates x tickers matrices and the mask of the sessions of each ticker
+
+    Parameters:
+        df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        fields: The columns to align
+
+    Returns the matrices (NaN outside the sessions of a ticker and outside its first to
+    last bar, missing bars inside its sessions forward filled) and the boolean mask
+    """
+    dates, rows = np.unique(df.index.values, return_inverse=True)
+    tickers, cols = np.unique(df["Ticker"].to_numpy(dtype=str), return_inverse=True)
+    dates = pd.DatetimeIndex(dates, name="Date")
+    columns = pd.Index(tickers, name="Ticker")
+
+    traded = np.zeros((len(dates), len(tickers)), dtype=bool)
+    traded[rows, cols] = True
+
+    exchanges = pd.Series([exchange_of(t) or t for t in tickers], index=columns)
+    sessions = exchange_sessions(exchanges, dates, traded)
+    in_session = np.column_stack([dates.isin(sessions[e]) for e in exchanges]) if len(tickers) else traded
+    listed = traded.any(axis=0)
+    first_bar = np.where(listed, traded.argmax(axis=0), len(dates))
+    # a delisted ticker (or one whose download stopped early) is not filled after its last bar
+    last_bar = np.where(listed, len(dates) - 1 - traded[::-1].argmax(axis=0), -1)
+    row = np.arange(len(dates))[:, None]
+    mask = in_session & (row >= first_bar) & (row <= last_bar)
+
+    matrices = {}
+    for field in fields:
+        values = np.full((len(dates), len(tickers)), np.nan)
+        values[rows, cols] = df[field].to_numpy(dtype=float)
+        filled = pd.DataFrame(np.where(mask, values, np.nan)).ffill().to_numpy()
+        matrices[field] = pd.DataFrame(np.where(mask, filled, np.nan), index=dates, columns=columns)
+
+    keep = mask.any(axis=1)
+    matrices = {field: m[keep] for field, m in matrices.items()}
+    return matrices, pd.DataFrame(mask[keep], index=dates[keep], columns=columns)
+
+
+def session_returns(close: pd.DataFrame, mask: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns of each ticker from one of its sessions to the next, NaN outside its sessions
+
+    Parameters:
+        close (pd.DataFrame): The aligned close prices
+        mask (pd.DataFrame): The sessions mask returned by align
+    """
+    values = close.to_numpy(dtype=float)
+    valid = mask.reindex_like(close).fillna(False).to_numpy(dtype=bool) & ~np.isnan(values)
+    rows = np.arange(len(values))[:, None]
+    last_valid = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+
+    previous = np.full(values.shape, -1)
+    previous[1:] = last_valid[:-1]
+    cols = np.arange(values.shape[1])[None, :]
+    base = np.where(previous >= 0, values[np.maximum(previous, 0), cols], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(valid, values / base - 1, np.nan)
+    return pd.DataFrame(returns, index=close.index, columns=close.columns)
+
+
+def session_order(mask: np.ndarray) -> np.ndarray:
+    """
+    Row order packing the sessions of each column to the top (one stable sort)
+
+    Parameters:
+        mask (np.ndarray): The (dates, tickers) sessions mask
+    """
+    return np.argsort(~np.asarray(mask, dtype=bool), axis=0, kind="stable")
+
+
+def pack(values: np.ndarray, mask: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """
+    The session values of each column moved to the top, NaN below
+
+    Parameters:
+        values (np.ndarray): The aligned (dates, tickers) values
+        mask (np.ndarray): The sessions mask
+        order (np.ndarray): The order returned by session_order
+    """
+    values = np.where(np.asarray(mask, dtype=bool), np.asarray(values, dtype=float), np.nan)
+    return np.take_along_axis(values, order, axis=0)
+
+
+def unpack(packed: np.ndarray, mask: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """
+    Scatter packed values back to their dates, NaN outside the sessions
+
+    Parameters:
+        packed (np.ndarray): The packed (dates, tickers) values
+        mask (np.ndarray): The sessions mask
+        order (np.ndarray): The order returned by session_order
+    """
+    out = np.full(packed.shape, np.nan)
+    np.put_along_axis(out, order, np.asarray(packed, dtype=float), axis=0)
+    return np.where(np.asarray(mask, dtype=bool), out, np.nan)
+
+
+def on_sessions(func: Callable[[np.ndarray], np.ndarray], values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Apply a (dates, tickers) kernel (rolling window, RSI...) to the sessions of each
+    ticker only: the kernel runs on the packed values and the result is scattered back,
+    so the windows count the sessions of the ticker, not the dates of the universe.
+
+    Parameters:
+        func: The kernel, (dates, tickers) array -> same shape array
+        values (np.ndarray): The aligned values
+        mask (np.ndarray): The sessions mask
+    """
+    order = session_order(mask)
+    return unpack(func(pack(values, mask, order)), mask, order)
@@ -0,0 +1,150 @@
+"""
+Headless batch rendering of the stock charts: candles, volume, moving averages
+(20/50/200) and the Ichimoku cloud, saved as PNG or SVG files with the Agg backend.
+
+The charts are rendered in parallel processes, and a chart is skipped when the hash
+of its data and settings is the one recorded in the manifest at the last render.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+import pandas as pd
+
+from indicators import ichimoku
+
+MANIFEST = "manifest.json"
+
+
+def data_hash(frame: pd.DataFrame, **settings) -> str:
+    """
+    Hash of the bars and the chart settings
+
+    Parameters:
+        frame (pd.DataFrame): The OHLCV bars of one ticker
+        settings: The options changing the picture
+    """
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def render_chart(frame: pd.DataFrame, ticker: str, path: str, tenkan: int = 9, kijun: int = 26,
+                 senkou_b: int = 52, mav=(20, 50, 200), figsize=(13, 7)):
+    """
+    Render one candle + volume + moving averages + Ichimoku cloud chart to a file
+
+    Parameters:
+        frame (pd.DataFrame): The OHLCV bars of the ticker (Date index)
+        ticker (str): The ticker symbol, used in the title
+        path (str): The output file, the extension gives the format (.png, .svg)
+        tenkan, kijun, senkou_b (int): The Ichimoku windows (the displacement is kijun)
+        mav: The moving average windows
+        figsize: The size of the figure in inches
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import mplfinance as mpf
+
+    frame = frame.sort_index()
+    high, low, close = (frame[[c]].rename(columns={c: ticker}) for c in ("High", "Low", "Close"))
+    lines = {name: values[ticker] for name, values in
+             ichimoku(high, low, close, tenkan, kijun, senkou_b, kijun).items()}
+
+    # short histories (recent listings, monthly bars) have all-NaN lines, which
+    # mplfinance cannot scale: leave them and the cloud out
+    styles = {"Tenkan": ("tab:blue", 0.8), "Kijun": ("tab:red", 0.8),
+              "Senkou A": ("tab:green", 0.5), "Senkou B": ("tab:orange", 0.5)}
+    addplots = [mpf.make_addplot(lines[name], color=color, width=width)
+                for name, (color, width) in styles.items() if lines[name].notna().any()]
+    options = {}
+    if addplots:
+        options["addplot"] = addplots
+    if lines["Senkou A"].notna().any() and lines["Senkou B"].notna().any():
+        options["fill_between"] = dict(y1=lines["Senkou A"].to_numpy(), y2=lines["Senkou B"].to_numpy(),
+                                       alpha=0.15, color="gray")
+    mav = tuple(w for w in mav if w < len(frame))
+    if mav:
+        options["mav"] = mav
+    fig, _ = mpf.plot(
+        frame,
+        type="candle",
+        style="yahoo",
+        volume="Volume" in frame.columns,
+        figsize=figsize,
+        tight_layout=True,
+        title=f"{ticker} Stock Price",
+        returnfig=True,
+        **options,
+    )
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def _render_task(task) -> str:
+    ticker, frame, path, options = task
+    try:
+        render_chart(frame, ticker, path, **options)
+        return "rendered"
+    except Exception as e:
+        return f"failed: {e}"
+
+
+def render_universe(frames: Dict[str, pd.DataFrame], out_dir: str, fmt: str = "png",
+                    n_workers: int = 4, force: bool = False, **options) -> pd.DataFrame:
+    """
+    Render the chart of every ticker whose data changed since the last render
+
+    Parameters:
+        frames: One OHLCV dataframe per ticker (for example PriceCache.load)
+        out_dir (str): The output directory, it also holds the manifest of hashes
+        fmt (str): "png" or "svg"
+        n_workers (int): The number of processes, 1 renders in the current process
+        force (bool): Render every chart even if its data did not change
+        options: tenkan, kijun, senkou_b, mav, figsize (see render_chart)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    status = {}
+    hashes = {}
+    tasks = []
+    for ticker, frame in frames.items():
+        frame = frame.dropna(how="all", subset=["Open", "High", "Low", "Close"])
+        if frame.empty:
+            status[ticker] = "no data"
+            continue
+        path = os.path.join(out_dir, f"{ticker.replace('/', '_')}.{fmt}")
+        hashes[ticker] = data_hash(frame, fmt=fmt, **options)
+        if not force and manifest.get(os.path.basename(path)) == hashes[ticker] and os.path.exists(path):
+            status[ticker] = "unchanged"
+            continue
+        tasks.append((ticker, frame, path, options))
+
+    if n_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(_render_task, tasks, chunksize=4))
+    else:
+        results = [_render_task(task) for task in tasks]
+
+    for (ticker, _, path, _), result in zip(tasks, results):
+        status[ticker] = result
+        if result == "rendered":
+            manifest[os.path.basename(path)] = hashes[ticker]
+        else:
+            manifest.pop(os.path.basename(path), None)
+
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, manifest_path)
+    return pd.Series(status, name="Status").rename_axis("Ticker").to_frame()
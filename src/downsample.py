@@ -0,0 +1,57 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling of a time series, to send a few
+thousand points to the browser instead of twenty years of intraday bars while
+keeping the visual shape of the curve.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(y: np.ndarray, n_out: int, x: np.ndarray = None) -> np.ndarray:
+    """
+    Positions of the points kept by LTTB (always the first and the last)
+
+    Parameters:
+        y (np.ndarray): The values of the series (NaN are replaced by the mean of the series)
+        n_out (int): The number of points to keep
+        x (np.ndarray): The x positions, the row numbers by default
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    y = np.nan_to_num(y, nan=np.nanmean(y) if np.isfinite(y).any() else 0.0)
+
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(df: pd.DataFrame, n_out: int = 2000, column: str = "Close") -> pd.DataFrame:
+    """
+    Keep the rows selected by LTTB on one column (all the columns keep the same rows)
+
+    Parameters:
+        df (pd.DataFrame): The time series, one row per bar
+        n_out (int): The number of rows to keep
+        column (str): The column driving the selection
+    """
+    if len(df) <= n_out:
+        return df
+    x = df.index.asi8 if isinstance(df.index, pd.DatetimeIndex) else None
+    return df.iloc[lttb_indices(df[column].to_numpy(), n_out, x)]
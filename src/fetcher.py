@@ -0,0 +1,211 @@
+"""
+Market data fetch layer.
+
+The tickers are requested in batches and the batches run concurrently on a bounded
+thread pool. The tickers missing once every batch is done are retried together, in
+batches again, after an exponential backoff; a batch whose request fails is split in
+halves so one bad ticker does not sink the others. The tickers still missing are
+logged. The data source is a provider object, so the Yahoo Finance
+download can be replaced by local frames (tests, replays) without any network.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class Provider:
+    """
+    Interface of a market data provider
+    """
+
+    def fetch(self, tickers: List[str], period: str = "6y", interval: str = "1d",
+              start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Return one OHLCV dataframe (Date index) per ticker found
+
+        Parameters:
+            tickers: The tickers of the batch
+            period: The period of the data, ignored when start is given
+            interval: The interval of the data
+            start: Only return the bars from this date
+        """
+        raise NotImplementedError
+
+
+class YahooProvider(Provider):
+    """
+    Yahoo Finance provider, one yf.download call per batch
+    """
+
+    def __init__(self, auto_adjust: bool = True):
+        self.auto_adjust = auto_adjust
+
+    def fetch(self, tickers, period="6y", interval="1d", start=None):
+        import yfinance as yf
+
+        kwargs = {"start": start} if start is not None else {"period": period}
+        data = yf.download(
+            tickers=list(tickers),
+            interval=interval,
+            group_by="ticker",
+            progress=False,
+            threads=False,
+            auto_adjust=self.auto_adjust,
+            **kwargs)
+
+        frames = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                raw = data[ticker]
+            else:
+                raw = data
+            raw = raw.dropna(how="all")
+            if not raw.empty:
+                frames[ticker] = raw
+        return frames
+
+
+class FrameProvider(Provider):
+    """
+    Provider serving dataframes already in memory (tests, offline replays)
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame]):
+        self.frames = frames
+
+    def fetch(self, tickers, period="6y", interval="1d", start=None):
+        frames = {}
+        for ticker in tickers:
+            if ticker not in self.frames:
+                continue
+            frame = self.frames[ticker]
+            first = start
+            if first is None and len(frame):
+                # the period ends at the last bar, not today: the frames can be a replay
+                first = period_first_date(period, frame.index[-1])
+            if first is not None:
+                frame = frame[frame.index >= first]
+            frames[ticker] = frame.copy()
+        return frames
+
+
+def period_first_date(period: str, end: pd.Timestamp) -> pd.Timestamp:
+    """
+    First date of a yfinance period ("5d", "6mo", "10y", "ytd", "max") ending at `end`
+
+    Parameters:
+        period (str): The period
+        end (pd.Timestamp): The end of the period
+    """
+    if period == "max":
+        return pd.Timestamp("1900-01-01", tz=end.tz)
+    if period == "ytd":
+        return end.normalize().replace(month=1, day=1)
+    if period.endswith("mo"):
+        return end - pd.DateOffset(months=int(period[:-2]))
+    number, unit = int(period[:-1]), period[-1]
+    if unit == "y":
+        return end - pd.DateOffset(years=number)
+    if unit == "d":
+        return end - pd.Timedelta(days=number)
+    raise ValueError(f"Unknown period {period}")
+
+
+def _fetch_batch(provider: Provider, batch: List[str], period: str, interval: str,
+                 start: Optional[pd.Timestamp]) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch one batch; a failed request is split in halves until the failing tickers are alone
+    """
+    try:
+        return provider.fetch(batch, period=period, interval=interval, start=start)
+    except Exception as e:
+        logger.warning("Request of %d tickers failed: %s", len(batch), e)
+    if len(batch) == 1:
+        return {}
+    half = len(batch) // 2
+    return {**_fetch_batch(provider, batch[:half], period, interval, start),
+            **_fetch_batch(provider, batch[half:], period, interval, start)}
+
+
+def fetch_frames(tickers: List[str], provider: Optional[Provider] = None, period: str = "6y",
+                 interval: str = "1d", batch_size: int = 50, max_workers: int = 8,
+                 retries: int = 3, backoff: float = 1.0,
+                 starts: Optional[Dict[str, pd.Timestamp]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Download the tickers in concurrent batches
+
+    Parameters:
+        tickers: the tickers list
+        provider (Provider): The data source, Yahoo Finance by default
+        period: the period of the data
+        interval: the interval of the data
+        batch_size (int): The number of tickers per request
+        max_workers (int): The number of batches running at the same time
+        retries (int): The number of retry passes over the missing tickers
+        backoff (float): The delay before the first retry pass in seconds, doubled at each pass
+        starts: Optional first date to fetch per ticker (incremental refresh);
+            tickers sharing the same start date are batched together
+
+    Returns the frames of the tickers found; the missing ones are logged as warnings
+    """
+    provider = provider or YahooProvider()
+    tickers = list(dict.fromkeys(tickers))
+    starts = starts or {}
+
+    frames = {}
+    missing = tickers
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        groups = {}
+        for ticker in missing:
+            groups.setdefault(starts.get(ticker), []).append(ticker)
+        jobs = [(group[i:i + batch_size], start)
+                for start, group in groups.items()
+                for i in range(0, len(group), batch_size)]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+            futures = [pool.submit(_fetch_batch, provider, batch, period, interval, start)
+                       for batch, start in jobs]
+            for future in futures:
+                frames.update(future.result())
+        missing = [t for t in missing if t not in frames]
+        if not missing:
+            break
+
+    if missing:
+        logger.warning("No data found for %d tickers: %s", len(missing), ", ".join(missing))
+    return frames
+
+
+def stack_frames(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Stack the per-ticker frames into the long dataframe (Date index, "Ticker" column)
+    and forward fill each ticker in one vectorized pass
+
+    Parameters:
+        frames: One OHLCV dataframe per ticker
+    """
+    if not frames:
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume", "Ticker"])
+
+    parts = []
+    for ticker, frame in frames.items():
+        frame = frame.sort_index()
+        if isinstance(frame.columns, pd.MultiIndex):
+            frame = frame.droplevel(-1, axis=1)
+        frame = frame.assign(Ticker=ticker)
+        frame.index.name = "Date"
+        parts.append(frame)
+
+    df = pd.concat(parts)
+    values = [c for c in df.columns if c != "Ticker"]
+    df[values] = df.groupby("Ticker", sort=False)[values].ffill()
+    return df.dropna(how="all", subset=values)
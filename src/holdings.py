@@ -0,0 +1,180 @@
+"""
+Non-interactive portfolio input for batch runs.
+
+The holdings of many portfolios are read from a CSV, JSON or Parquet file (columns
+Portfolio, Ticker, Shares), validated in bulk, valued against the last prices with
+one matrix product per chunk of portfolios, and streamed to one consolidated report.
+
+    python holdings.py holdings.csv --cache price_cache --out report.csv
+"""
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from reports import ReportWriter
+
+COLUMNS = ["Portfolio", "Ticker", "Shares"]
+REPORT_COLUMNS = ["Portfolio", "Ticker", "Shares", "Price", "Value", "Weight"]
+REPORT_FORMATS = {"Portfolio": "text", "Ticker": "text", "Shares": "number", "Price": "price",
+                  "Value": "money", "Weight": "percent"}
+
+
+def read_holdings(path: str) -> pd.DataFrame:
+    """
+    Read a holdings file, the format is given by the extension
+
+    Parameters:
+        path (str): A .csv, .json or .parquet file with the columns Portfolio, Ticker, Shares
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return pd.read_csv(path, sep=None, engine="python", dtype={"Portfolio": str, "Ticker": str})
+    if ext == ".json":
+        return pd.read_json(path, dtype={"Portfolio": str, "Ticker": str})
+    if ext in (".parquet", ".pq"):
+        return pd.read_parquet(path)
+    raise ValueError(f"Unsupported holdings format: {ext}")
+
+
+def validate_holdings(holdings: pd.DataFrame, prices: pd.Series = None,
+                      allow_short: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Check every row at once and return the valid holdings (duplicated Portfolio /
+    Ticker rows are summed) and the rejected rows with the reason
+
+    Parameters:
+        holdings (pd.DataFrame): The columns Portfolio, Ticker, Shares
+        prices (pd.Series): Optional last price per ticker, rows without a price are rejected
+        allow_short (bool): Accept negative numbers of shares
+    """
+    missing = set(COLUMNS) - set(holdings.columns)
+    if missing:
+        raise ValueError(f"Holdings columns missing: {sorted(missing)}")
+
+    df = holdings[COLUMNS].copy()
+    df["Portfolio"] = df["Portfolio"].astype("string").str.strip()
+    df["Ticker"] = df["Ticker"].astype("string").str.strip().str.upper()
+    raw_shares = df["Shares"].astype("string").str.strip().str.replace(",", ".", regex=False)
+    df["Shares"] = pd.to_numeric(raw_shares, errors="coerce")
+
+    reason = pd.Series("", index=df.index, dtype=object)
+    reason[df["Portfolio"].isna() | (df["Portfolio"] == "")] = "missing portfolio"
+    reason[(reason == "") & (df["Ticker"].isna() | (df["Ticker"] == ""))] = "missing ticker"
+    reason[(reason == "") & df["Shares"].isna()] = "invalid number of shares"
+    if not allow_short:
+        reason[(reason == "") & (df["Shares"] < 0)] = "negative number of shares"
+    if prices is not None:
+        reason[(reason == "") & ~df["Ticker"].isin(prices.dropna().index)] = "no price for ticker"
+
+    errors = holdings[reason != ""].assign(Reason=reason[reason != ""])
+    valid = (df[reason == ""]
+             .groupby(["Portfolio", "Ticker"], as_index=False, sort=True)["Shares"].sum())
+    valid["Portfolio"] = valid["Portfolio"].astype(str)
+    valid["Ticker"] = valid["Ticker"].astype(str)
+    return valid, errors
+
+
+def value_chunk(holdings: pd.DataFrame, prices: pd.Series) -> pd.DataFrame:
+    """
+    Value a chunk of portfolios: shares matrix (portfolios x tickers) times the price vector
+
+    Parameters:
+        holdings (pd.DataFrame): Valid holdings (Portfolio, Ticker, Shares)
+        prices (pd.Series): The last price per ticker
+    """
+    portfolios, rows = np.unique(holdings["Portfolio"].to_numpy(), return_inverse=True)
+    tickers, cols = np.unique(holdings["Ticker"].to_numpy(), return_inverse=True)
+    shares = np.zeros((len(portfolios), len(tickers)))
+    shares[rows, cols] = holdings["Shares"].to_numpy(dtype=float)
+
+    price = prices.reindex(tickers).to_numpy(dtype=float)
+    totals = shares @ price
+    values = shares[rows, cols] * price[cols]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(totals[rows] != 0, values / totals[rows], np.nan)
+
+    return pd.DataFrame({
+        "Portfolio": portfolios[rows],
+        "Ticker": tickers[cols],
+        "Shares": shares[rows, cols],
+        "Price": price[cols],
+        "Value": values,
+        "Weight": weights,
+    })
+
+
+def value_portfolios(holdings: pd.DataFrame, prices: pd.Series, out_path: str = None,
+                     chunk_size: int = 500, n_workers: int = 4) -> pd.DataFrame:
+    """
+    Value the portfolios in parallel chunks and stream the position rows to one report.
+    Returns the total value and number of positions of each portfolio.
+
+    Parameters:
+        holdings (pd.DataFrame): Valid holdings (see validate_holdings)
+        prices (pd.Series): The last price per ticker
+        out_path (str): Optional .csv, .parquet or .xlsx report of every position
+        chunk_size (int): The number of portfolios per chunk
+        n_workers (int): The number of chunks valued at the same time
+    """
+    holdings = holdings.sort_values("Portfolio", kind="stable")
+    codes, _ = pd.factorize(holdings["Portfolio"], sort=True)
+    bounds = np.searchsorted(codes, np.arange(0, codes.max() + 1 if len(codes) else 0, chunk_size))
+    bounds = list(bounds) + [len(holdings)]
+    chunks = [holdings.iloc[a:b] for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    summaries = []
+    writer = ReportWriter(out_path, REPORT_COLUMNS, REPORT_FORMATS, "Positions") if out_path else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, n_workers)) as pool:
+            for report in pool.map(lambda c: value_chunk(c, prices), chunks):
+                if writer is not None:
+                    writer.write(report)
+                summaries.append(report.groupby("Portfolio").agg(
+                    Positions=("Ticker", "size"), Value=("Value", "sum")))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if not summaries:
+        return pd.DataFrame(columns=["Positions", "Value"])
+    return pd.concat(summaries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Value many portfolios from a holdings file")
+    parser.add_argument("holdings", help="CSV, JSON or Parquet file with Portfolio, Ticker, Shares")
+    parser.add_argument("--cache", default="price_cache", help="price cache directory")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--refresh", action="store_true", help="download the new bars first")
+    parser.add_argument("--out", default="portfolio_report.csv", help=".csv, .parquet or .xlsx report")
+    parser.add_argument("--errors", default="holdings_errors.csv")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--allow-short", action="store_true")
+    args = parser.parse_args()
+
+    from cache import PriceCache
+
+    raw = read_holdings(args.holdings)
+    tickers = raw["Ticker"].astype(str).str.strip().str.upper().unique().tolist()
+    cache = PriceCache(args.cache)
+    frames = cache.update(tickers, interval=args.interval) if args.refresh else cache.load(tickers, args.interval)
+    prices = pd.Series({t: f["Close"].dropna().iloc[-1] for t, f in frames.items()
+                        if not f["Close"].dropna().empty}, dtype=float)
+
+    holdings, errors = validate_holdings(raw, prices, args.allow_short)
+    if len(errors):
+        errors.to_csv(args.errors, index=False)
+        print(f"{len(errors)} invalid rows written to {args.errors}")
+
+    summary = value_portfolios(holdings, prices, args.out, n_workers=args.workers)
+    print(f"{len(summary)} portfolios valued, report written to {args.out}")
+    print(f" Total Value: {summary['Value'].sum():,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Technical indicators computed on the wide matrices (dates x tickers).
+
+Every function works on the whole universe at once: the rolling windows are
+computed along the date axis of a 2-D NumPy array, without any loop over the
+tickers.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+from calendars import pack, session_order, unpack
+from matrices import ohlc_matrices
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _rolling_extreme(values: np.ndarray, window: int, ufunc) -> np.ndarray:
+    """
+    Rolling max/min along the first axis of a 2-D array (van Herk / Gil-Werman).
+
+    The rows are cut in blocks of `window` rows; a forward and a backward
+    accumulation inside each block give the result of any window with two
+    lookups, so the cost does not depend on the window length.
+    A window containing a NaN gives NaN, the first `window - 1` rows are NaN.
+
+    Parameters:
+        values (np.ndarray): The (dates, tickers) array
+        window (int): The window length
+        ufunc: np.maximum or np.minimum
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        return _rolling_extreme(values[:, None], window, ufunc)[:, 0]
+
+    n_rows, n_cols = values.shape
+    out = np.full((n_rows, n_cols), np.nan)
+    if window < 1:
+        raise ValueError("window must be a positive integer")
+    if n_rows < window:
+        return out
+
+    n_blocks = -(-n_rows // window)
+    padded = np.full((n_blocks * window, n_cols), np.nan)
+    padded[:n_rows] = values
+    blocks = padded.reshape(n_blocks, window, n_cols)
+
+    prefix = ufunc.accumulate(blocks, axis=1).reshape(-1, n_cols)
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1, n_cols)
+
+    out[window - 1:] = ufunc(suffix[:n_rows - window + 1], prefix[window - 1:n_rows])
+    return out
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling maximum over the dates of a (dates, tickers) array
+
+    Parameters:
+        values (np.ndarray): The (dates, tickers) array
+        window (int): The window length
+    """
+    return _rolling_extreme(values, window, np.maximum)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling minimum over the dates of a (dates, tickers) array
+
+    Parameters:
+        values (np.ndarray): The (dates, tickers) array
+        window (int): The window length
+    """
+    return _rolling_extreme(values, window, np.minimum)
+
+
+def midpoint(high: np.ndarray, low: np.ndarray, window: int) -> np.ndarray:
+    """
+    (highest high + lowest low) / 2 over a rolling window, the building block of
+    the Tenkan, Kijun and Senkou B lines
+
+    Parameters:
+        high (np.ndarray): The (dates, tickers) high prices
+        low (np.ndarray): The (dates, tickers) low prices
+        window (int): The window length
+    """
+    return (rolling_max(high, window) + rolling_min(low, window)) / 2
+
+
+def shift(values: np.ndarray, periods: int) -> np.ndarray:
+    """
+    Shift a (dates, tickers) array along the dates, like DataFrame.shift
+
+    Parameters:
+        values (np.ndarray): The array to shift
+        periods (int): Positive to move values forward in time, negative backward
+    """
+    out = np.full(values.shape, np.nan)
+    if periods == 0:
+        out[:] = values
+    elif abs(periods) < len(values):
+        if periods > 0:
+            out[periods:] = values[:-periods]
+        else:
+            out[:periods] = values[-periods:]
+    return out
+
+
+def ichimoku_lines(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                   tenkan: int = 9, kijun: int = 26, senkou_b: int = 52,
+                   displacement: int = 26) -> Dict[str, np.ndarray]:
+    """
+    Compute the five Ichimoku lines on (dates, tickers) arrays
+
+    Parameters:
+        high, low, close (np.ndarray): The (dates, tickers) prices
+        tenkan (int): The Tenkan-sen window
+        kijun (int): The Kijun-sen window
+        senkou_b (int): The Senkou Span B window
+        displacement (int): The forward shift of the cloud and backward shift of Chikou
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    tenkan_line = midpoint(high, low, tenkan)
+    kijun_line = midpoint(high, low, kijun)
+    return {
+        "Tenkan": tenkan_line,
+        "Kijun": kijun_line,
+        "Senkou A": shift((tenkan_line + kijun_line) / 2, displacement),
+        "Senkou B": shift(midpoint(high, low, senkou_b), displacement),
+        "Chikou": shift(close, -displacement),
+    }
+
+
+def ichimoku(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame,
+             tenkan: int = 9, kijun: int = 26, senkou_b: int = 52,
+             displacement: int = 26, mask: pd.DataFrame = None) -> Dict[str, pd.DataFrame]:
+    """
+    Compute the Ichimoku lines for every ticker of the wide matrices
+
+    Parameters:
+        high, low, close (pd.DataFrame): dates x tickers matrices, shaped like close_matrix
+        tenkan (int): The Tenkan-sen window
+        kijun (int): The Kijun-sen window
+        senkou_b (int): The Senkou Span B window
+        displacement (int): The forward shift of the cloud and backward shift of Chikou
+        mask (pd.DataFrame): Optional sessions mask (calendars.align), the windows and
+            shifts then count the sessions of each ticker
+    """
+    high = high.reindex(index=close.index, columns=close.columns).to_numpy(dtype=float)
+    low = low.reindex(index=close.index, columns=close.columns).to_numpy(dtype=float)
+    values = close.to_numpy(dtype=float)
+    if mask is None:
+        lines = ichimoku_lines(high, low, values, tenkan, kijun, senkou_b, displacement)
+    else:
+        mask = mask.reindex(index=close.index, columns=close.columns, fill_value=False).to_numpy(dtype=bool)
+        order = session_order(mask)
+        lines = ichimoku_lines(pack(high, mask, order), pack(low, mask, order), pack(values, mask, order),
+                               tenkan, kijun, senkou_b, displacement)
+        lines = {name: unpack(line, mask, order) for name, line in lines.items()}
+    return {name: pd.DataFrame(values, index=close.index, columns=close.columns)
+            for name, values in lines.items()}
+
+
+def ichimoku_from_long(df: pd.DataFrame, **windows) -> Dict[str, pd.DataFrame]:
+    """
+    Compute the Ichimoku lines from the long dataframe returned by final_df
+
+    Parameters:
+        df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        windows: tenkan, kijun, senkou_b, displacement
+    """
+    wide = ohlc_matrices(df, ["High", "Low", "Close"])
+    return ichimoku(wide["High"], wide["Low"], wide["Close"], **windows)
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    """
+    Row of the first non-NaN value of each column (len(values) if none)
+    """
+    valid = ~np.isnan(values)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(values))
+
+
+def _linear_recurrence(inputs: np.ndarray, decay: float, max_block: int = 256) -> np.ndarray:
+    """
+    y[t] = decay * y[t - 1] + inputs[t] along the first axis, with y[-1] = 0.
+
+    Inside a block of rows the recurrence has the closed form
+    y[b + k] = decay**k * (decay * y[b - 1] + cumsum(inputs[b + m] / decay**m)),
+    so each block is a cumulative sum over all the columns; the block length keeps
+    decay**-block far from overflowing.
+    """
+    if decay == 0:
+        return inputs.copy()
+    block = int(min(max_block, max(1, 300 / -np.log(decay))))
+    out = np.empty_like(inputs)
+    powers = decay ** np.arange(block, dtype=float)[:, None]
+    carry = np.zeros(inputs.shape[1])
+    for start in range(0, len(inputs), block):
+        chunk = inputs[start:start + block]
+        p = powers[:len(chunk)]
+        out[start:start + block] = p * (decay * carry + np.cumsum(chunk / p, axis=0))
+        carry = out[start + len(chunk) - 1]
+    return out
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _linear_recurrence_compiled(inputs, decay):
+        out = np.empty_like(inputs)
+        carry = np.zeros(inputs.shape[1])
+        for t in range(inputs.shape[0]):
+            for j in range(inputs.shape[1]):
+                carry[j] = decay * carry[j] + inputs[t, j]
+                out[t, j] = carry[j]
+        return out
+
+
+def _wilder(values: np.ndarray, seed_rows: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder smoothing of each column, seeded by the simple average of the first
+    `period` values of the column (NaN before the seed row)
+    """
+    n_rows, n_cols = values.shape
+    cols = np.arange(n_cols)
+    has_seed = seed_rows < n_rows
+    seed_at = np.minimum(seed_rows, n_rows - 1)
+
+    csum = np.vstack([np.zeros(n_cols), np.cumsum(values, axis=0)])
+    seed = (csum[seed_at + 1, cols] - csum[seed_at + 1 - period, cols]) / period
+
+    # the seed enters as an input and the smoothing starts after it
+    inputs = values / period
+    rows = np.arange(n_rows)[:, None]
+    inputs = np.where(rows > seed_at, inputs, 0.0)
+    inputs[seed_at[has_seed], cols[has_seed]] = seed[has_seed]
+
+    decay = 1 - 1 / period
+    if numba is not None:
+        out = _linear_recurrence_compiled(inputs, decay)
+    else:
+        out = _linear_recurrence(inputs, decay)
+    out[(rows < seed_at) | ~has_seed] = np.nan
+    return out
+
+
+def rsi_array(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Wilder RSI of a (dates, tickers) array. Each column starts at its first price;
+    a missing price after that counts as no change.
+
+    Parameters:
+        close (np.ndarray): The (dates, tickers) close prices
+        period (int): The RSI period
+    """
+    close = np.asarray(close, dtype=float)
+    if close.ndim == 1:
+        return rsi_array(close[:, None], period)[:, 0]
+
+    start = _first_valid(close)
+    filled = pd.DataFrame(close).ffill().to_numpy()
+    change = np.zeros_like(filled)
+    change[1:] = np.nan_to_num(filled[1:] - filled[:-1], nan=0.0)
+
+    # first change of a column is the row after its first price
+    seed_rows = start + period
+    avg_gain = _wilder(np.maximum(change, 0.0), seed_rows, period)
+    avg_loss = _wilder(np.maximum(-change, 0.0), seed_rows, period)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), rsi)
+    return np.where(np.isnan(avg_gain), np.nan, rsi)
+
+
+def _session_mask(mask: pd.DataFrame, like: pd.DataFrame):
+    if mask is None:
+        return None
+    return mask.reindex(index=like.index, columns=like.columns, fill_value=False).to_numpy(dtype=bool)
+
+
+def rsi(close: pd.DataFrame, period: int = 14, mask: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Wilder RSI of every ticker of the close matrix
+
+    Parameters:
+        close (pd.DataFrame): The dates x tickers close prices (close_matrix)
+        period (int): The RSI period
+        mask (pd.DataFrame): Optional sessions mask (calendars.align)
+    """
+    values = close.to_numpy(dtype=float)
+    mask = _session_mask(mask, close)
+    if mask is None:
+        out = rsi_array(values, period)
+    else:
+        order = session_order(mask)
+        out = unpack(rsi_array(pack(values, mask, order), period), mask, order)
+    return pd.DataFrame(out, index=close.index, columns=close.columns)
+
+
+def rolling_mean_std(values: np.ndarray, window: int):
+    """
+    Rolling mean and population standard deviation along the dates, from cumulative
+    sums. The columns are centered first to limit the cancellation of the
+    sum-of-squares formula; a window containing a NaN gives NaN.
+
+    Parameters:
+        values (np.ndarray): The (dates, tickers) array
+        window (int): The window length
+    """
+    values = np.asarray(values, dtype=float)
+    n_rows, n_cols = values.shape
+    mean = np.full((n_rows, n_cols), np.nan)
+    std = np.full((n_rows, n_cols), np.nan)
+    if n_rows < window:
+        return mean, std
+
+    missing = np.isnan(values)
+    with np.errstate(all="ignore"):
+        center = np.nanmean(values, axis=0)
+    centered = np.where(missing, 0.0, values - np.nan_to_num(center))
+
+    def window_sum(x):
+        csum = np.vstack([np.zeros((1, n_cols)), np.cumsum(x, axis=0)])
+        return csum[window:] - csum[:-window]
+
+    total = window_sum(centered)
+    total_sq = window_sum(centered ** 2)
+    invalid = window_sum(missing.astype(float)) > 0
+
+    m = total / window
+    variance = np.maximum(total_sq / window - m ** 2, 0.0)
+    mean[window - 1:] = np.where(invalid, np.nan, m + np.nan_to_num(center))
+    std[window - 1:] = np.where(invalid, np.nan, np.sqrt(variance))
+    return mean, std
+
+
+def bollinger(close: pd.DataFrame, window: int = 20, n_std: float = 2.0,
+              mask: pd.DataFrame = None) -> Dict[str, pd.DataFrame]:
+    """
+    Bollinger Bands (middle, upper, lower) and %B of every ticker of the close matrix
+
+    Parameters:
+        close (pd.DataFrame): The dates x tickers close prices (close_matrix)
+        window (int): The moving average window
+        n_std (float): The width of the bands in standard deviations
+        mask (pd.DataFrame): Optional sessions mask (calendars.align)
+    """
+    values = close.to_numpy(dtype=float)
+    mask = _session_mask(mask, close)
+    if mask is None:
+        mean, std = rolling_mean_std(values, window)
+    else:
+        order = session_order(mask)
+        mean, std = (unpack(v, mask, order) for v in rolling_mean_std(pack(values, mask, order), window))
+    upper = mean + n_std * std
+    lower = mean - n_std * std
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent_b = np.where(upper > lower, (values - lower) / (upper - lower), np.nan)
+    return {name: pd.DataFrame(v, index=close.index, columns=close.columns)
+            for name, v in [("Middle", mean), ("Upper", upper), ("Lower", lower), ("%B", percent_b)]}
@@ -0,0 +1,40 @@
+"""
+Helpers to turn the long dataframe built by final_df (one row per Date and Ticker)
+into wide matrices (dates x tickers) used by the indicators and the analytics.
+"""
+
+import pandas as pd
+from typing import Dict, List
+
+
+def field_matrix(df: pd.DataFrame, field: str = "Close") -> pd.DataFrame:
+    """
+    Pivot one column of the long dataframe into a dates x tickers matrix
+
+    Parameters:
+        df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        field (str): The column to pivot (Open, High, Low, Close, Volume)
+    """
+    wide = (df
+            .reset_index()
+            .pivot(index="Date", columns="Ticker", values=field)
+            .sort_index()
+            )
+    return wide
+
+
+def ohlc_matrices(df: pd.DataFrame, fields: List[str] = ("High", "Low", "Close")) -> Dict[str, pd.DataFrame]:
+    """
+    Pivot several columns of the long dataframe at once, all aligned on the same
+    dates and tickers
+
+    Parameters:
+        df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        fields: The columns to pivot
+    """
+    wide = (df
+            .reset_index()
+            .pivot(index="Date", columns="Ticker", values=list(fields))
+            .sort_index()
+            )
+    return {field: wide[field] for field in fields}
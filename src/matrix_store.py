@@ -0,0 +1,203 @@
+"""
+Persisted wide price matrices (dates x tickers), one memory-mapped file per field.
+
+The analytics slice the matrices without copying them, and several worker
+processes opening the same store share a single copy in the page cache.
+
+Layout:
+    <root>/meta.json        fields, dtype, number of rows and columns
+    <root>/dates.npy        int64 timestamps (ns) of the rows
+    <root>/tickers.json     tickers of the columns
+    <root>/<field>.dat      (rows, columns) C-ordered np.memmap
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class MatrixStore:
+    """
+    Memory-mapped dates x tickers matrices, one file per field
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, "meta.json")) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(root, "tickers.json")) as f:
+            self.tickers = pd.Index(json.load(f), name="Ticker")
+        self.dates = pd.DatetimeIndex(np.load(os.path.join(root, "dates.npy")), name="Date")
+        self._maps = {}
+
+    @property
+    def fields(self) -> List[str]:
+        return self.meta["fields"]
+
+    @property
+    def shape(self):
+        return (self.meta["rows"], self.meta["cols"])
+
+    def matrix(self, field: str = "Close") -> np.memmap:
+        """
+        Read-only memory map of one field
+
+        Parameters:
+            field (str): Open, High, Low, Close or Volume
+        """
+        if field not in self._maps:
+            self._maps[field] = np.memmap(os.path.join(self.root, f"{field}.dat"),
+                                          dtype=self.meta["dtype"], mode="r", shape=self.shape)
+        return self._maps[field]
+
+    def frame(self, field: str = "Close", start=None, end=None,
+              tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Dates x tickers dataframe over the memory map. A date range gives a view
+        (no copy); selecting a list of tickers copies the selected columns.
+
+        Parameters:
+            field (str): Open, High, Low, Close or Volume
+            start, end: Optional first and last dates (included)
+            tickers: Optional tickers to keep
+        """
+        rows = self.dates.slice_indexer(start, end)
+        values = self.matrix(field)[rows]
+        columns = self.tickers
+        if tickers is not None:
+            positions = self.tickers.get_indexer(tickers)
+            if (positions < 0).any():
+                missing = [t for t, p in zip(tickers, positions) if p < 0]
+                raise KeyError(f"Tickers not in the store: {missing}")
+            values = values[:, positions]
+            columns = self.tickers[positions]
+        return pd.DataFrame(values, index=self.dates[rows], columns=columns, copy=False)
+
+    def append(self, df: pd.DataFrame):
+        """
+        Append the bars newer than the last stored date. The files are extended in
+        place; the tickers must already be in the store.
+
+        Parameters:
+            df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        """
+        df = df.set_axis(_naive_utc(df.index))
+        df = df[df.index > self.dates[-1]]
+        if df.empty:
+            return
+        cols = self.tickers.get_indexer(df["Ticker"])
+        if (cols < 0).any():
+            raise KeyError("New tickers need a rebuild of the store")
+
+        new_dates, rows = np.unique(df.index.values, return_inverse=True)
+        n_old, n_cols = self.shape
+        n_new = n_old + len(new_dates)
+        itemsize = np.dtype(self.meta["dtype"]).itemsize
+
+        self._maps = {}
+        for field in self.fields:
+            path = os.path.join(self.root, f"{field}.dat")
+            with open(path, "r+b") as f:
+                f.truncate(n_new * n_cols * itemsize)
+            out = np.memmap(path, dtype=self.meta["dtype"], mode="r+", shape=(n_new, n_cols))
+            out[n_old:] = np.nan
+            if field in df.columns:
+                out[n_old + rows, cols] = df[field].to_numpy(dtype=float)
+            out.flush()
+            del out
+
+        self.dates = self.dates.append(pd.DatetimeIndex(new_dates, name="Date"))
+        self.meta["rows"] = n_new
+        _write_index(self.root, self.dates, self.tickers, self.meta)
+
+
+def _naive_utc(index) -> pd.DatetimeIndex:
+    """
+    The timestamps as naive UTC: the one representation of the dates of the store
+    (yfinance intraday frames are tz-aware, daily ones naive)
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.astype("datetime64[ns]")
+
+
+def _write_index(root: str, dates: pd.DatetimeIndex, tickers, meta: Dict):
+    np.save(os.path.join(root, "dates.npy"), dates.values.astype("datetime64[ns]"))
+    with open(os.path.join(root, "tickers.json"), "w") as f:
+        json.dump(list(tickers), f)
+    with open(os.path.join(root, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+
+
+def _create(root: str, dates: pd.DatetimeIndex, tickers, fields: List[str], dtype: str) -> Dict[str, np.memmap]:
+    os.makedirs(root, exist_ok=True)
+    meta = {"fields": list(fields), "dtype": np.dtype(dtype).name,
+            "rows": len(dates), "cols": len(tickers)}
+    _write_index(root, dates, tickers, meta)
+    maps = {}
+    for field in fields:
+        maps[field] = np.memmap(os.path.join(root, f"{field}.dat"), dtype=dtype,
+                                mode="w+", shape=(len(dates), len(tickers)))
+        maps[field][:] = np.nan
+    return maps
+
+
+def build_from_long(df: pd.DataFrame, root: str, fields: List[str] = FIELDS,
+                    dtype: str = "float64") -> MatrixStore:
+    """
+    Write the long dataframe returned by final_df to a store, with one scatter per
+    field instead of a pivot
+
+    Parameters:
+        df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        root (str): The directory of the store
+        fields: The columns to store
+        dtype (str): float32 halves the size, float64 keeps full precision
+    """
+    fields = [f for f in fields if f in df.columns]
+    dates, rows = np.unique(_naive_utc(df.index).values, return_inverse=True)
+    tickers, cols = np.unique(df["Ticker"].to_numpy(dtype=str), return_inverse=True)
+
+    maps = _create(root, pd.DatetimeIndex(dates, name="Date"), tickers, fields, dtype)
+    for field, out in maps.items():
+        out[rows, cols] = df[field].to_numpy(dtype=float)
+        out.flush()
+    del maps
+    return MatrixStore(root)
+
+
+def build_from_frames(frames: Dict[str, pd.DataFrame], root: str, fields: List[str] = FIELDS,
+                      dtype: str = "float64") -> MatrixStore:
+    """
+    Write per-ticker frames (for example PriceCache.load) to a store one ticker at a
+    time, without building the long dataframe in memory
+
+    Parameters:
+        frames: One OHLCV dataframe (Date index) per ticker
+        root (str): The directory of the store
+        fields: The columns to store
+        dtype (str): float32 halves the size, float64 keeps full precision
+    """
+    tickers = sorted(frames)
+    indexes = {t: _naive_utc(frames[t].index) for t in tickers}
+    dates = pd.DatetimeIndex(np.unique(np.concatenate([indexes[t].values for t in tickers])), name="Date")
+
+    maps = _create(root, dates, tickers, fields, dtype)
+    for col, ticker in enumerate(tickers):
+        frame = frames[ticker]
+        rows = dates.get_indexer(indexes[ticker])
+        if (rows < 0).any():
+            raise ValueError(f"Dates of {ticker} not found in the store index")
+        for field, out in maps.items():
+            if field in frame.columns:
+                out[rows, col] = frame[field].to_numpy(dtype=float)
+    for out in maps.values():
+        out.flush()
+    del maps
+    return MatrixStore(root)
@@ -0,0 +1,139 @@
+"""
+Monte Carlo VaR and Expected Shortfall of a buy-and-hold portfolio.
+
+The daily log returns of the assets are simulated with a correlated Gaussian
+model (Cholesky factor of the historical covariance), a multivariate Student-t
+model, or a bootstrap of the historical days. The paths are generated in chunks of
+fixed size so the memory stays bounded; each chunk has its own generator spawned
+from one SeedSequence, so the result only depends on the seed, not on the number
+of processes. The chunks are merged as they arrive into running sums and a buffer
+of the `ceil(alpha * n_paths)` worst losses, so no more than one chunk of paths and
+that buffer is held at once.
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("gaussian", "student_t", "bootstrap")
+
+_model = None
+
+
+def _init_worker(model: Dict):
+    global _model
+    _model = model
+
+
+def _simulate_chunk(task) -> Dict:
+    """
+    Simulate one chunk of paths and return its partial statistics
+    """
+    n_paths, seed, n_tail = task
+    model = _model
+    rng = np.random.default_rng(seed)
+    weights = model["weights"]
+    n_assets = len(weights)
+
+    cumulative = np.zeros((n_paths, n_assets))
+    for _ in range(model["horizon"]):
+        if model["method"] == "bootstrap":
+            cumulative += model["history"][rng.integers(0, len(model["history"]), n_paths)]
+            continue
+        shocks = rng.standard_normal((n_paths, n_assets)) @ model["cholesky"].T
+        if model["method"] == "student_t":
+            dof = model["dof"]
+            shocks *= np.sqrt((dof - 2) / rng.chisquare(dof, (n_paths, 1)))
+        cumulative += model["mean"] + shocks
+
+    losses = -(np.expm1(cumulative) @ weights)
+    n_tail = min(n_tail, n_paths)
+    tail = np.partition(losses, n_paths - n_tail)[n_paths - n_tail:]
+    return {"count": n_paths, "sum": losses.sum(), "sum_sq": (losses ** 2).sum(), "tail": tail}
+
+
+def _merge_tail(tail: np.ndarray, losses: np.ndarray, n_tail: int) -> np.ndarray:
+    """
+    The n_tail largest losses of a running buffer and a new chunk
+    """
+    merged = np.concatenate([tail, losses])
+    if len(merged) <= n_tail:
+        return merged
+    return np.partition(merged, len(merged) - n_tail)[len(merged) - n_tail:]
+
+
+def simulate_var_es(close: pd.DataFrame, weights: pd.Series, horizon: int = 10, n_paths: int = 100_000,
+                    method: str = "gaussian", alpha: float = 0.05, dof: float = 5.0,
+                    chunk_size: int = 10_000, n_workers: int = 1, seed: Optional[int] = None,
+                    value: float = 1.0) -> Dict[str, float]:
+    """
+    Monte Carlo VaR and ES of a portfolio over a horizon
+
+    Parameters:
+        close (pd.DataFrame): The dates x tickers close prices (close_matrix)
+        weights (pd.Series): The value weights of the tickers in the portfolio
+        horizon (int): The number of periods simulated
+        n_paths (int): The number of simulated paths
+        method (str): "gaussian", "student_t" or "bootstrap"
+        alpha (float): The tail probability of the VaR and ES
+        dof (float): The degrees of freedom of the Student-t model (> 2)
+        chunk_size (int): The number of paths generated at once
+        n_workers (int): The number of processes, 1 runs in the current process
+        seed (int): The seed of the SeedSequence, for reproducible results
+        value (float): The portfolio value, the losses are returned in this unit
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    if method == "student_t" and dof <= 2:
+        raise ValueError("dof must be greater than 2")
+
+    weights = pd.Series(weights).reindex(close.columns).fillna(0.0)
+    history = np.log(close.ffill()).diff().iloc[1:].fillna(0.0).to_numpy()
+
+    model = {"method": method, "horizon": horizon, "weights": weights.to_numpy(dtype=float), "dof": dof}
+    if method == "bootstrap":
+        model["history"] = history
+    else:
+        cov = np.atleast_2d(np.cov(history, rowvar=False))
+        # a small jitter keeps the factorization possible for singular covariances
+        jitter = 1e-12 * max(np.trace(cov) / len(cov), 1e-12)
+        model["cholesky"] = np.linalg.cholesky(cov + jitter * np.eye(len(cov)))
+        model["mean"] = history.mean(axis=0)
+
+    n_tail = max(1, math.ceil(alpha * n_paths))
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(size, s, n_tail) for size, s in zip(sizes, seeds)]
+
+    count, total, total_sq = 0, 0.0, 0.0
+    tail = np.empty(0)
+
+    def merge(parts):
+        nonlocal count, total, total_sq, tail
+        for part in parts:
+            count += part["count"]
+            total += part["sum"]
+            total_sq += part["sum_sq"]
+            tail = _merge_tail(tail, part["tail"], n_tail)
+
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(model,)) as pool:
+            merge(pool.map(_simulate_chunk, tasks))
+    else:
+        _init_worker(model)
+        merge(_simulate_chunk(task) for task in tasks)
+
+    mean = total / count
+    variance = max(total_sq / count - mean ** 2, 0.0)
+    tail = np.sort(tail)[::-1]
+
+    return {
+        "VaR": float(tail[-1]) * value,
+        "ES": float(tail.mean()) * value,
+        "Mean Loss": float(mean) * value,
+        "Std Loss": math.sqrt(variance) * value,
+        "Paths": count,
+    }
@@ -0,0 +1,328 @@
+"""
+Portfolio optimization on the returns of the close matrix.
+
+The expected returns and the covariance are estimated once (Ledoit-Wolf shrinkage
+towards a scaled identity, so the covariance stays well conditioned with many
+tickers and few dates). The long-only problems are solved by accelerated projected
+gradient (FISTA) on a (points x tickers) weights matrix: every point of an efficient
+frontier is solved at the same time with matrix products, and the target-return
+points reuse the previous solutions as warm starts. With short sales allowed the
+solutions are in closed form.
+
+Risk parity uses a damped Newton method on the convex formulation of Spinu,
+batched over a stack of covariance matrices (one per universe).
+"""
+
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from risk import asset_returns
+
+
+def ledoit_wolf(returns: np.ndarray):
+    """
+    Ledoit-Wolf shrinkage of the covariance towards mu * I (mu: the mean variance),
+    returns the covariance and the shrinkage intensity
+
+    Parameters:
+        returns (np.ndarray): The (dates, tickers) returns
+    """
+    x = np.asarray(returns, dtype=float)
+    x = x - x.mean(axis=0)
+    n_obs, n_assets = x.shape
+    sample = x.T @ x / n_obs
+    mu = np.trace(sample) / n_assets
+
+    delta = ((sample - mu * np.eye(n_assets)) ** 2).sum()
+    x2 = x ** 2
+    beta = ((x2.T @ x2) / n_obs - sample ** 2).sum() / n_obs
+    shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+
+    cov = (1 - shrinkage) * sample
+    cov[np.diag_indices(n_assets)] += shrinkage * mu
+    return cov, shrinkage
+
+
+def estimate(close: pd.DataFrame, periods_per_year: int = 252,
+             shrinkage: Union[str, float, None] = "ledoit_wolf", mask: pd.DataFrame = None) -> Dict:
+    """
+    Annualized expected returns and covariance of the tickers of the close matrix
+
+    Parameters:
+        close (pd.DataFrame): The dates x tickers close prices (close_matrix)
+        periods_per_year (int): 252 for daily data
+        shrinkage: "ledoit_wolf", a fixed intensity between 0 and 1, or None for the
+            sample covariance
+        mask (pd.DataFrame): Optional sessions mask (calendars.align)
+    """
+    returns = asset_returns(close, mask)
+    values = returns.to_numpy(dtype=float)
+    if shrinkage == "ledoit_wolf":
+        cov, intensity = ledoit_wolf(values)
+    else:
+        intensity = float(shrinkage or 0.0)
+        cov = np.cov(values, rowvar=False, bias=True).reshape(values.shape[1], values.shape[1])
+        mu = np.trace(cov) / len(cov)
+        cov = (1 - intensity) * cov + intensity * mu * np.eye(len(cov))
+
+    tickers = returns.columns
+    return {
+        "Mean": pd.Series(values.mean(axis=0) * periods_per_year, index=tickers),
+        "Covariance": pd.DataFrame(cov * periods_per_year, index=tickers, columns=tickers),
+        "Shrinkage": intensity,
+    }
+
+
+def project_capped_simplex(values: np.ndarray, upper: float = 1.0) -> np.ndarray:
+    """
+    Euclidean projection of each row on {w : sum(w) = 1, 0 <= w <= upper}.
+
+    The projection is clip(v - tau, 0, upper) with sum = 1; the sum is piecewise
+    linear in tau with breakpoints v and v - upper, so it is evaluated at the sorted
+    breakpoints with a cumulative sum of the slopes and tau is interpolated, for all
+    the rows at once.
+
+    Parameters:
+        values (np.ndarray): The (points, tickers) matrix
+        upper (float): The maximum weight, at least 1 / tickers
+    """
+    n_rows, n_assets = values.shape
+    breakpoints = np.concatenate([values - upper, values], axis=1)
+    order = np.argsort(breakpoints, axis=1, kind="stable")
+    points = np.take_along_axis(breakpoints, order, axis=1)
+    # crossing v - upper (rising tau) uncaps a weight: the slope decreases by one;
+    # crossing v zeroes it: the slope increases by one
+    slope = np.cumsum(np.where(order < n_assets, -1.0, 1.0), axis=1)
+    sums = n_assets * upper + np.concatenate(
+        [np.zeros((n_rows, 1)), np.cumsum(slope[:, :-1] * np.diff(points, axis=1), axis=1)], axis=1)
+
+    k = np.clip((sums > 1).sum(axis=1) - 1, 0, 2 * n_assets - 2)[:, None]
+    rows_slope = np.take_along_axis(slope, k, axis=1)
+    start = np.take_along_axis(points, k, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tau = np.where(rows_slope != 0, start + (1 - np.take_along_axis(sums, k, axis=1)) / rows_slope, start)
+    return np.clip(values - tau, 0.0, upper)
+
+
+def _solve_batch(cov: np.ndarray, mean: np.ndarray, gammas: np.ndarray, upper: float,
+                 start: Optional[np.ndarray] = None, max_iter: int = 5000, tol: float = 1e-8) -> np.ndarray:
+    """
+    min 1/2 w' cov w - gamma * mean' w over the capped simplex, for every gamma at once
+    (FISTA with a fixed step of 1 / largest eigenvalue, the momentum of a row is reset
+    when it stops decreasing the objective; the converged rows leave the batch)
+    """
+    n_assets = len(mean)
+    step = 1.0 / max(np.linalg.eigvalsh(cov)[-1], 1e-300)
+    out = (np.full((len(gammas), n_assets), 1.0 / n_assets) if start is None
+           else np.array(start, dtype=float))
+    active = np.arange(len(gammas))
+    linear = gammas[:, None] * mean[None, :]
+    w = y = out
+    t = np.ones((len(gammas), 1))
+    for _ in range(max_iter):
+        w_next = project_capped_simplex(y - step * (y @ cov - linear), upper)
+        restart = ((y - w_next) * (w_next - w)).sum(axis=1, keepdims=True) > 0
+        t = np.where(restart, 1.0, t)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_next + np.where(restart, 0.0, (t - 1) / t_next) * (w_next - w)
+        done = np.abs(w_next - w).max(axis=1) < tol
+        w, t = w_next, t_next
+        if done.any():
+            out[active[done]] = w[done]
+            keep = ~done
+            active, w, y, t, linear = active[keep], w[keep], y[keep], t[keep], linear[keep]
+            if not len(active):
+                break
+    out[active] = w
+    return out
+
+
+def _stats(weights: np.ndarray, mean: np.ndarray, cov: np.ndarray, risk_free: float) -> np.ndarray:
+    ret = weights @ mean
+    vol = np.sqrt(np.maximum(np.einsum("ij,jk,ik->i", weights, cov, weights), 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(vol > 0, (ret - risk_free) / vol, np.nan)
+    return np.column_stack([ret, vol, sharpe])
+
+
+def _arrays(estimates: Dict):
+    return estimates["Mean"].to_numpy(dtype=float), estimates["Covariance"].to_numpy(dtype=float)
+
+
+def min_variance(estimates: Dict, allow_short: bool = False, max_weight: float = 1.0) -> pd.Series:
+    """
+    Minimum variance weights
+
+    Parameters:
+        estimates (Dict): The output of estimate
+        allow_short (bool): Closed-form solution with negative weights allowed (max_weight ignored)
+        max_weight (float): The maximum weight of a ticker
+    """
+    mean, cov = _arrays(estimates)
+    if allow_short:
+        w = np.linalg.solve(cov, np.ones(len(mean)))
+        w = w / w.sum()
+    else:
+        w = _solve_batch(cov, mean, np.zeros(1), max_weight)[0]
+    return pd.Series(w, index=estimates["Mean"].index, name="Weight")
+
+
+def _frontier_grid(mean, cov, upper, n_points):
+    scale = np.linalg.eigvalsh(cov)[-1] / max(np.abs(mean).max(), 1e-12)
+    gammas = np.concatenate([[0.0], np.geomspace(1e-4, 1e3, n_points - 1) * scale])
+    return gammas, _solve_batch(cov, mean, gammas, upper)
+
+
+def max_sharpe(estimates: Dict, risk_free: float = 0.0, allow_short: bool = False,
+               max_weight: float = 1.0, n_points: int = 64) -> pd.Series:
+    """
+    Maximum Sharpe ratio (tangency) weights
+
+    Parameters:
+        estimates (Dict): The output of estimate
+        risk_free (float): The annual risk-free rate
+        allow_short (bool): Closed-form solution with negative weights allowed
+        max_weight (float): The maximum weight of a ticker
+        n_points (int): The long-only tangency portfolio is searched on a frontier of
+            n_points, then on a finer frontier around the best point
+    """
+    mean, cov = _arrays(estimates)
+    if allow_short:
+        w = np.linalg.solve(cov, mean - risk_free)
+        w = w / w.sum()
+    else:
+        gammas, weights = _frontier_grid(mean, cov, max_weight, n_points)
+        best = int(np.nanargmax(_stats(weights, mean, cov, risk_free)[:, 2]))
+        lo, hi = gammas[max(best - 1, 0)], gammas[min(best + 1, len(gammas) - 1)]
+        fine = np.linspace(lo, hi, n_points)
+        weights = _solve_batch(cov, mean, fine, max_weight, np.repeat(weights[best:best + 1], n_points, axis=0))
+        w = weights[int(np.nanargmax(_stats(weights, mean, cov, risk_free)[:, 2]))]
+    return pd.Series(w, index=estimates["Mean"].index, name="Weight")
+
+
+def efficient_frontier(estimates: Dict, targets=None, n_points: int = 50, risk_free: float = 0.0,
+                       allow_short: bool = False, max_weight: float = 1.0,
+                       max_steps: int = 30) -> Dict[str, pd.DataFrame]:
+    """
+    Minimum variance weights for many target returns, solved together
+
+    Parameters:
+        estimates (Dict): The output of estimate
+        targets: The annual target returns, n_points between the return of the minimum
+            variance portfolio and the highest attainable return by default
+        n_points (int): The number of points when no targets are given
+        risk_free (float): The annual risk-free rate of the Sharpe ratios
+        allow_short (bool): Closed-form solution with negative weights allowed
+        max_weight (float): The maximum weight of a ticker
+        max_steps (int): The maximum root-finding steps on the risk aversion (long only)
+
+    Returns "Weights" (points x tickers, the allocations of risk.portfolio_metrics)
+    and "Stats" (Return, Volatility, Sharpe)
+    """
+    mean, cov = _arrays(estimates)
+    n_assets = len(mean)
+
+    if allow_short:
+        # w(r) = cov^-1 [1 mean] M^-1 [1 r]' for every target r at once
+        basis = np.linalg.solve(cov, np.column_stack([np.ones(n_assets), mean]))
+        m = np.column_stack([np.ones(n_assets), mean]).T @ basis
+        if targets is None:
+            min_ret = m[0, 1] / m[0, 0]
+            targets = np.linspace(min_ret, min_ret + 2 * (mean.max() - min_ret), n_points)
+        targets = np.asarray(targets, dtype=float)
+        weights = (basis @ np.linalg.solve(m, np.vstack([np.ones_like(targets), targets]))).T
+    else:
+        # the solution of min 1/2 w'cov w - gamma mean'w has a return increasing with
+        # gamma: solve gamma for all the targets at once, warm starting each step
+        gammas, grid = _frontier_grid(mean, cov, max_weight, max(n_points, 16))
+        grid_returns = grid @ mean
+        if targets is None:
+            targets = np.linspace(grid_returns[0], grid_returns[-1], n_points)
+        targets = np.asarray(targets, dtype=float)
+
+        # regula falsi (Illinois) on gamma inside the bracket of the grid
+        position = np.clip(np.searchsorted(grid_returns, targets), 1, len(gammas) - 1)
+        lo, hi = gammas[position - 1], gammas[position]
+        f_lo, f_hi = grid_returns[position - 1] - targets, grid_returns[position] - targets
+        weights = grid[position]
+        side = np.zeros(len(targets))
+        tolerance = 1e-9 * max(np.abs(mean).max(), 1e-12)
+        for _ in range(max_steps):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mid = np.where(f_hi != f_lo, hi - f_hi * (hi - lo) / (f_hi - f_lo), (lo + hi) / 2)
+            mid = np.clip(np.nan_to_num(mid, nan=0.0), np.minimum(lo, hi), np.maximum(lo, hi))
+            weights = _solve_batch(cov, mean, mid, max_weight, weights)
+            f_mid = weights @ mean - targets
+            below = f_mid < 0
+            # Illinois: halve the value of the end kept twice in a row
+            f_hi = np.where(below & (side == -1), f_hi / 2, f_hi)
+            f_lo = np.where(~below & (side == 1), f_lo / 2, f_lo)
+            lo, f_lo = np.where(below, mid, lo), np.where(below, f_mid, f_lo)
+            hi, f_hi = np.where(below, hi, mid), np.where(below, f_hi, f_mid)
+            side = np.where(below, -1, 1)
+            if np.abs(f_mid).max() < tolerance:
+                break
+
+    tickers = estimates["Mean"].index
+    return {
+        "Weights": pd.DataFrame(weights, columns=tickers),
+        "Stats": pd.DataFrame(_stats(weights, mean, cov, risk_free), columns=["Return", "Volatility", "Sharpe"]),
+    }
+
+
+def risk_parity(cov, budgets=None, max_iter: int = 100, tol: float = 1e-12):
+    """
+    Risk parity weights: each ticker contributes its budget share of the portfolio
+    variance. Solves min 1/2 y'cov y - sum(b log y) by damped Newton steps on every
+    covariance matrix of the stack at once, then w = y / sum(y).
+
+    Parameters:
+        cov: An (N, N) covariance DataFrame / array, or an (universes, N, N) array
+        budgets: The risk budgets (N,) or (universes, N), equal by default
+        max_iter (int): The maximum number of Newton steps
+        tol (float): The stop on the Newton decrement
+
+    Returns a Series for a DataFrame covariance, an array otherwise
+    """
+    index = cov.index if isinstance(cov, pd.DataFrame) else None
+    sigma = np.asarray(cov, dtype=float)
+    single = sigma.ndim == 2
+    sigma = sigma[None] if single else sigma
+    n_batch, n_assets, _ = sigma.shape
+
+    b = np.full((n_batch, n_assets), 1.0 / n_assets) if budgets is None else \
+        np.broadcast_to(np.asarray(budgets, dtype=float), (n_batch, n_assets)).copy()
+    b = b / b.sum(axis=1, keepdims=True)
+    y = b / np.sqrt(np.einsum("bii->bi", sigma))
+
+    def objective(y):
+        return 0.5 * np.einsum("bi,bij,bj->b", y, sigma, y) - (b * np.log(y)).sum(axis=1)
+
+    for _ in range(max_iter):
+        grad = np.einsum("bij,bj->bi", sigma, y) - b / y
+        hessian = sigma + np.einsum("bi,ij->bij", b / y ** 2, np.eye(n_assets))
+        direction = -np.linalg.solve(hessian, grad[..., None])[..., 0]
+        decrement = -(grad * direction).sum(axis=1)
+        if decrement.max() < tol:
+            break
+        # largest step keeping y > 0, then backtracking on the objective
+        with np.errstate(divide="ignore"):
+            limit = np.where(direction < 0, -0.99 * y / direction, np.inf).min(axis=1)
+        step = np.minimum(1.0, limit)
+        current = objective(y)
+        for _ in range(30):
+            candidate = y + step[:, None] * direction
+            worse = objective(candidate) > current - 0.25 * step * decrement
+            if not worse.any():
+                break
+            step = np.where(worse, step / 2, step)
+        y = y + step[:, None] * direction
+
+    weights = y / y.sum(axis=1, keepdims=True)
+    if single:
+        weights = weights[0]
+        if index is not None:
+            return pd.Series(weights, index=index, name="Weight")
+    return weights
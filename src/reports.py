@@ -0,0 +1,220 @@
+"""
+Streaming report writer for large result tables (rebalances, screeners, valuations).
+
+The rows are written batch by batch: nothing keeps the whole report in memory on
+top of the data it comes from. The format is given by the extension:
+
+    .xlsx       xlsxwriter in constant_memory mode (each row is flushed to disk
+                once written); a new sheet is started every 1,048,575 rows
+    .parquet    pyarrow ParquetWriter, one row group per batch
+    .csv        appended batch by batch
+
+The column formats are declarative, a preset name or xlsxwriter format properties
+per column (only used by the Excel output):
+
+    formats = {"Ticker": "text", "Price": "price", "Weight": "percent",
+               "Value": {"num_format": "#,##0", "width": 16}}
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+PRESETS = {
+    "text": {"width": 12},
+    "integer": {"num_format": "#,##0", "width": 12},
+    "price": {"num_format": "#,##0.00", "width": 12},
+    "money": {"num_format": "#,##0.00", "width": 18},
+    "percent": {"num_format": "0.00%", "width": 10},
+    "number": {"num_format": "0.0000", "width": 12},
+    "date": {"num_format": "yyyy-mm-dd", "width": 12},
+}
+
+HEADER_FORMAT = {"bold": True, "bottom": 1, "bg_color": "#D9E1F2"}
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def _column_format(spec: Union[str, dict, None]) -> dict:
+    if spec is None:
+        return {}
+    if isinstance(spec, str):
+        if spec not in PRESETS:
+            raise ValueError(f"Unknown column format {spec}, use one of {list(PRESETS)} or a dict")
+        return dict(PRESETS[spec])
+    return dict(spec)
+
+
+def batches(frame: pd.DataFrame, batch_rows: int = 50_000) -> Iterable[pd.DataFrame]:
+    """
+    Slices of a dataframe, to write a materialized table through ReportWriter
+
+    Parameters:
+        frame (pd.DataFrame): The table
+        batch_rows (int): The number of rows per slice
+    """
+    for start in range(0, len(frame), batch_rows):
+        yield frame.iloc[start:start + batch_rows]
+
+
+class ReportWriter:
+    """
+    Write a report from row batches (DataFrames with the same columns)
+
+        with ReportWriter("report.xlsx", formats={"Value": "money"}) as report:
+            for chunk in chunks:
+                report.write(chunk)
+    """
+
+    def __init__(self, path: str, columns: Optional[List[str]] = None,
+                 formats: Optional[Dict[str, Union[str, dict]]] = None,
+                 sheet_name: str = "Report", index: bool = False):
+        """
+        Parameters:
+            path (str): The .xlsx, .parquet or .csv file
+            columns: The columns written, in order (the columns of the first batch by default)
+            formats: The column formats of the Excel output (see PRESETS)
+            sheet_name (str): The name of the Excel sheet
+            index (bool): Write the index of the batches as the first columns
+        """
+        self.path = path
+        self.kind = os.path.splitext(path)[1].lower().lstrip(".")
+        if self.kind == "pq":
+            self.kind = "parquet"
+        if self.kind not in ("xlsx", "parquet", "csv"):
+            raise ValueError(f"Unsupported report format: {self.kind}")
+        self.columns = list(columns) if columns is not None else None
+        self.formats = formats or {}
+        self.sheet_name = sheet_name
+        self.index = index
+        self.rows = 0
+        self._out = None
+        self._sheet = None
+        self._sheet_rows = 0
+        self._sheets = 0
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _prepare(self, batch: pd.DataFrame) -> pd.DataFrame:
+        if self.index:
+            batch = batch.reset_index()
+        if self.columns is None:
+            self.columns = [str(c) for c in batch.columns]
+        return batch[self.columns] if list(batch.columns) != self.columns else batch
+
+    def _open(self, batch: pd.DataFrame):
+        if self.kind == "xlsx":
+            import xlsxwriter
+
+            self._out = xlsxwriter.Workbook(self.path, {"constant_memory": True})
+            self._header_format = self._out.add_format(HEADER_FORMAT)
+            self._formats = []
+            for column in self.columns:
+                spec = _column_format(self.formats.get(column))
+                width = spec.pop("width", max(10, len(column) + 2))
+                self._formats.append((width, self._out.add_format(spec) if spec else None))
+        elif self.kind == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._schema = pa.Schema.from_pandas(batch, preserve_index=False)
+            self._out = pq.ParquetWriter(self.path, self._schema)
+        else:
+            self._out = open(self.path, "w", newline="", encoding="utf-8")
+            batch.iloc[:0].to_csv(self._out, index=False)
+
+    def _new_sheet(self):
+        self._sheets += 1
+        name = self.sheet_name if self._sheets == 1 else f"{self.sheet_name} ({self._sheets})"
+        self._sheet = self._out.add_worksheet(name[:31])
+        for i, (width, cell_format) in enumerate(self._formats):
+            self._sheet.set_column(i, i, width, cell_format)
+        self._sheet.write_row(0, 0, self.columns, self._header_format)
+        self._sheet.freeze_panes(1, 0)
+        self._sheet_rows = 1
+
+    def _write_xlsx(self, batch: pd.DataFrame):
+        # the column formats apply to the cells written without a format;
+        # NaN, NaT and +-inf become empty cells
+        valid = batch.notna() & ~batch.isin([np.inf, -np.inf])
+        values = batch.astype(object).where(valid, None).to_numpy()
+        start = 0
+        while start < len(values):
+            if self._sheet is None or self._sheet_rows == EXCEL_MAX_ROWS:
+                self._new_sheet()
+            stop = start + min(len(values) - start, EXCEL_MAX_ROWS - self._sheet_rows)
+            for row in values[start:stop]:
+                self._sheet.write_row(self._sheet_rows, 0, row)
+                self._sheet_rows += 1
+            start = stop
+
+    def write(self, batch: pd.DataFrame):
+        """
+        Append a batch of rows to the report
+
+        Parameters:
+            batch (pd.DataFrame): The rows, with at least the columns of the report
+        """
+        if self._closed:
+            raise ValueError(f"Report {self.path} is closed")
+        batch = self._prepare(batch)
+        if self._out is None:
+            self._open(batch)
+        if batch.empty:
+            return
+        if self.kind == "xlsx":
+            self._write_xlsx(batch)
+        elif self.kind == "parquet":
+            import pyarrow as pa
+
+            self._out.write_table(pa.Table.from_pandas(batch, schema=self._schema, preserve_index=False))
+        else:
+            batch.to_csv(self._out, header=False, index=False)
+        self.rows += len(batch)
+
+    def close(self):
+        """
+        Finish the file; an empty report still gets its header. Closing again does nothing.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._out is None:
+            if self.columns is None:
+                return
+            self._open(pd.DataFrame(columns=self.columns))
+        if self.kind == "xlsx" and self._sheet is None:
+            self._new_sheet()
+        self._out.close()
+        self._out = None
+
+
+def write_report(path: str, data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                 formats: Optional[Dict[str, Union[str, dict]]] = None, columns: Optional[List[str]] = None,
+                 sheet_name: str = "Report", index: bool = False, batch_rows: int = 50_000) -> int:
+    """
+    Write a table or a stream of row batches to a report, returns the number of rows
+
+    Parameters:
+        path (str): The .xlsx, .parquet or .csv file
+        data: A dataframe (written in slices of `batch_rows`) or an iterable of dataframes
+        formats: The column formats of the Excel output (see PRESETS)
+        columns: The columns written, in order
+        sheet_name (str): The name of the Excel sheet
+        index (bool): Write the index as the first columns
+        batch_rows (int): The rows per slice of a dataframe
+    """
+    if isinstance(data, pd.DataFrame):
+        if columns is None and not index:
+            columns = [str(c) for c in data.columns]
+        data = batches(data, batch_rows)
+    with ReportWriter(path, columns, formats, sheet_name, index) as report:
+        for batch in data:
+            report.write(batch)
+    return report.rows
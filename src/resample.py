@@ -0,0 +1,108 @@
+"""
+Multi-timeframe pipeline: builds the higher timeframes (daily, weekly, monthly...)
+from the cached base interval instead of downloading each interval.
+
+The bars are grouped by the start of their period (like the Yahoo Finance labels:
+weeks start on Monday, months on the 1st) and aggregated with first / max / min /
+last / sum in one groupby. The aggregated bars are cached in the PriceCache under
+"<interval>@<base>" and refreshed incrementally: only the base bars from the start
+of the last cached period are aggregated again.
+"""
+
+from typing import Dict, List
+
+import pandas as pd
+
+from cache import PriceCache
+
+PERIODS = {
+    "1h": "h",
+    "1d": "D",
+    "5d": "W-SUN",
+    "1wk": "W-SUN",
+    "1mo": "M",
+    "3mo": "Q",
+}
+
+AGGREGATIONS = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+def period_start(index: pd.DatetimeIndex, interval: str) -> pd.DatetimeIndex:
+    """
+    Start of the period of each timestamp
+
+    Parameters:
+        index (pd.DatetimeIndex): The timestamps of the base bars
+        interval (str): The target interval (1h, 1d, 1wk, 1mo, 3mo)
+    """
+    if interval not in PERIODS:
+        raise ValueError(f"Unsupported interval {interval}, use one of {list(PERIODS)}")
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.to_period(PERIODS[interval]).start_time
+
+
+def resample_ohlcv(frame: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Aggregate the bars of one ticker to a higher timeframe
+
+    Parameters:
+        frame (pd.DataFrame): The OHLCV bars (Date index)
+        interval (str): The target interval
+    """
+    aggregations = {c: a for c, a in AGGREGATIONS.items() if c in frame.columns}
+    out = frame.groupby(period_start(frame.index, interval)).agg(aggregations)
+    out = out.dropna(how="all", subset=[c for c in ("Open", "High", "Low", "Close") if c in out.columns])
+    out.index.name = "Date"
+    return out
+
+
+def resample_long(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Aggregate the long dataframe returned by final_df to a higher timeframe, all the
+    tickers in one groupby
+
+    Parameters:
+        df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        interval (str): The target interval
+    """
+    aggregations = {c: a for c, a in AGGREGATIONS.items() if c in df.columns}
+    keys = [df["Ticker"].to_numpy(), period_start(df.index, interval).rename("Date")]
+    out = df.groupby(keys, sort=True).agg(aggregations)
+    out.index.names = ["Ticker", "Date"]
+    return out.reset_index("Ticker")[list(aggregations) + ["Ticker"]].sort_index(kind="stable")
+
+
+def update_resampled(cache: PriceCache, tickers: List[str], interval: str, base: str = "1d",
+                     refresh_base: bool = False, **fetch_options) -> Dict[str, pd.DataFrame]:
+    """
+    Higher-timeframe bars built from the cached base bars, refreshed incrementally
+
+    Parameters:
+        cache (PriceCache): The local price cache
+        tickers: the tickers list
+        interval (str): The target interval
+        base (str): The cached base interval
+        refresh_base (bool): Download the new base bars first
+        fetch_options: provider, period, batch_size... (see PriceCache.update)
+    """
+    base_frames = (cache.update(tickers, interval=base, **fetch_options) if refresh_base
+                   else cache.load(tickers, base))
+    key = f"{interval}@{base}"
+
+    changed = False
+    for ticker, frame in base_frames.items():
+        last = cache.last_bar(ticker, key)
+        cached = cache.read(ticker, key) if last is not None else None
+        # the base history may have been extended backwards (a longer period): aggregate it all
+        if cached is not None and period_start(frame.index[:1], interval)[0] >= cached.index[0]:
+            # the last cached period may have been partial: aggregate it again
+            frame = frame[period_start(frame.index, interval) >= last]
+            if frame.empty:
+                continue
+        cache.write(ticker, resample_ohlcv(frame, interval), key, save_index=False)
+        changed = True
+    if changed:
+        cache.save_index(key)
+    return cache.load(tickers, key)
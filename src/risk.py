@@ -0,0 +1,117 @@
+"""
+Portfolio risk metrics computed for many portfolios at once.
+
+The allocations are a (portfolios x tickers) matrix: one matrix product gives the
+returns of every portfolio, the historical quantiles come from np.partition and the
+drawdowns from a cumulative maximum, all along the dates axis.
+"""
+
+import numpy as np
+import pandas as pd
+
+from calendars import session_returns
+
+
+def asset_returns(close: pd.DataFrame, mask: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Simple returns of each ticker, 0 where a ticker has no price yet
+
+    Parameters:
+        close (pd.DataFrame): The dates x tickers close prices (close_matrix)
+        mask (pd.DataFrame): Optional sessions mask (calendars.align): the return of a
+            ticker is taken from one of its sessions to the next, 0 on the other dates
+    """
+    if mask is not None:
+        return session_returns(close, mask).iloc[1:].fillna(0.0)
+    returns = close.ffill().pct_change(fill_method=None).iloc[1:]
+    return returns.fillna(0.0)
+
+
+def _allocation_matrix(allocations, tickers) -> pd.DataFrame:
+    if isinstance(allocations, pd.Series):
+        allocations = allocations.to_frame().T
+    if not isinstance(allocations, pd.DataFrame):
+        allocations = pd.DataFrame(np.atleast_2d(allocations), columns=tickers)
+    return allocations.reindex(columns=tickers).fillna(0.0)
+
+
+def _metrics(returns: np.ndarray, wealth: np.ndarray, alpha: float, risk_free: float,
+             periods_per_year: int) -> np.ndarray:
+    """
+    Metrics of a (dates, portfolios) block of returns and wealth
+    """
+    n_obs = len(returns)
+    mean = returns.mean(axis=0)
+    vol = returns.std(axis=0, ddof=1)
+    excess = mean - risk_free / periods_per_year
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(vol > 0, excess / vol * np.sqrt(periods_per_year), np.nan)
+
+    k = min(max(int(np.floor(alpha * n_obs)), 0), n_obs - 1)
+    tail = np.partition(returns, k, axis=0)[:k + 1]
+    var = -tail[k]
+    es = -tail.mean(axis=0)
+
+    peak = np.maximum.accumulate(wealth, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = np.where(peak > 0, 1 - wealth / peak, 0.0)
+    max_drawdown = drawdown.max(axis=0)
+
+    return np.column_stack([
+        mean * periods_per_year,
+        vol * np.sqrt(periods_per_year),
+        sharpe,
+        var,
+        es,
+        max_drawdown,
+    ])
+
+
+def portfolio_metrics(close: pd.DataFrame, allocations, kind: str = "weights", alpha: float = 0.05,
+                      risk_free: float = 0.0, periods_per_year: int = 252,
+                      chunk_size: int = 2048, mask: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Return, volatility, Sharpe ratio, historical VaR and ES, and maximum drawdown
+    of many portfolios
+
+    Parameters:
+        close (pd.DataFrame): The dates x tickers close prices (close_matrix)
+        allocations: (portfolios x tickers) DataFrame or array, or a single Series
+        kind (str): "weights" for constant weights rebalanced every period,
+            "shares" for fixed numbers of shares (buy and hold)
+        alpha (float): The tail probability of the VaR and ES
+        risk_free (float): The annual risk-free rate of the Sharpe ratio
+        periods_per_year (int): 252 for daily data
+        chunk_size (int): The number of portfolios processed per block
+        mask (pd.DataFrame): Optional sessions mask (calendars.align) of the weights returns
+    """
+    allocations = _allocation_matrix(allocations, close.columns)
+    alloc = allocations.to_numpy(dtype=float)
+
+    if kind == "weights":
+        asset = asset_returns(close, mask).to_numpy()
+    elif kind == "shares":
+        # a ticker only counts in a return once it has a price on the previous day:
+        # a listing during the sample is not a gain
+        prices = close.ffill().to_numpy(dtype=float)
+        listed = ~np.isnan(prices[:-1])
+        base = np.where(listed, prices[:-1], 0.0)
+        change = np.where(listed, prices[1:] - prices[:-1], 0.0)
+    else:
+        raise ValueError("kind must be 'weights' or 'shares'")
+
+    blocks = []
+    for start in range(0, len(alloc), chunk_size):
+        block = alloc[start:start + chunk_size]
+        if kind == "weights":
+            returns = asset @ block.T
+            wealth = np.cumprod(1 + returns, axis=0)
+        else:
+            value = base @ block.T
+            with np.errstate(divide="ignore", invalid="ignore"):
+                returns = np.where(value != 0, (change @ block.T) / value, 0.0)
+            wealth = np.cumprod(1 + returns, axis=0)
+        blocks.append(_metrics(returns, wealth, alpha, risk_free, periods_per_year))
+
+    return pd.DataFrame(np.vstack(blocks), index=allocations.index,
+                        columns=["Return", "Volatility", "Sharpe", "VaR", "ES", "Max Drawdown"])
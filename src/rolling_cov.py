@@ -0,0 +1,228 @@
+"""
+Rolling-window and EWMA covariance / correlation matrices of many assets.
+
+The rolling engine keeps the running sums of the returns and of their cross
+products; each new bar adds its outer product and removes the one of the bar
+leaving the window (one rank-2 update), so a (T, N, N) history costs O(T N^2)
+instead of O(T W N^2). The returns are shifted by the first bar to limit the
+cancellation of the sums, and the sums are recomputed exactly from the window every
+`refresh` bars so the rounding errors do not build up.
+
+The results are written into a preallocated (T, N, N) float32 buffer (which can be
+a np.memmap), or streamed one matrix at a time.
+
+NaN returns count as 0, like in risk.asset_returns.
+"""
+
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _to_correlation(cov: np.ndarray) -> np.ndarray:
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(std, std)
+    np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+    return corr
+
+
+class RollingCovariance:
+    """
+    Covariance of the last `window` return vectors, updated bar by bar
+    """
+
+    def __init__(self, n_assets: int, window: int, ddof: int = 1, refresh: Optional[int] = None):
+        """
+        Parameters:
+            n_assets (int): The number of assets
+            window (int): The window length
+            ddof (int): 1 for the sample covariance (like pandas), 0 for the population one
+            refresh (int): Recompute the sums exactly every `refresh` bars, 10 windows by default
+        """
+        if window <= ddof:
+            raise ValueError("window must be larger than ddof")
+        self.window = window
+        self.ddof = ddof
+        self.refresh = refresh or 10 * window
+        self.buffer = np.zeros((window, n_assets))
+        self.sums = np.zeros(n_assets)
+        self.cross = np.zeros((n_assets, n_assets))
+        self.shift = None
+        self.count = 0
+
+    def push(self, returns: np.ndarray):
+        """
+        Add the returns of a new bar
+
+        Parameters:
+            returns (np.ndarray): The (N,) returns of the bar
+        """
+        x = np.nan_to_num(np.asarray(returns, dtype=float))
+        if self.shift is None:
+            self.shift = x.copy()
+        x = x - self.shift
+
+        slot = self.count % self.window
+        self.count += 1
+        if self.count % self.refresh == 0:
+            self.buffer[slot] = x
+            rows = self.buffer[:min(self.count, self.window)]
+            self.sums = rows.sum(axis=0)
+            self.cross = rows.T @ rows
+            return
+        if self.count > self.window:
+            pair = np.stack([x, self.buffer[slot]])
+            self.sums += pair[0] - pair[1]
+            self.cross += pair.T @ (pair * np.array([[1.0], [-1.0]]))
+        else:
+            self.sums += x
+            self.cross += np.outer(x, x)
+        self.buffer[slot] = x
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.window
+
+    def covariance(self) -> np.ndarray:
+        """
+        The (N, N) covariance of the window, NaN until the window is full
+        """
+        if not self.ready:
+            return np.full(self.cross.shape, np.nan)
+        n = self.window
+        cov = (self.cross - np.outer(self.sums, self.sums) / n) / (n - self.ddof)
+        return (cov + cov.T) / 2
+
+    def correlation(self) -> np.ndarray:
+        """
+        The (N, N) correlation of the window, NaN until the window is full
+        """
+        return _to_correlation(self.covariance())
+
+
+class EWMACovariance:
+    """
+    Exponentially weighted covariance updated bar by bar:
+        d = x - mean, mean += alpha * d, cov = (1 - alpha) * (cov + alpha * d d')
+    (pandas ewm(alpha=alpha, adjust=False).cov(bias=True)). With demean=False the
+    mean is 0, as in RiskMetrics: cov = lam * cov + (1 - lam) * x x'.
+    """
+
+    def __init__(self, n_assets: int, lam: float = 0.94, halflife: Optional[float] = None,
+                 demean: bool = True, min_periods: int = 1):
+        """
+        Parameters:
+            n_assets (int): The number of assets
+            lam (float): The decay factor (alpha = 1 - lam)
+            halflife (float): The half-life in bars, overrides lam
+            demean (bool): Subtract the exponentially weighted mean
+            min_periods (int): The number of bars before a value is given
+        """
+        if halflife is not None:
+            lam = 0.5 ** (1.0 / halflife)
+        if not 0 < lam < 1:
+            raise ValueError("lam must be between 0 and 1")
+        self.alpha = 1.0 - lam
+        self.demean = demean
+        self.min_periods = min_periods
+        self.mean = np.zeros(n_assets)
+        self.cov = np.zeros((n_assets, n_assets))
+        self.count = 0
+
+    def push(self, returns: np.ndarray):
+        """
+        Add the returns of a new bar
+
+        Parameters:
+            returns (np.ndarray): The (N,) returns of the bar
+        """
+        x = np.nan_to_num(np.asarray(returns, dtype=float))
+        if self.demean:
+            if self.count == 0:
+                self.mean = x.copy()
+            else:
+                d = x - self.mean
+                self.mean += self.alpha * d
+                self.cov = (1 - self.alpha) * (self.cov + self.alpha * np.outer(d, d))
+        else:
+            self.cov = (1 - self.alpha) * self.cov + self.alpha * np.outer(x, x)
+        self.count += 1
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.min_periods
+
+    def covariance(self) -> np.ndarray:
+        if not self.ready:
+            return np.full(self.cov.shape, np.nan)
+        return self.cov.copy()
+
+    def correlation(self) -> np.ndarray:
+        return _to_correlation(self.covariance())
+
+
+def _engine(n_assets: int, window: Optional[int], lam: Optional[float], halflife: Optional[float], **options):
+    if window is not None:
+        return RollingCovariance(n_assets, window, **options)
+    if lam is None and halflife is None:
+        raise ValueError("give a window, or lam / halflife for the EWMA covariance")
+    return EWMACovariance(n_assets, lam if lam is not None else 0.94, halflife, **options)
+
+
+def iter_covariances(returns: pd.DataFrame, window: Optional[int] = None, lam: Optional[float] = None,
+                     halflife: Optional[float] = None, correlation: bool = False,
+                     **options) -> Iterator[Tuple[object, np.ndarray]]:
+    """
+    Stream the (date, N x N matrix) of every bar once the window is full
+
+    Parameters:
+        returns (pd.DataFrame): The dates x tickers returns (risk.asset_returns), or an array
+        window (int): The rolling window; without a window the covariance is EWMA
+        lam (float): The EWMA decay factor
+        halflife (float): The EWMA half-life in bars
+        correlation (bool): Yield correlations instead of covariances
+        options: ddof, refresh (rolling) or demean, min_periods (EWMA)
+    """
+    index = returns.index if isinstance(returns, pd.DataFrame) else None
+    values = np.asarray(returns, dtype=float)
+    engine = _engine(values.shape[1], window, lam, halflife, **options)
+    for i, row in enumerate(values):
+        engine.push(row)
+        if engine.ready:
+            yield (index[i] if index is not None else i,
+                   engine.correlation() if correlation else engine.covariance())
+
+
+def rolling_covariances(returns: pd.DataFrame, window: Optional[int] = None, lam: Optional[float] = None,
+                        halflife: Optional[float] = None, correlation: bool = False,
+                        out: Optional[np.ndarray] = None, dtype=np.float32, **options) -> np.ndarray:
+    """
+    The (T, N, N) covariance (or correlation) of every bar, NaN before the window is full
+
+    Parameters:
+        returns (pd.DataFrame): The dates x tickers returns (risk.asset_returns), or an array
+        window (int): The rolling window; without a window the covariance is EWMA
+        lam (float): The EWMA decay factor
+        halflife (float): The EWMA half-life in bars
+        correlation (bool): Correlations instead of covariances
+        out (np.ndarray): A preallocated (T, N, N) buffer, e.g. a np.memmap
+        dtype: The dtype of the buffer allocated when out is None
+        options: ddof, refresh (rolling) or demean, min_periods (EWMA)
+    """
+    values = np.asarray(returns, dtype=float)
+    n_obs, n_assets = values.shape
+    if out is None:
+        out = np.empty((n_obs, n_assets, n_assets), dtype=dtype)
+    elif out.shape != (n_obs, n_assets, n_assets):
+        raise ValueError(f"out must have the shape {(n_obs, n_assets, n_assets)}")
+
+    engine = _engine(n_assets, window, lam, halflife, **options)
+    for i, row in enumerate(values):
+        engine.push(row)
+        if engine.ready:
+            out[i] = engine.correlation() if correlation else engine.covariance()
+        else:
+            out[i] = np.nan
+    return out
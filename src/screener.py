@@ -0,0 +1,164 @@
+"""
+Universe screener: computes the Ichimoku, RSI and Bollinger state of every ticker
+of a universe from the local price cache and ranks the buy opportunities.
+
+The tickers are processed in chunks and only the best `top_k` rows of each chunk are
+kept (np.argpartition), so the memory stays bounded for universes of thousands of
+tickers.
+"""
+
+import argparse
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from cache import PriceCache
+from fetcher import stack_frames
+from calendars import align, pack, session_order
+from indicators import bollinger, ichimoku_lines, rsi_array
+
+
+def load_universe(path: str) -> pd.DataFrame:
+    """
+    Load a universe file such as tickers_indices.xlsx or S&P500.csv
+
+    Parameters:
+        path (str): The .xlsx or .csv file, with a "Ticker" column
+    """
+    if path.endswith((".xlsx", ".xls")):
+        universe = pd.read_excel(path, index_col=0, engine="openpyxl")
+    else:
+        universe = pd.read_csv(path, sep=None, engine="python", index_col=0, encoding="utf-8-sig")
+    universe = universe.dropna(how="all").dropna(axis=1, how="all")
+    universe.columns = [str(c).replace("\xa0", " ").strip() for c in universe.columns]
+    universe["Ticker"] = universe["Ticker"].astype(str).str.strip()
+    return universe.drop_duplicates("Ticker").reset_index()
+
+
+def _top_k(table: pd.DataFrame, k: int) -> pd.DataFrame:
+    """
+    Rows with the k highest scores, sorted
+    """
+    if len(table) > k:
+        keep = np.argpartition(-table["Score"].to_numpy(), k - 1)[:k]
+        table = table.iloc[keep]
+    return table.sort_values("Score", ascending=False)
+
+
+def score_chunk(df: pd.DataFrame, tenkan: int = 9, kijun: int = 26, senkou_b: int = 52,
+                displacement: int = 26, rsi_period: int = 14, bb_window: int = 20,
+                bb_std: float = 2.0) -> pd.DataFrame:
+    """
+    Last Ichimoku, RSI and Bollinger values and buy score of every ticker of a long dataframe.
+
+    Score: +1 close above the cloud (-1 below), +1 Tenkan above Kijun, +1 Chikou above
+    the price it is plotted against, +0.5 RSI between 50 and 70 (-0.5 above 70),
+    +0.5 close in the lower fifth of the Bollinger Bands (-0.5 above the upper band).
+
+    Parameters:
+        df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        tenkan, kijun, senkou_b, displacement (int): The Ichimoku windows
+        rsi_period (int): The RSI period
+        bb_window (int): The Bollinger window
+        bb_std (float): The width of the Bollinger Bands in standard deviations
+    """
+    # every indicator runs on the sessions of each ticker, packed to the top of the
+    # columns, and is read at the last session of the ticker (calendars.align)
+    wide, mask = align(df, ["High", "Low", "Close"])
+    mask = mask.to_numpy()
+    order = session_order(mask)
+    high, low, close = (pack(wide[f].to_numpy(), mask, order) for f in ("High", "Low", "Close"))
+    lines = ichimoku_lines(high, low, close, tenkan, kijun, senkou_b, displacement)
+    percent_b = bollinger(pd.DataFrame(close), bb_window, bb_std)["%B"].to_numpy()
+
+    count = mask.sum(axis=0)
+    cols = np.arange(len(count))
+
+    def at(values: np.ndarray, back: int = 0) -> np.ndarray:
+        rows = count - 1 - back
+        return np.where(rows >= 0, values[np.maximum(rows, 0), cols], np.nan)
+
+    last = {
+        "Close": at(close),
+        "Tenkan": at(lines["Tenkan"]),
+        "Kijun": at(lines["Kijun"]),
+        "Cloud Top": np.fmax(at(lines["Senkou A"]), at(lines["Senkou B"])),
+        "Cloud Bottom": np.fmin(at(lines["Senkou A"]), at(lines["Senkou B"])),
+        "Chikou Ref": at(close, displacement),
+        "RSI": at(rsi_array(close, rsi_period)),
+        "%B": at(percent_b),
+    }
+    table = pd.DataFrame(last, index=wide["Close"].columns)
+    table.index.name = "Ticker"
+
+    c = table["Close"]
+    score = (np.where(c > table["Cloud Top"], 1.0, 0.0)
+             - np.where(c < table["Cloud Bottom"], 1.0, 0.0)
+             + np.where(table["Tenkan"] > table["Kijun"], 1.0, 0.0)
+             + np.where(c > table["Chikou Ref"], 1.0, 0.0)
+             + np.where(table["RSI"].between(50, 70), 0.5, 0.0)
+             - np.where(table["RSI"] > 70, 0.5, 0.0)
+             + np.where(table["%B"].between(0, 0.2), 0.5, 0.0)
+             - np.where(table["%B"] > 1, 0.5, 0.0))
+    table["Score"] = score
+    return table.dropna(subset=["Close"]).reset_index()
+
+
+def screen(tickers: List[str], cache: PriceCache, interval: str = "1d", top_k: int = 20,
+           chunk_size: int = 500, lookback: int = 300, universe: Optional[pd.DataFrame] = None,
+           **params) -> pd.DataFrame:
+    """
+    Rank the buy opportunities of a universe from the local price cache
+
+    Parameters:
+        tickers: the tickers list
+        cache (PriceCache): The local price cache
+        interval (str): The interval of the data
+        top_k (int): The number of tickers returned
+        chunk_size (int): The number of tickers loaded at once
+        lookback (int): The number of bars read per ticker (enough for the windows)
+        universe (pd.DataFrame): Optional load_universe table joined to the result
+        params: tenkan, kijun, senkou_b, displacement, rsi_period, bb_window, bb_std (see score_chunk)
+    """
+    best = []
+    for start in range(0, len(tickers), chunk_size):
+        frames = cache.load(tickers[start:start + chunk_size], interval)
+        frames = {t: f.iloc[-lookback:] for t, f in frames.items() if not f.empty}
+        if not frames:
+            continue
+        best.append(_top_k(score_chunk(stack_frames(frames), **params), top_k))
+
+    if not best:
+        return pd.DataFrame()
+    ranked = _top_k(pd.concat(best, ignore_index=True), top_k).reset_index(drop=True)
+    if universe is not None:
+        ranked = ranked.merge(universe, on="Ticker", how="left")
+    ranked.index = ranked.index + 1
+    ranked.index.name = "Rank"
+    return ranked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank the buy opportunities of a universe")
+    parser.add_argument("universe", nargs="?", default="tickers_indices.xlsx",
+                        help="tickers_indices.xlsx or S&P500.csv")
+    parser.add_argument("--cache", default="price_cache", help="price cache directory")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--refresh", action="store_true", help="download the new bars first")
+    args = parser.parse_args()
+
+    universe = load_universe(args.universe)
+    tickers = universe["Ticker"].tolist()
+    cache = PriceCache(args.cache)
+    if args.refresh:
+        cache.update(tickers, interval=args.interval)
+
+    ranked = screen(tickers, cache, args.interval, args.top, args.chunk, universe=universe)
+    print(ranked.round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
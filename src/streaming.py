@@ -0,0 +1,309 @@
+"""
+Incremental indicators: seed them once from the history, then push one new bar
+per ticker. Each update does a constant amount of work (amortized), so an
+intraday refresh does not recompute six years of windows. The last bar can be
+replaced (the partial bar of the current session): every state keeps what its last
+update changed and undoes it first.
+
+The values match the batch versions of indicators.py on the same bars without gaps.
+The stream skips a missing bar, while the batch RSI counts a missing row as a bar
+without change, so with gaps the RSI values differ.
+"""
+
+import math
+from collections import deque
+from typing import Dict, Optional
+
+import pandas as pd
+
+
+class RollingExtreme:
+    """
+    Rolling max (or min) kept with a monotonic deque of (index, value)
+    """
+
+    def __init__(self, window: int, maximum: bool = True):
+        self.window = window
+        self.maximum = maximum
+        self.items = deque()
+        self.count = 0
+        self._undo = None
+
+    def push(self, value: float, replace: bool = False) -> float:
+        """
+        Add a value and return the extreme of the last `window` values
+        (NaN until the window is full)
+
+        Parameters:
+            value (float): The new value
+            replace (bool): Replace the last value instead of adding one
+        """
+        if replace and self._undo is not None:
+            popped, expired = self._undo
+            self.items.pop()
+            self.items.extend(reversed(popped))
+            if expired is not None:
+                self.items.appendleft(expired)
+            self.count -= 1
+
+        popped = []
+        if self.maximum:
+            while self.items and self.items[-1][1] <= value:
+                popped.append(self.items.pop())
+        else:
+            while self.items and self.items[-1][1] >= value:
+                popped.append(self.items.pop())
+        self.items.append((self.count, value))
+        expired = None
+        if self.items[0][0] <= self.count - self.window:
+            expired = self.items.popleft()
+        self.count += 1
+        self._undo = (popped, expired)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.count < self.window:
+            return math.nan
+        return self.items[0][1]
+
+
+class IchimokuState:
+    """
+    Streaming Ichimoku lines of one ticker.
+
+    Senkou A and B are returned for the current bar, i.e. the values computed
+    `displacement` bars ago. Chikou is the current close, which is plotted
+    `displacement` bars back.
+    """
+
+    def __init__(self, tenkan: int = 9, kijun: int = 26, senkou_b: int = 52, displacement: int = 26):
+        self.windows = {"Tenkan": tenkan, "Kijun": kijun, "Senkou B": senkou_b}
+        self.highs = {name: RollingExtreme(w, True) for name, w in self.windows.items()}
+        self.lows = {name: RollingExtreme(w, False) for name, w in self.windows.items()}
+        self.cloud = deque([(math.nan, math.nan)] * displacement, maxlen=displacement + 1)
+        self.last = {}
+        self._dropped = None
+
+    def update(self, high: float, low: float, close: float, replace: bool = False) -> Dict[str, float]:
+        """
+        Push a new bar and return the Ichimoku lines for it
+
+        Parameters:
+            high, low, close (float): The prices of the new bar
+            replace (bool): Replace the last bar instead of adding one
+        """
+        if replace and self.last:
+            self.cloud.pop()
+            if self._dropped is not None:
+                self.cloud.appendleft(self._dropped)
+        else:
+            replace = False
+        mid = {name: (self.highs[name].push(high, replace) + self.lows[name].push(low, replace)) / 2
+               for name in self.windows}
+        self._dropped = self.cloud[0] if len(self.cloud) == self.cloud.maxlen else None
+        self.cloud.append(((mid["Tenkan"] + mid["Kijun"]) / 2, mid["Senkou B"]))
+        senkou_a, senkou_b = self.cloud[0]
+        self.last = {
+            "Tenkan": mid["Tenkan"],
+            "Kijun": mid["Kijun"],
+            "Senkou A": senkou_a,
+            "Senkou B": senkou_b,
+            "Chikou": close,
+        }
+        return self.last
+
+
+class RSIState:
+    """
+    Streaming RSI of one ticker with the Wilder smoothing
+    """
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.count = 0
+        self.last = math.nan
+        self._previous = None
+
+    def update(self, close: float, replace: bool = False) -> float:
+        """
+        Push a new close and return the RSI (NaN during the first `period` bars).
+        A non-finite close is ignored.
+
+        Parameters:
+            close (float): The new close
+            replace (bool): Replace the last close instead of adding one
+        """
+        if not math.isfinite(close):
+            return self.last
+        if replace and self._previous is not None:
+            self.prev_close, self.avg_gain, self.avg_loss, self.count, self.last = self._previous
+        self._previous = (self.prev_close, self.avg_gain, self.avg_loss, self.count, self.last)
+        if self.prev_close is None:
+            self.prev_close = close
+            return self.last
+
+        change = close - self.prev_close
+        self.prev_close = close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.count += 1
+
+        if self.count <= self.period:
+            # simple average of the first `period` changes seeds the smoothing
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return self.last
+        else:
+            self.avg_gain += (gain - self.avg_gain) / self.period
+            self.avg_loss += (loss - self.avg_loss) / self.period
+
+        if self.avg_loss == 0:
+            self.last = 100.0 if self.avg_gain > 0 else 50.0
+        else:
+            self.last = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        return self.last
+
+
+class BollingerState:
+    """
+    Streaming Bollinger Bands of one ticker, from a running sum and sum of squares
+    (population standard deviation)
+    """
+
+    def __init__(self, window: int = 20, n_std: float = 2.0):
+        self.window = window
+        self.n_std = n_std
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.last = {"Middle": math.nan, "Upper": math.nan, "Lower": math.nan}
+        self._undo = None
+
+    def update(self, close: float, replace: bool = False) -> Dict[str, float]:
+        """
+        Push a new close and return the middle, upper and lower bands.
+        A non-finite close is ignored.
+
+        Parameters:
+            close (float): The new close
+            replace (bool): Replace the last close instead of adding one
+        """
+        if not math.isfinite(close):
+            return self.last
+        if replace and self._undo is not None:
+            old, self.last = self._undo
+            value = self.values.pop()
+            self.total -= value
+            self.total_sq -= value * value
+            if old is not None:
+                self.values.appendleft(old)
+                self.total += old
+                self.total_sq += old * old
+
+        old, last = None, self.last
+        self.values.append(close)
+        self.total += close
+        self.total_sq += close * close
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        self._undo = (old, last)
+        if len(self.values) < self.window:
+            return self.last
+
+        mean = self.total / self.window
+        std = math.sqrt(max(self.total_sq / self.window - mean * mean, 0.0))
+        self.last = {
+            "Middle": mean,
+            "Upper": mean + self.n_std * std,
+            "Lower": mean - self.n_std * std,
+        }
+        return self.last
+
+
+class IndicatorStream:
+    """
+    Ichimoku, RSI and Bollinger states for a universe of tickers
+    """
+
+    def __init__(self, tenkan: int = 9, kijun: int = 26, senkou_b: int = 52, displacement: int = 26,
+                 rsi_period: int = 14, bb_window: int = 20, bb_std: float = 2.0):
+        self.params = dict(tenkan=tenkan, kijun=kijun, senkou_b=senkou_b, displacement=displacement)
+        self.rsi_period = rsi_period
+        self.bb_window = bb_window
+        self.bb_std = bb_std
+        self.states = {}
+        self.last_date = {}
+
+    def _state(self, ticker: str):
+        if ticker not in self.states:
+            self.states[ticker] = (IchimokuState(**self.params),
+                                   RSIState(self.rsi_period),
+                                   BollingerState(self.bb_window, self.bb_std))
+        return self.states[ticker]
+
+    def update(self, ticker: str, open: float, high: float, low: float, close: float,
+               date: Optional[pd.Timestamp] = None) -> Dict[str, float]:
+        """
+        Push one new OHLC bar for a ticker and return its indicators
+
+        Parameters:
+            ticker (str): The ticker symbol
+            open, high, low, close (float): The prices of the new bar
+            date (pd.Timestamp): The date of the bar; a bar dated like the last one replaces
+                it (the partial bar of the session), older bars are ignored
+
+        Bars with a missing (non-finite) high, low or close are ignored.
+        """
+        if not all(math.isfinite(v) for v in (high, low, close)):
+            return self.snapshot(ticker)
+        replace = False
+        if date is not None:
+            last = self.last_date.get(ticker)
+            if last is not None and date < last:
+                return self.snapshot(ticker)
+            replace = date == last
+            self.last_date[ticker] = date
+
+        ichimoku, rsi, bollinger = self._state(ticker)
+        ichimoku.update(high, low, close, replace)
+        rsi.update(close, replace)
+        bollinger.update(close, replace)
+        return self.snapshot(ticker)
+
+    def seed(self, df: pd.DataFrame):
+        """
+        Feed the history of the long dataframe returned by final_df
+
+        Parameters:
+            df (pd.DataFrame): The long dataframe (Date index, "Ticker" column)
+        """
+        df = df.dropna(subset=["High", "Low", "Close"]).sort_index(kind="stable")
+        dates = df.index
+        columns = df[["Ticker", "Open", "High", "Low", "Close"]].itertuples(index=False, name=None)
+        for date, (ticker, o, h, l, c) in zip(dates, columns):
+            self.update(ticker, o, h, l, c, date)
+
+    def snapshot(self, ticker: str) -> Dict[str, float]:
+        """
+        Current indicator values of a ticker
+
+        Parameters:
+            ticker (str): The ticker symbol
+        """
+        ichimoku, rsi, bollinger = self._state(ticker)
+        values = dict(ichimoku.last)
+        values["RSI"] = rsi.last
+        values.update({f"BB {name}": value for name, value in bollinger.last.items()})
+        return values
+
+    def table(self) -> pd.DataFrame:
+        """
+        Current indicator values of every ticker, one row per ticker
+        """
+        return pd.DataFrame({ticker: self.snapshot(ticker) for ticker in self.states}).T
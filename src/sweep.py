@@ -0,0 +1,126 @@
+"""
+Parameter sweep of the Ichimoku windows (tenkan, kijun, senkou_b, displacement).
+
+The workers open the same memory-mapped MatrixStore instead of receiving pickled
+dataframes, and each worker keeps the rolling (highest high + lowest low) / 2 of
+every window length it has already computed, so grid points sharing a window reuse
+it. The grid is sorted before being split in tasks so that neighbouring points,
+which share windows, land in the same worker.
+"""
+
+import itertools
+import math
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest import backtest_arrays, ichimoku_signal_arrays, listed_mask, portfolio_pnl, summarize
+from indicators import midpoint, shift
+from matrix_store import MatrixStore
+
+_data = {}
+
+
+def ichimoku_grid(tenkans: Iterable[int] = (7, 9, 12), kijuns: Iterable[int] = (22, 26, 30),
+                  senkou_bs: Iterable[int] = (44, 52, 60),
+                  displacements: Iterable[int] = (22, 26, 30)) -> List[Tuple[int, int, int, int]]:
+    """
+    All the (tenkan, kijun, senkou_b, displacement) combinations with tenkan < kijun < senkou_b
+
+    Parameters:
+        tenkans, kijuns, senkou_bs, displacements: The values tested for each window
+    """
+    return [p for p in itertools.product(tenkans, kijuns, senkou_bs, displacements)
+            if p[0] < p[1] < p[2]]
+
+
+def _init_worker(root: str, start, end, fee_bps: float, slippage_bps: float, cache_size: Optional[int]):
+    store = MatrixStore(root)
+    rows = store.dates.slice_indexer(start, end)
+    _data.clear()
+    close = np.asarray(store.matrix("Close")[rows], dtype=float)
+    _data.update({
+        "High": store.matrix("High")[rows],
+        "Low": store.matrix("Low")[rows],
+        "Close": close,
+        "Listed": listed_mask(close),
+        "fee_bps": fee_bps,
+        "slippage_bps": slippage_bps,
+        "cache_size": cache_size,
+        "midpoints": OrderedDict(),
+    })
+
+
+def _midpoint(window: int) -> np.ndarray:
+    """
+    Rolling midpoint of the worker's matrices, kept in an LRU cache (every window when
+    the cache size is None)
+    """
+    cache = _data["midpoints"]
+    if window in cache:
+        cache.move_to_end(window)
+        return cache[window]
+    values = midpoint(_data["High"], _data["Low"], window)
+    cache[window] = values
+    if _data["cache_size"] is not None and len(cache) > _data["cache_size"]:
+        cache.popitem(last=False)
+    return values
+
+
+def _evaluate(points: List[Tuple[int, int, int, int]]) -> List[dict]:
+    close = _data["Close"]
+    rows = []
+    for tenkan, kijun, senkou_b, displacement in points:
+        tenkan_line = _midpoint(tenkan)
+        kijun_line = _midpoint(kijun)
+        lines = {
+            "Tenkan": tenkan_line,
+            "Kijun": kijun_line,
+            "Senkou A": shift((tenkan_line + kijun_line) / 2, displacement),
+            "Senkou B": shift(_midpoint(senkou_b), displacement),
+        }
+        signals = ichimoku_signal_arrays(close, lines, displacement)
+        result = backtest_arrays(close, signals["Entry"], signals["Exit"],
+                                 _data["fee_bps"], _data["slippage_bps"])
+        portfolio = portfolio_pnl(result["PnL"], _data["Listed"])[:, None]
+        # the position changes of every ticker as one column: the entries of all the tickers
+        stats = summarize(portfolio, result["Trades"].reshape(-1, 1))
+        rows.append({
+            "tenkan": tenkan, "kijun": kijun, "senkou_b": senkou_b, "displacement": displacement,
+            **{name: value[0] for name, value in stats.items()},
+        })
+    return rows
+
+
+def run_sweep(root: str, grid: Optional[List[Tuple[int, int, int, int]]] = None, start=None, end=None,
+              fee_bps: float = 5.0, slippage_bps: float = 5.0, n_workers: int = 1,
+              cache_size: Optional[int] = None) -> pd.DataFrame:
+    """
+    Backtest every grid point on the whole universe of a MatrixStore and rank them
+
+    Parameters:
+        root (str): The directory of the MatrixStore (High, Low and Close fields)
+        grid: The (tenkan, kijun, senkou_b, displacement) tuples, ichimoku_grid() by default
+        start, end: Optional first and last dates of the backtest
+        fee_bps, slippage_bps (float): The trading costs in basis points
+        n_workers (int): The number of processes, 1 runs in the current process
+        cache_size (int): The number of rolling midpoints kept by each worker; None keeps
+            every distinct window (|tenkans| + |kijuns| + |senkou_bs| matrices), a bound
+            below that recomputes windows since the grid cycles through the senkou_b ones
+    """
+    grid = sorted(set(grid if grid is not None else ichimoku_grid()))
+    init_args = (root, start, end, fee_bps, slippage_bps, cache_size)
+
+    if n_workers > 1:
+        size = max(1, math.ceil(len(grid) / (n_workers * 4)))
+        tasks = [grid[i:i + size] for i in range(0, len(grid), size)]
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=init_args) as pool:
+            rows = [row for part in pool.map(_evaluate, tasks) for row in part]
+    else:
+        _init_worker(*init_args)
+        rows = _evaluate(grid)
+
+    return pd.DataFrame(rows).sort_values("Sharpe", ascending=False, ignore_index=True)
@@ -0,0 +1,132 @@
+"""
+Mark-to-market valuation of many accounts from a transactions ledger.
+
+Each transaction is a change of shares of one ticker in one account at a date. The
+changes are scattered into a (dates x positions) matrix with one column per
+(account, ticker) pair actually held; a cumulative sum along the dates gives the
+forward-filled positions, one product with the matching price columns gives their
+value, and a reduceat over the columns sorted by account gives the daily value of
+every account. The columns are processed in blocks sized to a memory budget and no
+DataFrame is built per account.
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+
+def _pair_blocks(pair_accounts: np.ndarray, n_dates: int, max_bytes: int):
+    """
+    Split the (account, ticker) positions, sorted by account, in consecutive blocks
+    that never cut an account and whose (dates x positions) array fits the budget
+    """
+    starts = np.flatnonzero(np.r_[True, pair_accounts[1:] != pair_accounts[:-1]])
+    ends = np.r_[starts[1:], len(pair_accounts)]
+    per_block = max(1, max_bytes // (8 * max(n_dates, 1)))
+    first = 0
+    while first < len(starts):
+        last = first
+        while last + 1 < len(starts) and ends[last + 1] - starts[first] <= per_block:
+            last += 1
+        yield starts[first], ends[last]
+        first = last + 1
+
+
+def value_ledger(ledger: pd.DataFrame, close: pd.DataFrame, as_of=None,
+                 max_bytes: int = 256 * 2 ** 20) -> Dict[str, pd.DataFrame]:
+    """
+    Daily value, P&L and weights of every account of a ledger
+
+    Parameters:
+        ledger (pd.DataFrame): Columns Date, Account, Ticker, Shares (change of shares)
+            and optionally Price (trade price, the close of the date otherwise)
+        close (pd.DataFrame): The dates x tickers close prices (close_matrix)
+        as_of: The date of the weights table, the last date by default
+        max_bytes (int): The memory budget of a block of positions
+
+    Returns "Value" and "PnL" (dates x accounts; P&L is the change of value minus the
+    cost of the trades of the day), "Flows" (dates x accounts) and "Weights"
+    (Account, Ticker, Shares, Value, Weight at the as_of date)
+    """
+    missing = {"Date", "Account", "Ticker", "Shares"} - set(ledger.columns)
+    if missing:
+        raise ValueError(f"Ledger columns missing: {sorted(missing)}")
+
+    prices = close.sort_index().ffill()
+    dates = prices.index
+    price_values = prices.fillna(0.0).to_numpy(dtype=float)
+
+    priced = prices.notna().to_numpy()
+    first_price = np.where(priced.any(axis=0), priced.argmax(axis=0), len(dates))
+    ticker_codes = prices.columns.get_indexer(ledger["Ticker"])
+    unknown = ledger.loc[(ticker_codes < 0) | (first_price[ticker_codes] == len(dates)), "Ticker"].unique()
+    if len(unknown):
+        raise KeyError(f"Tickers without prices: {list(unknown)}")
+
+    # a trade on a day without a bar counts from the next bar, and a trade before the
+    # first price of its ticker from that first price (it would be valued at 0 before)
+    date_codes = dates.searchsorted(pd.to_datetime(ledger["Date"]).to_numpy(), side="left")
+    date_codes = np.maximum(date_codes, first_price[ticker_codes])
+    in_range = date_codes < len(dates)
+    account_codes, account_names = pd.factorize(ledger["Account"], sort=True)
+
+    shares = ledger["Shares"].to_numpy(dtype=float)
+    if "Price" in ledger.columns:
+        trade_price = ledger["Price"].to_numpy(dtype=float)
+        fallback = price_values[np.minimum(date_codes, len(dates) - 1), ticker_codes]
+        trade_price = np.where(np.isnan(trade_price), fallback, trade_price)
+    else:
+        trade_price = price_values[np.minimum(date_codes, len(dates) - 1), ticker_codes]
+
+    a, d, t, s, p = (account_codes[in_range], date_codes[in_range], ticker_codes[in_range],
+                     shares[in_range], trade_price[in_range])
+
+    n_accounts = len(account_names)
+    flows = np.zeros((len(dates), n_accounts))
+    np.add.at(flows, (d, a), s * p)
+
+    as_of_row = len(dates) - 1 if as_of is None else dates.searchsorted(pd.Timestamp(as_of), side="right") - 1
+
+    # one column per (account, ticker) position actually held, sorted by account
+    pair_keys = a.astype(np.int64) * len(prices.columns) + t
+    pairs, pair_codes = np.unique(pair_keys, return_inverse=True)
+    pair_accounts = pairs // len(prices.columns)
+    pair_tickers = pairs % len(prices.columns)
+
+    value = np.zeros((len(dates), n_accounts))
+    weight_parts = []
+    for first, last in _pair_blocks(pair_accounts, len(dates), max_bytes):
+        rows = (pair_codes >= first) & (pair_codes < last)
+        changes = np.zeros((len(dates), last - first))
+        np.add.at(changes, (d[rows], pair_codes[rows] - first), s[rows])
+        positions = np.cumsum(changes, axis=0)
+        position_value = positions * price_values[:, pair_tickers[first:last]]
+
+        block_accounts = pair_accounts[first:last]
+        starts = np.flatnonzero(np.r_[True, block_accounts[1:] != block_accounts[:-1]])
+        value[:, block_accounts[starts]] = np.add.reduceat(position_value, starts, axis=1)
+
+        if as_of_row >= 0:
+            held = np.flatnonzero(positions[as_of_row])
+            weight_parts.append(pd.DataFrame({
+                "Account": account_names[block_accounts[held]],
+                "Ticker": prices.columns[pair_tickers[first + held]],
+                "Shares": positions[as_of_row, held],
+                "Value": position_value[as_of_row, held],
+            }))
+
+    pnl = np.diff(value, axis=0, prepend=0.0) - flows
+
+    weights = (pd.concat(weight_parts, ignore_index=True) if weight_parts
+               else pd.DataFrame(columns=["Account", "Ticker", "Shares", "Value"]))
+    total = weights.groupby("Account")["Value"].transform("sum")
+    weights["Weight"] = np.where(total != 0, weights["Value"] / total.where(total != 0, 1.0), np.nan)
+
+    accounts = pd.Index(account_names, name="Account")
+    return {
+        "Value": pd.DataFrame(value, index=dates, columns=accounts),
+        "PnL": pd.DataFrame(pnl, index=dates, columns=accounts),
+        "Flows": pd.DataFrame(flows, index=dates, columns=accounts),
+        "Weights": weights,
+    }
@@ -0,0 +1,147 @@
+"""
+Walk-forward optimization: on rolling train/test windows, pick the best parameters
+in-sample and evaluate them out-of-sample.
+
+The indicators only look backward, so the P&L of a parameter set is computed once on
+the whole history and every window is a slice of it. The P&L per parameter set and
+the score per (parameter set, window) are memoized in a WalkForwardCache, so the
+overlapping windows and the later runs reuse them instead of running
+N_windows x N_params full backtests.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest import backtest_arrays, ichimoku_signal_arrays, listed_mask, portfolio_pnl, summarize
+from indicators import midpoint, shift
+
+
+class WalkForwardCache:
+    """
+    Memoized indicators, P&L and window scores of a price history
+    """
+
+    def __init__(self, high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame):
+        self.index = close.index
+        self.high = high.reindex(index=close.index, columns=close.columns).to_numpy(dtype=float)
+        self.low = low.reindex(index=close.index, columns=close.columns).to_numpy(dtype=float)
+        self.close = close.to_numpy(dtype=float)
+        self.listed = listed_mask(self.close)
+        self.midpoints = {}
+        self.pnl = {}
+        self.scores = {}
+
+    def midpoint(self, window: int) -> np.ndarray:
+        """
+        Rolling (highest high + lowest low) / 2, computed once per window length
+
+        Parameters:
+            window (int): The window length
+        """
+        if window not in self.midpoints:
+            self.midpoints[window] = midpoint(self.high, self.low, window)
+        return self.midpoints[window]
+
+    def portfolio_pnl(self, params: Tuple, strategy: Callable) -> np.ndarray:
+        """
+        Daily P&L of the portfolio equally weighted between the listed tickers,
+        computed once per parameter set
+
+        Parameters:
+            params (tuple): The parameters of the strategy
+            strategy: function(cache, params) -> (dates, tickers) P&L array
+        """
+        key = (strategy, params)
+        if key not in self.pnl:
+            self.pnl[key] = portfolio_pnl(strategy(self, params), self.listed)
+        return self.pnl[key]
+
+    def score(self, params: Tuple, strategy: Callable, start: int, end: int) -> Dict[str, float]:
+        """
+        Metrics of a parameter set on the rows [start, end), memoized per window
+
+        Parameters:
+            params (tuple): The parameters of the strategy
+            strategy: function(cache, params) -> (dates, tickers) P&L array
+            start, end (int): The row range of the window
+        """
+        key = (strategy, params, start, end)
+        if key not in self.scores:
+            pnl = self.portfolio_pnl(params, strategy)[start:end, None]
+            trades = np.zeros_like(pnl)
+            self.scores[key] = {name: float(value[0]) for name, value in summarize(pnl, trades).items()
+                                if name != "Trades"}
+        return self.scores[key]
+
+
+def ichimoku_strategy(cache: WalkForwardCache, params: Tuple, fee_bps: float = 5.0,
+                      slippage_bps: float = 5.0) -> np.ndarray:
+    """
+    P&L of the Ichimoku strategy of backtest.py for one (tenkan, kijun, senkou_b, displacement)
+
+    Parameters:
+        cache (WalkForwardCache): The memoized price history
+        params (tuple): (tenkan, kijun, senkou_b, displacement)
+        fee_bps, slippage_bps (float): The trading costs in basis points
+    """
+    tenkan, kijun, senkou_b, displacement = params
+    tenkan_line = cache.midpoint(tenkan)
+    kijun_line = cache.midpoint(kijun)
+    lines = {
+        "Tenkan": tenkan_line,
+        "Kijun": kijun_line,
+        "Senkou A": shift((tenkan_line + kijun_line) / 2, displacement),
+        "Senkou B": shift(cache.midpoint(senkou_b), displacement),
+    }
+    signals = ichimoku_signal_arrays(cache.close, lines, displacement)
+    return backtest_arrays(cache.close, signals["Entry"], signals["Exit"], fee_bps, slippage_bps)["PnL"]
+
+
+def walk_forward(cache: WalkForwardCache, param_grid: List[Tuple], train: int = 756, test: int = 252,
+                 step: Optional[int] = None, metric: str = "Sharpe",
+                 strategy: Callable = ichimoku_strategy) -> Dict[str, pd.DataFrame]:
+    """
+    Rolling walk-forward optimization
+
+    Parameters:
+        cache (WalkForwardCache): The memoized price history, reusable between runs
+        param_grid: The parameter sets tested in each training window
+        train (int): The number of bars of a training window
+        test (int): The number of bars of a testing window
+        step (int): The shift between two windows, test by default
+        metric (str): The in-sample metric maximized (Sharpe, Total Return)
+        strategy: function(cache, params) -> (dates, tickers) P&L array
+
+    Returns a "Windows" table (best parameters, in-sample and out-of-sample metrics
+    of each window) and the stitched out-of-sample "PnL"
+    """
+    step = step or test
+    n_rows = len(cache.index)
+    if train + test > n_rows:
+        raise ValueError("Not enough bars for one train and test window")
+
+    rows = []
+    pieces = []
+    for start in range(0, n_rows - train - test + 1, step):
+        train_end = start + train
+        test_end = train_end + test
+        in_sample = {params: cache.score(params, strategy, start, train_end)[metric] for params in param_grid}
+        best = max(in_sample, key=lambda p: -np.inf if np.isnan(in_sample[p]) else in_sample[p])
+        out_sample = cache.score(best, strategy, train_end, test_end)
+
+        rows.append({
+            "Train Start": cache.index[start],
+            "Test Start": cache.index[train_end],
+            "Test End": cache.index[test_end - 1],
+            "Params": best,
+            f"In-Sample {metric}": in_sample[best],
+            **{f"Out-Sample {name}": value for name, value in out_sample.items()},
+        })
+        pieces.append(pd.Series(cache.portfolio_pnl(best, strategy)[train_end:test_end],
+                                index=cache.index[train_end:test_end]))
+
+    pnl = pd.concat(pieces)
+    pnl = pnl[~pnl.index.duplicated(keep="last")]
+    return {"Windows": pd.DataFrame(rows), "PnL": pnl.rename("PnL").to_frame()}
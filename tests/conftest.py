@@ -0,0 +1,15 @@
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "Exos"))
+
+
+def load_script(name: str):
+    """ Import an Exos script whose file name is not a module name """
+    spec = importlib.util.spec_from_file_location(name.replace(" ", "_"), os.path.join(ROOT, "Exos", f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,66 @@
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from adjusted import AdjustedStore, adjustment_factors, events_from_yahoo
+
+DATES = pd.bdate_range("2024-01-01", periods=6, name="Date")
+
+
+def raw_bars(close, dates=DATES):
+    close = np.asarray(close, dtype=float)
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close,
+                         "Volume": 100.0}, index=dates[:len(close)])
+
+
+def events(*rows):
+    return pd.DataFrame(rows, columns=["Date", "Ticker", "Type", "Value"])
+
+
+def test_adjustment_factors_by_hand():
+    close = pd.Series([100.0, 102, 50, 51, 50, 52], index=DATES)
+    # 2-for-1 split on day 2, dividend of 1 on day 4 (previous close 51)
+    factors = adjustment_factors(close, events((DATES[2], "X", "split", 2.0), (DATES[4], "X", "dividend", 1.0)))
+    dividend = 1 - 1 / 51
+    assert factors["Price Factor"].tolist() == pytest.approx([0.5 * dividend] * 2 + [dividend] * 2 + [1, 1])
+    assert factors["Volume Factor"].tolist() == pytest.approx([2, 2, 1, 1, 1, 1])
+
+
+def test_store_reads_adjusted_bars(tmp_path):
+    store = AdjustedStore(str(tmp_path))
+    store.write_raw("X", raw_bars([100, 102, 50, 51]))
+    store.add_events(events((DATES[2], "X", "split", 2.0)))
+
+    adjusted = AdjustedStore(str(tmp_path)).read("X")
+    assert adjusted["Close"].tolist() == [50, 51, 50, 51]
+    assert adjusted["Volume"].tolist() == [200, 200, 100, 100]
+    assert store.read("X", adjusted=False)["Close"].tolist() == [100, 102, 50, 51]
+
+
+def test_overlapping_download_across_a_split(tmp_path):
+    store = AdjustedStore(str(tmp_path))
+    store.write_raw("X", raw_bars([100, 102, 104]))
+    # a 2-for-1 split on day 3, then a re-download that overlaps the stored days with
+    # prices already adjusted for it
+    store.add_events(events((DATES[3], "X", "split", 2.0)))
+    store.write_raw("X", raw_bars([50, 51, 52, 53, 54]))
+
+    assert store.read("X", adjusted=False)["Close"].tolist() == [100, 102, 104, 53, 54]
+    assert store.read("X")["Close"].tolist() == [50, 51, 52, 53, 54]
+
+
+def test_yahoo_splits_after_storage(monkeypatch):
+    index = pd.DatetimeIndex(DATES, tz="America/New_York")
+    actions = pd.DataFrame({"Dividends": [0, 0, 0.5, 0, 0, 0], "Stock Splits": [0, 2.0, 0, 0, 4.0, 0]},
+                           index=index, dtype=float)
+    module = types.SimpleNamespace(Ticker=lambda ticker: types.SimpleNamespace(actions=actions.copy()))
+    monkeypatch.setitem(sys.modules, "yfinance", module)
+
+    found = events_from_yahoo(["X", "Y"], {"X": DATES[2]})
+    splits = found[found["Type"] == "split"]
+    assert splits[["Ticker", "Value"]].values.tolist() == [["X", 4.0]]
+    assert (found["Type"] == "dividend").sum() == 2
+    assert len(events_from_yahoo(["X"], include_splits=True).query("Type == 'split'")) == 2
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import backtest, ichimoku_signal_arrays, positions_from_signals, summarize
+
+DATES = pd.bdate_range("2024-01-01", periods=6, name="Date")
+
+
+def test_positions_from_signals():
+    entries = np.array([[0, 1, 0, 0, 1, 0]], dtype=bool).T
+    exits = np.array([[0, 0, 0, 1, 1, 0]], dtype=bool).T
+    # an exit on the same bar as an entry wins
+    assert positions_from_signals(entries, exits)[:, 0].tolist() == [0, 1, 1, 0, 0, 0]
+
+
+def test_backtest_by_hand():
+    close = pd.DataFrame({"AAA": [10.0, 11, 12, 12, 9, 10]}, index=DATES)
+    entries = pd.DataFrame({"AAA": [True, False, False, False, False, False]}, index=DATES)
+    exits = pd.DataFrame({"AAA": [False, False, True, False, False, False]}, index=DATES)
+    result = backtest(close, entries, exits, fee_bps=10, slippage_bps=0)
+
+    # in the market on days 1 and 2 (one bar of lag), out from day 3
+    returns = close["AAA"].pct_change().fillna(0)
+    positions = [0, 1, 1, 0, 0, 0]
+    costs = np.array([0, 1, 0, 1, 0, 0]) * 0.001
+    assert result["Positions"]["AAA"].tolist() == positions
+    np.testing.assert_allclose(result["PnL"]["AAA"], returns * positions - costs)
+    summary = result["Summary"].loc["AAA"]
+    assert summary["Total Return"] == pytest.approx(np.prod(1 + (returns * positions - costs)) - 1)
+    assert summary["Trades"] == 1
+
+
+def test_portfolio_ignores_tickers_not_listed_yet():
+    close = pd.DataFrame({"OLD": [10.0, 11, 12.1, 13.31, 14.641, 16.1051],
+                          "NEW": [np.nan, np.nan, np.nan, 5, 5, 5]}, index=DATES)
+    entries = pd.DataFrame(True, index=DATES, columns=close.columns)
+    exits = pd.DataFrame(False, index=DATES, columns=close.columns)
+    result = backtest(close, entries, exits, fee_bps=0, slippage_bps=0)
+
+    pnl = result["Portfolio"]["PnL"]
+    # OLD alone earns 10% a day until NEW is listed, then the capital is split
+    assert pnl.iloc[1:3].tolist() == pytest.approx([0.1, 0.1])
+    assert pnl.iloc[4:].tolist() == pytest.approx([0.05, 0.05])
+
+    mask = pd.DataFrame(True, index=DATES, columns=close.columns)
+    assert backtest(close, entries, exits, fee_bps=0, slippage_bps=0,
+                    mask=mask)["Portfolio"]["PnL"].iloc[1] == pytest.approx(0.05)
+
+
+def test_no_cross_on_the_first_valid_bar():
+    nan = np.nan
+    lines = {"Tenkan": np.array([[nan, 2.0, 3.0, 1.0, 3.0]]).T,
+             "Kijun": np.array([[nan, 1.0, 2.0, 2.0, 2.0]]).T,
+             "Senkou A": np.zeros((5, 1)), "Senkou B": np.zeros((5, 1))}
+    signals = ichimoku_signal_arrays(np.full((5, 1), 10.0), lines, displacement=1)
+    assert signals["TK Cross Up"][:, 0].tolist() == [False, False, False, False, True]
+    assert signals["TK Cross Down"][:, 0].tolist() == [False, False, False, True, False]
+
+
+def test_summarize_by_hand():
+    pnl = np.array([[0.1], [-0.5], [0.2]])
+    stats = summarize(pnl, np.array([[1.0], [-1.0], [1.0]]), periods_per_year=1)
+    assert stats["Total Return"][0] == pytest.approx(1.1 * 0.5 * 1.2 - 1)
+    assert stats["Max Drawdown"][0] == pytest.approx(0.5)
+    assert stats["Sharpe"][0] == pytest.approx(pnl.mean() / pnl.std(ddof=1))
+    assert stats["Trades"][0] == 2
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from cache import PriceCache
+from fetcher import FrameProvider
+
+
+def daily(years, end=None):
+    end = (end or pd.Timestamp.now()).normalize()
+    dates = pd.bdate_range(end - pd.DateOffset(years=years), end, name="Date")
+    close = pd.Series(range(len(dates)), index=dates, dtype=float) + 100
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1e6})
+
+
+class RecordingProvider(FrameProvider):
+    def __init__(self, frames):
+        super().__init__(frames)
+        self.calls = []
+
+    def fetch(self, tickers, period="6y", interval="1d", start=None):
+        self.calls.append((list(tickers), period, start))
+        return super().fetch(tickers, period, interval, start)
+
+
+def test_update_is_incremental(tmp_path):
+    full = daily(2)
+    provider = RecordingProvider({"AAA": full.iloc[:-5]})
+    cache = PriceCache(str(tmp_path))
+    first = cache.update(["AAA"], provider, period="1y", backoff=0)["AAA"]
+    assert first.index[0] >= full.index[-1] - pd.DateOffset(years=1) - pd.Timedelta(days=7)
+    assert cache.last_bar("AAA") == full.index[-6]
+
+    provider.frames["AAA"] = full
+    second = cache.update(["AAA"], provider, period="1y", backoff=0)["AAA"]
+    assert provider.calls[-1] == (["AAA"], "1y", full.index[-6])
+    assert len(second) == len(first) + 5
+    pd.testing.assert_frame_equal(second, full.loc[first.index[0]:], check_freq=False)
+
+    # a new PriceCache reads the index written by the first one
+    assert PriceCache(str(tmp_path)).last_bar("AAA") == full.index[-1]
+
+
+def test_update_backfills_a_longer_period(tmp_path):
+    provider = RecordingProvider({"AAA": daily(3)})
+    cache = PriceCache(str(tmp_path))
+    short = cache.update(["AAA"], provider, period="1y", backoff=0)["AAA"]
+
+    long = cache.update(["AAA"], provider, period="2y", backoff=0)["AAA"]
+    assert provider.calls[-1][2] is None
+    assert long.index[0] < short.index[0] - pd.DateOffset(months=11)
+
+    # the longer history is recorded: a shorter period is incremental again
+    cache.update(["AAA"], provider, period="1y", backoff=0)
+    assert provider.calls[-1][2] == long.index[-1]
+
+
+def test_recent_listing_is_not_downloaded_again(tmp_path):
+    provider = RecordingProvider({"NEW": daily(1)})
+    cache = PriceCache(str(tmp_path))
+    cache.update(["NEW"], provider, period="5y", backoff=0)
+    cache.update(["NEW"], provider, period="5y", backoff=0)
+    assert [c[2] is None for c in provider.calls] == [True, False]
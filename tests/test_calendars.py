@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from calendars import align, exchange_of, session_returns
+
+
+def test_exchange_of():
+    assert exchange_of("AAPL") == "XNYS"
+    assert exchange_of("AIR.PA") == "XPAR"
+    assert exchange_of("000002.SZ") == "XSHE"
+    assert exchange_of("RELIANCE.NS") == "XNSE"
+    assert exchange_of("^FCHI") == "XPAR"
+    assert exchange_of("^N225") == "XTKS"
+    assert exchange_of("^GSPC") == "XNYS"
+    assert exchange_of("^UNKNOWN") is None
+    assert exchange_of("EURUSD=X") is None
+    assert exchange_of("CL=F") is None
+    assert exchange_of("FOO.ZZ") is None
+
+
+def test_unknown_exchange_uses_its_own_bars():
+    dates = pd.bdate_range("2024-01-01", periods=6, name="Date")
+    us = pd.DataFrame({"Close": np.arange(6.0), "Ticker": "AAPL"}, index=dates)
+    # the currency has no bar on the third day: it is not a session of its own
+    fx = pd.DataFrame({"Close": np.arange(5.0), "Ticker": "EURUSD=X"}, index=dates.delete(2))
+    matrices, mask = align(pd.concat([us, fx]))
+
+    assert mask["AAPL"].all()
+    assert mask["EURUSD=X"].tolist() == [True, True, False, True, True, True]
+    assert np.isnan(matrices["Close"]["EURUSD=X"].iloc[2])
+
+
+def test_ticker_is_not_filled_after_its_last_bar():
+    dates = pd.bdate_range("2024-01-01", periods=8, name="Date")
+    live = pd.DataFrame({"Close": np.arange(8.0), "Ticker": "AAPL"}, index=dates)
+    # MSFT has a gap on day 2 (filled) and its bars stop on day 4
+    gone = pd.DataFrame({"Close": [10.0, 11.0, 13.0, 14.0], "Ticker": "MSFT"},
+                        index=dates[[0, 1, 3, 4]])
+    matrices, mask = align(pd.concat([live, gone]))
+
+    assert mask["MSFT"].tolist() == [True] * 5 + [False] * 3
+    close = matrices["Close"]["MSFT"]
+    assert close.iloc[2] == 11.0
+    assert close.iloc[5:].isna().all()
+    returns = session_returns(matrices["Close"], mask)["MSFT"]
+    assert returns.iloc[5:].isna().all()
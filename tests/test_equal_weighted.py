@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from alpha_vantage_stub import fake_price, serve
+from conftest import load_script
+
+ew = load_script("S&P equal weighted")
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**options):
+        server = serve(0, **options)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/query"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fetch_quotes_and_equal_weight(stub):
+    url = stub(quota=100)
+    tickers = ["AAPL", "MSFT", "NVDA"]
+    quotes = asyncio.run(ew.fetch_quotes(tickers, "demo", url, rate=1000, burst=10, market_cap=True))
+
+    assert quotes["Ticker"].tolist() == tickers
+    assert quotes["Stock Price"].tolist() == [fake_price(t) for t in tickers]
+    assert quotes["Market Cap"].tolist() == [int(fake_price(t) * 1e8) for t in tickers]
+
+    portfolio = ew.equal_weight(quotes, 30_000)
+    assert portfolio.columns.tolist() == ew.COLUMNS
+    expected = np.floor(10_000 / quotes["Stock Price"]).astype(int)
+    assert portfolio["Shares to Buy"].tolist() == expected.tolist()
+
+
+def test_quota_note_is_retried(stub):
+    # one call per second: the second ticker gets a "Note" and succeeds on the retry
+    url = stub(quota=1, window=1.0)
+    start = time.monotonic()
+    quotes = asyncio.run(ew.fetch_quotes(["AAPL", "MSFT"], "demo", url, rate=1000, burst=10))
+
+    assert quotes["Stock Price"].tolist() == [fake_price("AAPL"), fake_price("MSFT")]
+    assert time.monotonic() - start >= 1.0
+
+
+def test_equal_weight_skips_missing_quotes():
+    quotes = pd.DataFrame({"Ticker": ["A", "B", "C"], "Stock Price": [10.0, np.nan, 20.0],
+                           "Market Cap": np.nan})
+    portfolio = ew.equal_weight(quotes, 1_000)
+    assert portfolio["Ticker"].tolist() == ["A", "C"]
+    assert portfolio["Shares to Buy"].tolist() == [50, 25]
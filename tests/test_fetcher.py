@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from fetcher import FrameProvider, fetch_frames, stack_frames
+
+
+def bars(n=10, start="2024-01-01", seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": 1000.0}, index=pd.date_range(start, periods=n, name="Date"))
+
+
+class FlakyProvider(FrameProvider):
+    """ Raises on the first `failures` calls of each ticker, records every batch """
+
+    def __init__(self, frames, failures):
+        super().__init__(frames)
+        self.failures = dict(failures)
+        self.calls = []
+
+    def fetch(self, tickers, period="6y", interval="1d", start=None):
+        self.calls.append((list(tickers), start))
+        for ticker in tickers:
+            if self.failures.get(ticker, 0) > 0:
+                self.failures[ticker] -= 1
+                raise ConnectionError(f"{ticker} failed")
+        return super().fetch(tickers, period, interval, start)
+
+
+def test_frame_provider_and_missing_ticker(caplog):
+    frames = {"AAA": bars(seed=1), "BBB": bars(seed=2)}
+    out = fetch_frames(["AAA", "BBB", "ZZZ"], FrameProvider(frames), retries=2, backoff=0)
+
+    assert set(out) == {"AAA", "BBB"}
+    pd.testing.assert_frame_equal(out["AAA"], frames["AAA"])
+    assert "No data found for 1 tickers: ZZZ" in caplog.text
+
+
+def test_failed_fetches_are_retried(caplog):
+    provider = FlakyProvider({"AAA": bars(), "BBB": bars()}, {"AAA": 2})
+    out = fetch_frames(["AAA", "BBB"], provider, batch_size=10, retries=3, backoff=0)
+
+    assert set(out) == {"AAA", "BBB"}
+    # the batch fails and is split, BBB succeeds alone, AAA on the first retry pass
+    assert [c[0] for c in provider.calls] == [["AAA", "BBB"], ["AAA"], ["BBB"], ["AAA"]]
+    assert "Request of 2 tickers failed" in caplog.text
+    assert "No data found" not in caplog.text
+
+
+def test_missing_tickers_are_retried_together(caplog):
+    provider = FlakyProvider({t: bars() for t in ("AAA", "BBB", "CCC")}, {})
+    out = fetch_frames(["AAA", "XXX", "BBB", "YYY", "CCC"], provider, batch_size=2, retries=2, backoff=0)
+
+    assert set(out) == {"AAA", "BBB", "CCC"}
+    batches = sorted(c[0] for c in provider.calls)
+    assert batches == [["AAA", "XXX"], ["BBB", "YYY"], ["CCC"], ["XXX", "YYY"], ["XXX", "YYY"]]
+    assert "No data found for 2 tickers: XXX, YYY" in caplog.text
+
+
+def test_retries_give_up(caplog):
+    provider = FlakyProvider({"AAA": bars()}, {"AAA": 5})
+    assert fetch_frames(["AAA"], provider, retries=2, backoff=0) == {}
+    assert len(provider.calls) == 3
+    assert "No data found for 1 tickers: AAA" in caplog.text
+
+
+def test_batches_and_starts():
+    tickers = [f"T{i}" for i in range(7)]
+    provider = FlakyProvider({t: bars(seed=i) for i, t in enumerate(tickers)}, {})
+    start = pd.Timestamp("2024-01-05")
+    out = fetch_frames(tickers + ["T0"], provider, batch_size=3, max_workers=2, retries=0,
+                       starts={"T5": start, "T6": start})
+
+    assert set(out) == set(tickers)
+    batches = sorted(provider.calls, key=lambda c: c[0])
+    assert batches == [(["T0", "T1", "T2"], None), (["T3", "T4"], None), (["T5", "T6"], start)]
+    assert out["T5"].index[0] == start and out["T0"].index[0] == pd.Timestamp("2024-01-01")
+
+
+def test_stack_frames_fills_each_ticker():
+    a, b = bars(5, seed=1), bars(3, start="2024-01-03", seed=2)
+    a.iloc[2] = np.nan
+    b.iloc[0, b.columns.get_loc("Close")] = np.nan
+    long = stack_frames({"AAA": a.iloc[::-1], "BBB": b})
+
+    assert long.columns.tolist() == ["Open", "High", "Low", "Close", "Volume", "Ticker"]
+    assert long.index.name == "Date"
+    aaa = long[long["Ticker"] == "AAA"]
+    assert aaa.index.is_monotonic_increasing and len(aaa) == 5
+    assert aaa["Close"].iloc[2] == a["Close"].iloc[1]
+    # a leading NaN is not filled from the other ticker
+    assert np.isnan(long[long["Ticker"] == "BBB"]["Close"].iloc[0])
+
+
+def test_stack_frames_empty():
+    assert stack_frames({}).empty
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from holdings import read_holdings, validate_holdings, value_chunk, value_portfolios
+
+PRICES = pd.Series({"AAA": 10.0, "BBB": 20.0, "CCC": 5.0, "DDD": np.nan})
+
+
+def test_validate_holdings():
+    holdings = pd.DataFrame({
+        "Portfolio": ["p1", "p1", " p1", "p2", "", "p3", "p3", "p3", "p3"],
+        "Ticker": ["aaa", "BBB", "AAA ", "CCC", "AAA", None, "AAA", "BBB", "DDD"],
+        "Shares": ["1,5", 2, 3, -1, 1, 1, "x", 4, 1],
+    })
+    valid, rejected = validate_holdings(holdings, PRICES)
+
+    expected = pd.DataFrame({"Portfolio": ["p1", "p1", "p3"], "Ticker": ["AAA", "BBB", "BBB"],
+                             "Shares": [4.5, 2.0, 4.0]})
+    pd.testing.assert_frame_equal(valid, expected, check_dtype=False)
+    assert rejected["Reason"].to_dict() == {
+        3: "negative number of shares", 4: "missing portfolio", 5: "missing ticker",
+        6: "invalid number of shares", 8: "no price for ticker",
+    }
+
+    short, rejected = validate_holdings(holdings, PRICES, allow_short=True)
+    assert short.set_index(["Portfolio", "Ticker"]).loc[("p2", "CCC"), "Shares"] == -1
+    assert 3 not in rejected.index
+
+
+def test_value_chunk():
+    holdings = pd.DataFrame({"Portfolio": ["p1", "p1", "p2"], "Ticker": ["AAA", "BBB", "CCC"],
+                             "Shares": [3.0, 1.0, 4.0]})
+    report = value_chunk(holdings, PRICES)
+    np.testing.assert_allclose(report["Value"], [30, 20, 20])
+    np.testing.assert_allclose(report["Weight"], [0.6, 0.4, 1.0])
+
+
+def test_value_portfolios_in_chunks(tmp_path):
+    rng = np.random.default_rng(0)
+    holdings = pd.DataFrame({"Portfolio": [f"p{i:02d}" for i in rng.integers(0, 30, 200)],
+                             "Ticker": rng.choice(["AAA", "BBB", "CCC"], 200),
+                             "Shares": rng.integers(1, 100, 200).astype(float)})
+    path = tmp_path / "holdings.csv"
+    holdings.to_csv(path, index=False)
+    valid, rejected = validate_holdings(read_holdings(str(path)), PRICES)
+    assert rejected.empty
+
+    out = tmp_path / "report.csv"
+    summary = value_portfolios(valid, PRICES, str(out), chunk_size=7)
+    expected = (holdings.assign(Value=holdings["Shares"] * holdings["Ticker"].map(PRICES))
+                .groupby("Portfolio")["Value"].sum())
+    pd.testing.assert_series_equal(summary["Value"].sort_index(), expected, check_names=False)
+
+    report = pd.read_csv(out)
+    assert len(report) == len(valid)
+    np.testing.assert_allclose(report.groupby("Portfolio")["Weight"].sum(), 1.0)
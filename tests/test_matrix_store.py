@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from matrix_store import MatrixStore, build_from_frames, build_from_long
+
+
+def bars(n=30, start="2024-01-01", seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": 1000.0}, index=pd.bdate_range(start, periods=n, name="Date"))
+
+
+@pytest.fixture
+def frames():
+    return {"BBB": bars(seed=1), "AAA": bars(20, "2024-01-10", seed=2)}
+
+
+def long_frame(frames):
+    return pd.concat([f.assign(Ticker=t) for t, f in frames.items()])
+
+
+def test_frames_and_long_give_the_pivot(tmp_path, frames):
+    expected = long_frame(frames).pivot(columns="Ticker", values="Close")
+    expected.index = expected.index.astype("datetime64[ns]")
+    for build, data in [(build_from_frames, frames), (build_from_long, long_frame(frames))]:
+        store = build(data, str(tmp_path / build.__name__))
+        pd.testing.assert_frame_equal(store.frame("Close"), expected, check_names=False, check_freq=False)
+
+    store = MatrixStore(str(tmp_path / "build_from_frames"))
+    window = store.frame("High", "2024-01-15", "2024-01-19", tickers=["AAA"])
+    np.testing.assert_array_equal(window["AAA"], frames["AAA"].loc["2024-01-15":"2024-01-19", "High"])
+    with pytest.raises(KeyError):
+        store.frame(tickers=["ZZZ"])
+
+
+def test_append_extends_the_files(tmp_path):
+    full = {"AAA": bars(40, seed=1), "BBB": bars(30, "2024-01-15", seed=2)}
+    store = build_from_frames({t: f.iloc[:-8] for t, f in full.items()}, str(tmp_path))
+    store.append(long_frame(full))
+
+    rebuilt = build_from_frames(full, str(tmp_path / "rebuilt"))
+    for field in store.fields:
+        pd.testing.assert_frame_equal(MatrixStore(str(tmp_path)).frame(field), rebuilt.frame(field))
+
+    with pytest.raises(KeyError):
+        store.append(bars(1, "2025-01-01").assign(Ticker="ZZZ"))
+
+
+def test_tz_aware_dates_are_stored_in_utc(tmp_path):
+    frame = bars(5)
+    aware = frame.set_axis(frame.index.tz_localize("America/New_York"))
+    store = build_from_frames({"AAA": aware}, str(tmp_path))
+    np.testing.assert_array_equal(store.dates, aware.index.tz_convert("UTC").tz_localize(None))
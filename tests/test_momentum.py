@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load_script
+
+momentum = load_script("Quant Momentum Strategy")
+
+
+class FakeCache:
+    calls = 0
+
+    def __init__(self, root):
+        pass
+
+    def update(self, tickers, period="2y", interval="1d"):
+        FakeCache.calls += 1
+        dates = pd.bdate_range("2023-01-02", periods=300)
+        return {t: pd.DataFrame({"Close": np.linspace(10, 20, len(dates))}, index=dates)
+                for t in tickers if t != "FAIL"}
+
+
+def test_failed_ticker_is_cached_as_missing(tmp_path, monkeypatch):
+    monkeypatch.setattr(momentum, "CLOSE_FILE", str(tmp_path / "close.parquet"))
+    monkeypatch.setattr(momentum, "PriceCache", FakeCache)
+    FakeCache.calls = 0
+
+    first = momentum.close_prices(["AAA", "BRK.B", "FAIL"])
+    assert first.columns.tolist() == ["AAA", "BRK.B", "FAIL"]
+    assert first["FAIL"].isna().all() and first["BRK.B"].notna().all()
+
+    second = momentum.close_prices(["AAA", "BRK.B", "FAIL"])
+    assert FakeCache.calls == 1
+    pd.testing.assert_frame_equal(second, first, check_freq=False)
+
+
+def test_momentum_table_and_positions():
+    dates = pd.bdate_range("2023-01-02", periods=260)
+    close = pd.DataFrame({"UP": np.linspace(10, 30, 260), "FLAT": 10.0,
+                          "NEW": [np.nan] * 200 + [5.0] * 60}, index=dates)
+    table = momentum.momentum_table(close)
+    assert table.loc["UP", "1M Return"] == pytest.approx(close["UP"].iloc[-1] / close["UP"].iloc[-22] - 1)
+    assert np.isnan(table.loc["NEW", "HQM Score"])
+
+    positions = momentum.position_sizes(table, 1000, quantile=0.5)
+    assert positions.index.tolist() == ["UP"]
+    assert positions.loc["UP", "Shares to Buy"] == 1000 // 30
+
+
+def test_position_sizes_of_an_empty_table():
+    table = pd.DataFrame({"Price": [np.nan], "HQM Score": [np.nan]}, index=["A"])
+    positions = momentum.position_sizes(table, 1000)
+    assert positions.empty and "Shares to Buy" in positions.columns
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from montecarlo import _merge_tail, simulate_var_es
+
+
+@pytest.fixture
+def close():
+    rng = np.random.default_rng(11)
+    returns = rng.normal(0.0005, 0.01, (750, 2))
+    dates = pd.bdate_range("2021-01-01", periods=751)
+    return pd.DataFrame(100 * np.exp(np.vstack([np.zeros(2), returns.cumsum(axis=0)])),
+                        index=dates, columns=["AAA", "BBB"])
+
+
+def test_merge_tail_keeps_the_largest_losses():
+    rng = np.random.default_rng(0)
+    losses = rng.standard_normal(10_000)
+    tail = np.empty(0)
+    for chunk in np.array_split(losses, 7):
+        tail = _merge_tail(tail, chunk, 500)
+        assert len(tail) <= 500
+    np.testing.assert_array_equal(np.sort(tail), np.sort(losses)[-500:])
+
+
+def test_gaussian_var_es_match_the_closed_form(close):
+    # one asset: the horizon log return is normal, the loss is -(exp(x) - 1)
+    single = close[["AAA"]]
+    log_returns = np.log(single["AAA"]).diff().dropna()
+    mu, sigma = 10 * log_returns.mean(), np.sqrt(10 * log_returns.var())
+    result = simulate_var_es(single, pd.Series({"AAA": 1.0}), horizon=10, n_paths=200_000,
+                             alpha=0.05, chunk_size=7_000, seed=1)
+
+    quantile = stats.norm.ppf(0.05, mu, sigma)
+    assert result["VaR"] == pytest.approx(-np.expm1(quantile), rel=0.02)
+    # E[-(e^x - 1) | x < q] for a normal x
+    tail_mean = np.exp(mu + sigma ** 2 / 2) * stats.norm.cdf((quantile - mu - sigma ** 2) / sigma) / 0.05
+    assert result["ES"] == pytest.approx(1 - tail_mean, rel=0.02)
+    assert result["Paths"] == 200_000
+
+
+def test_tail_larger_than_a_chunk_and_workers(close):
+    weights = pd.Series({"AAA": 0.5, "BBB": 0.5})
+    options = dict(horizon=5, n_paths=20_000, method="bootstrap", alpha=0.5, chunk_size=3_000, seed=4)
+    one = simulate_var_es(close, weights, **options)
+    two = simulate_var_es(close, weights, n_workers=2, **options)
+    assert one == two
+    assert one["ES"] > one["VaR"]
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import minimize
+
+from optimize import (efficient_frontier, estimate, ledoit_wolf, max_sharpe, min_variance,
+                      project_capped_simplex, risk_parity)
+
+
+@pytest.fixture
+def estimates():
+    rng = np.random.default_rng(8)
+    n_assets = 6
+    mix = rng.normal(0, 0.01, (n_assets, n_assets))
+    returns = rng.standard_normal((500, n_assets)) @ mix + np.linspace(0.0002, 0.001, n_assets)
+    close = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), columns=[f"T{i}" for i in range(n_assets)],
+                         index=pd.bdate_range("2022-01-03", periods=500))
+    return estimate(close)
+
+
+def long_only(objective, n_assets, upper=1.0, constraints=()):
+    result = minimize(objective, np.full(n_assets, 1 / n_assets), method="SLSQP",
+                      bounds=[(0, upper)] * n_assets,
+                      constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1}, *constraints],
+                      options={"ftol": 1e-14, "maxiter": 1000})
+    return result.x
+
+
+def test_ledoit_wolf_is_the_sample_covariance_without_noise():
+    # a scaled identity sample needs no shrinkage
+    x = np.vstack([np.eye(3), -np.eye(3)])
+    cov, shrinkage = ledoit_wolf(x)
+    assert shrinkage == 0
+    np.testing.assert_allclose(cov, x.T @ x / 6)
+
+
+def test_project_capped_simplex():
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 1, (20, 5))
+    projected = project_capped_simplex(values, upper=0.4)
+    np.testing.assert_allclose(projected.sum(axis=1), 1)
+    assert (projected >= 0).all() and (projected <= 0.4 + 1e-12).all()
+    for v, p in zip(values, projected):
+        reference = minimize(lambda w: ((w - v) ** 2).sum(), np.full(5, 0.2), method="SLSQP",
+                             bounds=[(0, 0.4)] * 5, constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1}],
+                             options={"ftol": 1e-14}).x
+        np.testing.assert_allclose(p, reference, atol=1e-6)
+
+
+def test_min_variance(estimates):
+    cov = estimates["Covariance"].to_numpy()
+    weights = min_variance(estimates, max_weight=0.3)
+    reference = long_only(lambda w: w @ cov @ w, len(cov), upper=0.3)
+    assert weights @ cov @ weights == pytest.approx(reference @ cov @ reference, rel=1e-6)
+    assert weights.max() <= 0.3 + 1e-9
+
+    short = min_variance(estimates, allow_short=True)
+    inverse = np.linalg.inv(cov) @ np.ones(len(cov))
+    np.testing.assert_allclose(short, inverse / inverse.sum())
+
+
+def test_max_sharpe(estimates):
+    mean, cov = estimates["Mean"].to_numpy(), estimates["Covariance"].to_numpy()
+    sharpe = lambda w: (w @ mean - 0.01) / np.sqrt(w @ cov @ w)
+    weights = max_sharpe(estimates, risk_free=0.01).to_numpy()
+    reference = long_only(lambda w: -sharpe(w), len(mean))
+    assert sharpe(weights) == pytest.approx(sharpe(reference), rel=1e-4)
+
+
+def test_efficient_frontier_reaches_the_targets(estimates):
+    mean, cov = estimates["Mean"].to_numpy(), estimates["Covariance"].to_numpy()
+    # the frontier starts at the return of the minimum variance portfolio
+    lowest = min_variance(estimates) @ mean
+    targets = np.linspace(lowest + 0.1 * (mean.max() - lowest), mean.max() - 0.1 * (mean.max() - lowest), 4)
+    frontier = efficient_frontier(estimates, targets)
+    np.testing.assert_allclose(frontier["Stats"]["Return"], targets, rtol=1e-6)
+    for target, w in zip(targets, frontier["Weights"].to_numpy()):
+        reference = long_only(lambda x: x @ cov @ x, len(mean),
+                              constraints=[{"type": "eq", "fun": lambda x, t=target: x @ mean - t}])
+        assert w @ cov @ w == pytest.approx(reference @ cov @ reference, rel=1e-5)
+
+
+def test_risk_parity_equalizes_the_contributions(estimates):
+    cov = estimates["Covariance"]
+    weights = risk_parity(cov)
+    contributions = weights * (cov.to_numpy() @ weights)
+    np.testing.assert_allclose(contributions / contributions.sum(), 1 / len(cov), rtol=1e-5)
+
+    budgets = np.arange(1, len(cov) + 1, dtype=float)
+    stacked = risk_parity(np.stack([cov.to_numpy(), 2 * cov.to_numpy()]), budgets)
+    for w in stacked:
+        share = w * (cov.to_numpy() @ w)
+        np.testing.assert_allclose(share / share.sum(), budgets / budgets.sum(), rtol=1e-5)
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reports
+from reports import ReportWriter, write_report
+
+
+@pytest.fixture
+def table():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"Ticker": [f"T{i}" for i in range(25)], "Price": rng.uniform(1, 100, 25),
+                         "Weight": rng.uniform(0, 1, 25)})
+
+
+@pytest.mark.parametrize("ext, read", [("csv", pd.read_csv), ("parquet", pd.read_parquet)])
+def test_round_trip(tmp_path, table, ext, read):
+    path = str(tmp_path / f"report.{ext}")
+    assert write_report(path, table, batch_rows=4) == len(table)
+    pd.testing.assert_frame_equal(read(path), table)
+
+
+def test_xlsx_starts_a_new_sheet(tmp_path, table, monkeypatch):
+    monkeypatch.setattr(reports, "EXCEL_MAX_ROWS", 11)
+    table.loc[3, "Price"] = np.nan
+    path = str(tmp_path / "report.xlsx")
+    write_report(path, table, formats={"Price": "price", "Weight": "percent"}, batch_rows=7)
+
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets) == ["Report", "Report (2)", "Report (3)"]
+    assert [len(s) for s in sheets.values()] == [10, 10, 5]
+    pd.testing.assert_frame_equal(pd.concat(sheets.values(), ignore_index=True), table)
+
+
+def test_empty_report_has_its_header(tmp_path):
+    path = str(tmp_path / "report.csv")
+    report = ReportWriter(path, ["Ticker", "Value"])
+    report.close()
+    report.close()
+    assert list(pd.read_csv(path).columns) == ["Ticker", "Value"]
+    with pytest.raises(ValueError):
+        report.write(pd.DataFrame({"Ticker": ["A"], "Value": [1.0]}))
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cache import PriceCache
+from resample import resample_long, resample_ohlcv, update_resampled
+
+
+def bars(n=90, start="2024-01-01", seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return pd.DataFrame({"Open": close - 0.5, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": rng.integers(100, 1000, n).astype(float)},
+                        index=pd.bdate_range(start, periods=n, name="Date"))
+
+
+AGGREGATIONS = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+@pytest.mark.parametrize("interval, rule", [("1wk", "W-SUN"), ("1mo", "MS")])
+def test_matches_pandas_resample(interval, rule):
+    frame = bars()
+    expected = frame.resample(rule).agg(AGGREGATIONS).dropna(subset=["Close"])
+    if rule == "W-SUN":
+        # pandas labels the weeks with their last day, Yahoo with the Monday
+        expected.index = expected.index - pd.Timedelta(days=6)
+    pd.testing.assert_frame_equal(resample_ohlcv(frame, interval), expected, check_freq=False)
+
+
+def test_long_matches_per_ticker():
+    frames = {"AAA": bars(seed=1), "BBB": bars(60, "2024-02-01", seed=2)}
+    long = pd.concat([f.assign(Ticker=t) for t, f in frames.items()])
+    out = resample_long(long, "1wk")
+    for ticker, frame in frames.items():
+        pd.testing.assert_frame_equal(out[out["Ticker"] == ticker].drop(columns="Ticker"),
+                                      resample_ohlcv(frame, "1wk"))
+
+
+def test_update_aggregates_the_new_bars(tmp_path):
+    full = bars(120)
+    cache = PriceCache(str(tmp_path))
+    # end in the middle of a week: the last weekly bar is partial
+    cache.write("AAA", full.iloc[:52])
+    first = update_resampled(cache, ["AAA"], "1wk")["AAA"]
+    pd.testing.assert_frame_equal(first, resample_ohlcv(full.iloc[:52], "1wk"), check_freq=False)
+
+    cache.write("AAA", full)
+    second = update_resampled(cache, ["AAA"], "1wk")["AAA"]
+    pd.testing.assert_frame_equal(second, resample_ohlcv(full, "1wk"), check_freq=False)
+
+    # a longer base history is aggregated again from its start
+    longer = pd.concat([bars(30, "2023-11-20", seed=5), full])
+    longer = longer[~longer.index.duplicated(keep="last")]
+    cache.write("AAA", longer)
+    third = update_resampled(cache, ["AAA"], "1wk")["AAA"]
+    pd.testing.assert_frame_equal(third, resample_ohlcv(cache.read("AAA"), "1wk"), check_freq=False)
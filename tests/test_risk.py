@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk import asset_returns, portfolio_metrics
+
+
+def prices(n=300, n_assets=4, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.01, (n, n_assets))
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), columns=[f"T{i}" for i in range(n_assets)],
+                        index=pd.bdate_range("2023-01-02", periods=n))
+
+
+def reference(returns, alpha=0.05, periods_per_year=252):
+    """ The metrics of one return series, computed by sorting """
+    returns = pd.Series(returns)
+    ordered = np.sort(returns.to_numpy())
+    k = int(np.floor(alpha * len(ordered)))
+    wealth = (1 + returns).cumprod()
+    return {
+        "Return": returns.mean() * periods_per_year,
+        "Volatility": returns.std() * np.sqrt(periods_per_year),
+        "Sharpe": returns.mean() / returns.std() * np.sqrt(periods_per_year),
+        "VaR": -ordered[k],
+        "ES": -ordered[:k + 1].mean(),
+        "Max Drawdown": (1 - wealth / wealth.cummax()).max(),
+    }
+
+
+def test_weights_match_the_rebalanced_returns():
+    close = prices()
+    weights = pd.DataFrame([[0.25] * 4, [0.7, 0.1, 0.1, 0.1], [1.0, 0, 0, 0]], columns=close.columns)
+    metrics = portfolio_metrics(close, weights, chunk_size=2)
+
+    returns = close.pct_change().iloc[1:]
+    for i, w in weights.iterrows():
+        expected = reference(returns.to_numpy() @ w.to_numpy())
+        for column, value in expected.items():
+            assert metrics.loc[i, column] == pytest.approx(value), column
+
+
+def test_shares_match_the_buy_and_hold_value():
+    close = prices(seed=1)
+    shares = pd.Series({"T0": 10.0, "T2": 5.0})
+    metrics = portfolio_metrics(close, shares, kind="shares")
+
+    value = close[["T0", "T2"]] @ shares
+    expected = reference(value.pct_change().iloc[1:].to_numpy())
+    for column, value in expected.items():
+        assert metrics.iloc[0][column] == pytest.approx(value), column
+
+
+def test_a_listing_is_not_a_gain():
+    close = prices(n=50, n_assets=2, seed=2)
+    close.iloc[:20, 1] = np.nan
+    metrics = portfolio_metrics(close, pd.Series({"T0": 1.0, "T1": 1.0}), kind="shares")
+
+    value = close.fillna(0.0).sum(axis=1)
+    returns = np.where(np.arange(1, 50) == 20, (close.iloc[20, 0] - close.iloc[19, 0]) / close.iloc[19, 0],
+                       value.pct_change().iloc[1:].to_numpy())
+    assert metrics.iloc[0]["Return"] == pytest.approx(returns.mean() * 252)
+    np.testing.assert_array_equal(asset_returns(close)["T1"].iloc[:19], 0.0)
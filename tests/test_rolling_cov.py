@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rolling_cov import iter_covariances, rolling_covariances
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(3)
+    mix = rng.normal(0, 0.01, (3, 3))
+    return pd.DataFrame(rng.standard_normal((120, 3)) @ mix, columns=["A", "B", "C"],
+                        index=pd.bdate_range("2024-01-01", periods=120))
+
+
+def pandas_matrices(frame, n_obs):
+    """ The (T, N, N) stack of a pandas pairwise covariance """
+    return frame.to_numpy().reshape(n_obs, frame.shape[1], frame.shape[1])
+
+
+@pytest.mark.parametrize("refresh", [None, 7])
+def test_rolling_matches_pandas(returns, refresh):
+    out = rolling_covariances(returns, window=20, dtype=np.float64, refresh=refresh)
+    expected = pandas_matrices(returns.rolling(20).cov(), len(returns))
+    np.testing.assert_allclose(out, expected, rtol=1e-9, atol=1e-15, equal_nan=True)
+
+    corr = rolling_covariances(returns, window=20, correlation=True, dtype=np.float64)
+    expected = pandas_matrices(returns.rolling(20).corr(), len(returns))
+    np.testing.assert_allclose(corr[19:], expected[19:], rtol=1e-9)
+
+
+def test_ewma_matches_pandas(returns):
+    out = rolling_covariances(returns, lam=0.94, dtype=np.float64)
+    expected = pandas_matrices(returns.ewm(alpha=0.06, adjust=False).cov(bias=True), len(returns))
+    np.testing.assert_allclose(out, expected, rtol=1e-9, atol=1e-15)
+
+
+def test_riskmetrics_without_demean(returns):
+    out = rolling_covariances(returns, lam=0.9, demean=False, dtype=np.float64)
+    x = returns.to_numpy()
+    cov = np.zeros((3, 3))
+    for row, matrix in zip(x, out):
+        cov = 0.9 * cov + 0.1 * np.outer(row, row)
+        np.testing.assert_allclose(matrix, cov)
+
+
+def test_iter_matches_the_buffer(returns):
+    out = rolling_covariances(returns, window=30, dtype=np.float64)
+    streamed = list(iter_covariances(returns, window=30))
+    assert [date for date, _ in streamed] == list(returns.index[29:])
+    np.testing.assert_allclose(np.stack([m for _, m in streamed]), out[29:])
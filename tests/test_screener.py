@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from screener import score_chunk
+
+
+def long_frame():
+    rng = np.random.default_rng(2)
+    dates = pd.bdate_range("2024-01-01", periods=120, name="Date")
+    parts = []
+    for ticker, stop in (("AAPL", 120), ("AIR.PA", 118)):
+        close = 50 + rng.standard_normal(stop).cumsum()
+        parts.append(pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                                   "Volume": 1.0, "Ticker": ticker}, index=dates[:stop]))
+    return pd.concat(parts)
+
+
+@pytest.mark.parametrize("n_std", [1.5, 2.0])
+def test_percent_b_on_the_last_session_of_each_ticker(n_std):
+    df = long_frame()
+    table = score_chunk(df, bb_window=20, bb_std=n_std).set_index("Ticker")
+
+    for ticker, frame in df.groupby("Ticker"):
+        close = frame["Close"]
+        mean, std = close.rolling(20).mean().iloc[-1], close.rolling(20).std(ddof=0).iloc[-1]
+        lower = mean - n_std * std
+        assert table.loc[ticker, "Close"] == close.iloc[-1]
+        assert table.loc[ticker, "%B"] == pytest.approx((close.iloc[-1] - lower) / (2 * n_std * std))
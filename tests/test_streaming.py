@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import rsi_array
+from streaming import IndicatorStream, RollingExtreme
+
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(5)
+    close = 100 + rng.standard_normal(150).cumsum()
+    dates = pd.bdate_range("2024-01-01", periods=150, name="Date")
+    return pd.DataFrame({"Open": close, "High": close + rng.uniform(0, 2, 150),
+                         "Low": close - rng.uniform(0, 2, 150), "Close": close, "Ticker": "AAA"}, index=dates)
+
+
+def reference(bars, tenkan=9, kijun=26, senkou_b=52, displacement=26, period=14, window=20):
+    high, low, close = bars["High"], bars["Low"], bars["Close"]
+    mid = {w: (high.rolling(w).max() + low.rolling(w).min()) / 2 for w in (tenkan, kijun, senkou_b)}
+    mean, std = close.rolling(window).mean(), close.rolling(window).std(ddof=0)
+    return pd.DataFrame({
+        "Tenkan": mid[tenkan], "Kijun": mid[kijun],
+        "Senkou A": ((mid[tenkan] + mid[kijun]) / 2).shift(displacement),
+        "Senkou B": mid[senkou_b].shift(displacement),
+        "Chikou": close,
+        "RSI": rsi_array(close.to_numpy(), period),
+        "BB Middle": mean, "BB Upper": mean + 2 * std, "BB Lower": mean - 2 * std,
+    })
+
+
+def test_stream_matches_batch(bars):
+    stream = IndicatorStream()
+    rows = [stream.update("AAA", *row, date) for date, row in
+            zip(bars.index, bars[["Open", "High", "Low", "Close"]].itertuples(index=False, name=None))]
+    pd.testing.assert_frame_equal(pd.DataFrame(rows, index=bars.index)[reference(bars).columns],
+                                  reference(bars), check_freq=False)
+
+
+def test_seed_then_push(bars):
+    stream = IndicatorStream()
+    stream.seed(bars.iloc[:-1])
+    last = bars.iloc[-1]
+    values = stream.update("AAA", last["Open"], last["High"], last["Low"], last["Close"], bars.index[-1])
+    expected = reference(bars).iloc[-1]
+    assert pd.Series(values)[expected.index].to_numpy() == pytest.approx(expected.to_numpy())
+    assert stream.table().index.tolist() == ["AAA"]
+
+
+def test_partial_bar_is_replaced(bars):
+    stream = IndicatorStream()
+    stream.seed(bars.iloc[:-1])
+    last = bars.iloc[-1]
+    # two revisions of the session's partial bar, then the final one
+    for shift in (5.0, -3.0, 0.0):
+        values = stream.update("AAA", last["Open"], last["High"] + shift, last["Low"] + shift,
+                               last["Close"] + shift, bars.index[-1])
+    expected = reference(bars).iloc[-1]
+    assert pd.Series(values)[expected.index].to_numpy() == pytest.approx(expected.to_numpy())
+
+    # an older bar is ignored
+    assert stream.update("AAA", 1.0, 1.0, 1.0, 1.0, bars.index[0]) == values
+
+
+def test_rolling_extreme_replace():
+    rng = np.random.default_rng(1)
+    values = rng.standard_normal(200)
+    extreme = RollingExtreme(7, maximum=False)
+    for i, value in enumerate(values):
+        extreme.push(value + 10)
+        extreme.push(value - 10, replace=True)
+        extreme.push(value, replace=True)
+        if i >= 6:
+            assert extreme.value == values[i - 6:i + 1].min()
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sweep
+from backtest import backtest, ichimoku_signals
+from matrix_store import build_from_frames
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range("2020-01-01", periods=400, name="Date")
+    frames = {}
+    for ticker in ("AAA", "BBB", "CCC"):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(dates))))
+        frames[ticker] = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99,
+                                       "Close": close, "Volume": 1e6}, index=dates)
+    build_from_frames(frames, str(tmp_path))
+    return str(tmp_path), frames
+
+
+def test_sweep_matches_backtest(store):
+    root, frames = store
+    grid = sweep.ichimoku_grid((5, 9), (20, 26), (44, 52), (26,))
+    table = sweep.run_sweep(root, grid).set_index(["tenkan", "kijun", "senkou_b", "displacement"])
+
+    wide = {f: pd.DataFrame({t: frames[t][f] for t in sorted(frames)}) for f in ("High", "Low", "Close")}
+    for point in grid:
+        signals = ichimoku_signals(wide["High"], wide["Low"], wide["Close"], *point)
+        result = backtest(wide["Close"], signals["Entry"], signals["Exit"])
+        equity = result["Portfolio"]["Equity"]
+        row = table.loc[point]
+        assert row["Total Return"] == pytest.approx(equity.iloc[-1] - 1)
+        assert row["Trades"] == result["Summary"]["Trades"].sum()
+
+
+def test_every_window_is_computed_once(store, monkeypatch):
+    root, _ = store
+    calls = []
+    compute = sweep.midpoint
+    monkeypatch.setattr(sweep, "midpoint", lambda high, low, window: calls.append(window) or compute(high, low, window))
+    senkou_bs = tuple(range(40, 60, 2))
+    sweep.run_sweep(root, sweep.ichimoku_grid((7, 9), (22, 26), senkou_bs, (26,)))
+    assert sorted(calls) == sorted([7, 9, 22, 26, *senkou_bs])
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from valuation import value_ledger
+
+DATES = pd.bdate_range("2024-01-01", periods=4, name="Date")
+
+
+@pytest.fixture
+def close():
+    # BBB has its first price on 2024-01-02
+    return pd.DataFrame({"AAA": [10.0, 11.0, np.nan, 12.0], "BBB": [np.nan, 5.0, 6.0, 7.0]}, index=DATES)
+
+
+def test_value_and_pnl_by_hand(close):
+    ledger = pd.DataFrame({"Date": ["2024-01-01", "2024-01-02", "2024-01-03"], "Account": ["x", "x", "x"],
+                           "Ticker": ["AAA", "AAA", "BBB"], "Shares": [2.0, -1.0, 3.0],
+                           "Price": [np.nan, 11.5, np.nan]})
+    result = value_ledger(ledger, close)
+
+    # AAA: 2 then 1 share, BBB: 3 shares from 2024-01-03, the missing close of AAA is filled
+    assert result["Value"]["x"].tolist() == [20, 11, 11 + 18, 12 + 21]
+    assert result["Flows"]["x"].tolist() == [20, -11.5, 18, 0]
+    assert result["PnL"]["x"].tolist() == pytest.approx([0, 11 - 20 + 11.5, 0, 4])
+    weights = result["Weights"].set_index("Ticker")
+    assert weights["Value"].to_dict() == {"AAA": 12, "BBB": 21}
+    assert weights["Weight"].sum() == pytest.approx(1)
+
+
+def test_trade_before_the_first_price(close):
+    ledger = pd.DataFrame({"Date": ["2024-01-01"], "Account": ["y"], "Ticker": ["BBB"], "Shares": [1.0]})
+    result = value_ledger(ledger, close)
+
+    # counted from the first price of BBB, no P&L appears on that day
+    assert result["Flows"]["y"].tolist() == [0, 5, 0, 0]
+    assert result["PnL"]["y"].tolist() == [0, 0, 1, 1]
+
+
+def test_tickers_without_prices(close):
+    close["CCC"] = np.nan
+    ledger = pd.DataFrame({"Date": ["2024-01-01"] * 2, "Account": "z", "Ticker": ["CCC", "DDD"], "Shares": 1.0})
+    with pytest.raises(KeyError, match="CCC.*DDD"):
+        value_ledger(ledger, close)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import backtest, ichimoku_signals
+from walkforward import WalkForwardCache, ichimoku_strategy, walk_forward
+
+GRID = [(7, 22, 44, 22), (9, 26, 52, 26), (5, 20, 40, 20)]
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(5)
+    dates = pd.bdate_range("2019-01-01", periods=600, name="Date")
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, (600, 3)), axis=0)),
+                         index=dates, columns=["AAA", "BBB", "CCC"])
+    close.iloc[:150, 2] = np.nan
+    return close * 1.01, close * 0.99, close
+
+
+def test_pnl_matches_backtest(prices):
+    high, low, close = prices
+    cache = WalkForwardCache(high, low, close)
+    for params in GRID:
+        signals = ichimoku_signals(high, low, close, *params)
+        expected = backtest(close, signals["Entry"], signals["Exit"])["Portfolio"]["PnL"]
+        np.testing.assert_allclose(cache.portfolio_pnl(params, ichimoku_strategy), expected)
+
+
+def sharpe(pnl):
+    pnl = pd.Series(pnl)
+    return pnl.mean() / pnl.std() * np.sqrt(252)
+
+
+def test_walk_forward_picks_the_best_in_sample(prices):
+    cache = WalkForwardCache(*prices)
+    result = walk_forward(cache, GRID, train=250, test=100)
+    windows = result["Windows"]
+    assert len(windows) == 3
+
+    for i, window in windows.iterrows():
+        start = i * 100
+        scores = {p: sharpe(cache.portfolio_pnl(p, ichimoku_strategy)[start:start + 250]) for p in GRID}
+        best = max(scores, key=scores.get)
+        assert window["Params"] == best
+        assert window["In-Sample Sharpe"] == pytest.approx(scores[best])
+        test_pnl = cache.portfolio_pnl(best, ichimoku_strategy)[start + 250:start + 350]
+        assert window["Out-Sample Total Return"] == pytest.approx(np.prod(1 + test_pnl) - 1)
+        assert window["Out-Sample Sharpe"] == pytest.approx(sharpe(test_pnl))
+
+    assert result["PnL"].index.equals(cache.index[250:550])
+    # every parameter set is backtested once on the whole history
+    assert len(cache.pnl) == len(GRID)